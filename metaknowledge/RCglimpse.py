@@ -3,6 +3,7 @@ import collections
 import datetime
 
 from .mkExceptions import mkException
+from .aggregation import _rankCounts
 
 glimpseTags = collections.OrderedDict([
     ('Top Authors','authorsFull'),
@@ -15,7 +16,7 @@ descriptionString2 = 'and are independent of one another'
 
 descriptionStringFull = descriptionString1 + ' ' + descriptionString2
 
-def _glimpse(RC, *tags, compact = False):
+def _glimpse(RC, *tags, compact = False, maxEntries = None):
     tColumns, tRows = tuple(shutil.get_terminal_size())
     if len(tags) < 1:
         targetTags = glimpseTags
@@ -31,8 +32,13 @@ def _glimpse(RC, *tags, compact = False):
         maxRows = tRows - 7
     else:
         maxRows = tRows - 6
-    for name, tag in targetTags.items():
-        glimpseVals[name] = RC.rankedSeries(tag, giveCounts = False, giveRanks = True, pandasMode = False)
+    #All the columns are counted in one pass over the Records
+    if maxEntries is None:
+        counts = RC.aggregateCounts(*(('count', tag) for tag in targetTags.values()))
+    else:
+        counts = RC.aggregateCounts(*(('topCount', tag, maxEntries) for tag in targetTags.values()))
+    for (name, tag), tagCounts in zip(targetTags.items(), counts):
+        glimpseVals[name] = _rankCounts(tagCounts, giveCounts = False, giveRanks = True, pandasMode = False)
     return makeHeader(RC, tColumns, targetTags, compact) + makeTable(glimpseVals, maxRows, tColumns, compact)
 
 def makeHeader(RC, width, glimpseVals, compact):
@@ -4,5 +4,5 @@
 from .tagProcessing.tagFunctions import *
 from .tagProcessing.funcDicts import tagToFullDict, fullToTagDict, tagNameConverterDict, tagsAndNameSet, knownTagsList
 
-from .recordWOS import WOSRecord, recordParser
-from .wosHandlers import isWOSFile, wosParser
+from .recordWOS import WOSRecord, recordParser, LazyFieldDict, wosInternedTags
+from .wosHandlers import isWOSFile, wosParser, wosRecordIter, lazyWOSParser, lazyWOSRecordIter, WOSFileIndex
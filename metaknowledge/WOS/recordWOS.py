@@ -4,13 +4,17 @@
 import itertools
 import io
 import collections
+import collections.abc
 
-from ..mkRecord import ExtendedRecord
+from ..mkRecord import ExtendedRecord, _internFields
 
 from ..WOS.tagProcessing.funcDicts import tagNameConverterDict, tagToFull
 from ..WOS.tagProcessing.tagFunctions import tagToFunc
 from ..mkExceptions import BadWOSFile, BadWOSRecord
 
+#The tags with values shared by many records, the names, places, journals and citations
+wosInternedTags = frozenset(('PT', 'AU', 'AF', 'BA', 'BF', 'CA', 'GP', 'BE', 'SO', 'SE', 'BS', 'LA', 'DT', 'CT', 'CY', 'CL', 'SP', 'HO', 'DE', 'ID', 'C1', 'RP', 'FU', 'CR', 'PU', 'PI', 'PA', 'SN', 'EI', 'BN', 'J9', 'JI', 'PD', 'PY', 'VL', 'IS', 'WC', 'SC'))
+
 class WOSRecord(ExtendedRecord):
     """Class for full WOS records
 
@@ -48,6 +52,8 @@ class WOSRecord(ExtendedRecord):
 
     > itertools.chain is treated identically to a file stream and is used by [RecordCollections](./RecordCollection.html#metaknowledge.RecordCollection).
 
+    > A `LazyFieldDict` is used as is, the tags are only parsed from the file when the record is first accessed. These are made by [lazyWOSParser()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.lazyWOSParser).
+
     _sFile_ : `optional [str]`
 
     > Is the name of the file the raw data was in, by default it is blank. It is mostly used to make error messages more informative.
@@ -55,25 +61,35 @@ class WOSRecord(ExtendedRecord):
     _sLine_ : `optional [int]`
 
     > Is the line the record starts on in the raw data file. It is mostly used to make error messages more informative.
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if given it is passed to [recordParser()](../modules/WOS.html#metaknowledge.WOS.recordWOS.recordParser) when the record is parsed from text, so the record's strings are shared with the others parsed with the same pool
     """
 
-    def __init__(self, inRecord, sFile = "", sLine = 0):
+    __slots__ = ('_wosNum',)
+
+    _internedTags = wosInternedTags
+
+    def __init__(self, inRecord, sFile = "", sLine = 0, stringPool = None):
         """See help on [Record](./Record.html#metaknowledge.Record) for details"""
         bad = False
         error = None
         fieldDict = None
         try:
-            if isinstance(inRecord, dict) or isinstance(inRecord, collections.OrderedDict):
+            if isinstance(inRecord, LazyFieldDict):
+                fieldDict = inRecord
+            elif isinstance(inRecord, dict) or isinstance(inRecord, collections.OrderedDict):
                 fieldDict = collections.OrderedDict(inRecord)
             elif isinstance(inRecord, itertools.chain):
-                fieldDict = recordParser(inRecord)
+                fieldDict = recordParser(inRecord, stringPool = stringPool)
             elif isinstance(inRecord, io.IOBase):
-                fieldDict = recordParser(enumerate(inRecord))
+                fieldDict = recordParser(enumerate(inRecord), stringPool = stringPool)
             elif isinstance(inRecord, str):
                 def addChartoEnd(lst):
                     for s in lst:
                         yield s + '\n'
-                fieldDict = recordParser(enumerate(addChartoEnd(inRecord.split('\n')), start = 1))
+                fieldDict = recordParser(enumerate(addChartoEnd(inRecord.split('\n')), start = 1), stringPool = stringPool)
                 #string io
             else:
                 raise TypeError("Unsupported input type '{}', WOSRecords cannot be created from '{}'".format(inRecord, type(inRecord)))
@@ -122,6 +138,13 @@ class WOSRecord(ExtendedRecord):
         """Returns the UT tag (WOS number) of the record"""
         return self._wosNum
 
+    def release(self):
+        """If the record was read lazily, with [lazyWOSParser()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.lazyWOSParser), this drops its parsed tags and the values computed from them, they will be parsed again from the file the next time they are needed. For other records it does nothing.
+        """
+        if isinstance(self._fieldDict, LazyFieldDict):
+            self._fieldDict.release()
+            self._computedFields = {}
+
     def writeRecord(self, infile):
         """Writes to _infile_ the original contents of the Record. This is intended for use by [RecordCollections](./RecordCollection.html#metaknowledge.RecordCollection) to write to file. What is written to _infile_ is bit for bit identical to the original record file (if utf-8 is used). No newline is inserted above the write but the last character is a newline.
 
@@ -143,7 +166,7 @@ class WOSRecord(ExtendedRecord):
                     infile.write(value + '\n')
             infile.write("ER\n")
 
-def recordParser(paper):
+def recordParser(paper, stringPool = None):
     """This is function that is used to create [Records](../classes/Record.html#metaknowledge.Record) from files.
 
     **recordParser**() reads the file _paper_ until it reaches 'ER'. For each field tag it adds an entry to the returned dict with the tag as the key and a list of the entries as the value, the list has each line separately, so for the following two lines in a record:
@@ -161,6 +184,10 @@ def recordParser(paper):
 
     > An open file, with the current line at the beginning of the WOS record.
 
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the tags and the values of the tags in `wosInternedTags` are replaced by the equal strings in it, or added to it, so the records parsed with the same pool share them
+
     # Returns
 
     `OrderedDict[str : List[str]]`
@@ -192,6 +219,8 @@ def recordParser(paper):
     else:
         retdict = collections.OrderedDict(tagList)
         if len(retdict) == len(tagList):
+            if stringPool is not None:
+                retdict = _internFields(retdict, wosInternedTags, stringPool)
             return retdict
         else:
             dupSet = set()
@@ -199,3 +228,68 @@ def recordParser(paper):
                 if tupl[0] in retdict:
                     dupSet.add(tupl[0])
             raise BadWOSRecord("Duplicate tags (" + ', '.join(dupSet) + ") in record")
+
+class LazyFieldDict(collections.abc.Mapping):
+    """A read only mapping that acts as the `_fieldDict` of a lazily read [WOSRecord](#metaknowledge.WOS.WOSRecord). It only holds the record's WOS number and the `WOSFileIndex` of its file, the lines of the record are given to [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) when any tag other than `'UT'` is first looked up and the result is kept until `release()` is called.
+
+    Copying it gives a normal `OrderedDict`, so pickled records no longer need the file.
+
+    # Parameters
+
+    _wosIndex_ : `WOSFileIndex`
+
+    > The index of the file the record is in
+
+    _wosNum_ : `str`
+
+    > The WOS number (UT tag) of the record, it must be in _wosIndex_
+    """
+    __slots__ = ('_wosIndex', '_wosNum', '_fields')
+
+    def __init__(self, wosIndex, wosNum):
+        self._wosIndex = wosIndex
+        self._wosNum = wosNum
+        self._fields = None
+
+    def _parsed(self):
+        if self._fields is None:
+            self._fields = recordParser(self._wosIndex.recordLines(self._wosNum))
+        return self._fields
+
+    def __getitem__(self, key):
+        if self._fields is None and key == 'UT':
+            return [self._wosNum]
+        return self._parsed()[key]
+
+    def __contains__(self, key):
+        if self._fields is None and key == 'UT':
+            return True
+        return key in self._parsed()
+
+    def __iter__(self):
+        return iter(self._parsed())
+
+    def __len__(self):
+        return len(self._parsed())
+
+    def copy(self):
+        return collections.OrderedDict(self._parsed())
+
+    def release(self):
+        """Drops the parsed tags"""
+        self._fields = None
+
+    def fields(self):
+        """Gives the parsed tags, if they are not already parsed they are not kept so the record stays unparsed"""
+        if self._fields is not None:
+            return self._fields
+        return recordParser(self._wosIndex.recordLines(self._wosNum))
+
+    def recordBytes(self):
+        """Gives the bytes of the record in its file"""
+        return self._wosIndex.recordBytes(self._wosNum)
+
+    @property
+    def parsed(self):
+        """`True` if the tags are currently parsed"""
+        return self._fields is not None
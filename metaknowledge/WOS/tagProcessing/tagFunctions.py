@@ -1,6 +1,6 @@
 #Written by Reid McIlroy-Young for Dr. John McLevey, University of Waterloo 2015
 from .helpFuncs import getMonth
-from ...citation import Citation
+from ...citation import cachedCitation
 
 import collections
 
@@ -506,7 +506,7 @@ def citations(val):
     """
     # The CR Tag
 
-    extracts a list of all the citations in the record, the citations are the [metaknowledge.Citation](../classes/Citation.html#metaknowledge.citation.Citation) class.
+    extracts a list of all the citations in the record, the citations are the [metaknowledge.Citation](../classes/Citation.html#metaknowledge.citation.Citation) class. They are shared with the other records citing the same string, see [cachedCitation()](../modules/citation.html#metaknowledge.citation.cachedCitation).
 
     # Parameters
 
@@ -521,10 +521,7 @@ def citations(val):
     > A list of Citations
 
     """
-    retCites = []
-    for c in val:
-        retCites.append(Citation(c))
-    return retCites
+    return [cachedCitation(c) for c in val]
 
 def publisherCity(val):
     """
@@ -1,6 +1,11 @@
+import concurrent.futures
+import io
 import itertools
+import mmap
+import os.path
 
-from .recordWOS import WOSRecord
+from .recordWOS import WOSRecord, LazyFieldDict
+from ..mkRecord import _collectRecords, _openText, _internRecords
 from ..mkExceptions import cacheError, BadWOSFile, BadWOSRecord
 
 def isWOSFile(infile, checkedLines = 3):
@@ -10,7 +15,7 @@ def isWOSFile(infile, checkedLines = 3):
 
     _infile_ : `str`
 
-    > The path to the targets file
+    > The path to the targets file, or the first bytes of it
 
     _checkedLines_ : `optional [int]`
 
@@ -23,7 +28,7 @@ def isWOSFile(infile, checkedLines = 3):
     > `True` if the file is a WOS file
     """
     try:
-        with open(infile, 'r', encoding='utf-8-sig') as openfile:
+        with _openText(infile, 'utf-8-sig') as openfile:
             f = enumerate(openfile, start = 0)
             for i in range(checkedLines):
                 if "VR 1.0" in f.__next__()[1]:
@@ -33,11 +38,13 @@ def isWOSFile(infile, checkedLines = 3):
     else:
         return False
 
-def wosParser(isifile):
+def wosParser(isifile, workers = 1, fileStream = None, stringPool = None):
     """This is a function that is used to create [RecordCollections](../classes/RecordCollection.html#metaknowledge.RecordCollection) from files.
 
     **wosParser**() reads the file given by the path isifile, checks that the header is correct then reads until it reaches EF. All WOS records it encounters are parsed with [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) and converted into [Records](../classes/Record.html#metaknowledge.Record). A list of these `Records` is returned.
 
+    If _workers_ is greater than 1 the file is first scanned for the `'ER'` lines that end the records and split into byte ranges that are parsed by a pool of _workers_ processes. The `Records` (including their line numbers) are the same as those from a serial read.
+
     `BadWOSFile` is raised if an issue is found with the file.
 
     # Parameters
@@ -46,56 +53,415 @@ def wosParser(isifile):
 
     > The path to the target file
 
+    _workers_ : `optional [int]`
+
+    > Default 1, the number of processes used to parse the file
+
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _isifile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _isifile_ again. It is closed when the reading is done. It is not used if the file is split between workers
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, or once they are back from the workers, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
     # Returns
 
     `List[Record]`
 
     > All the `Records` found in _isifile_
     """
-    plst = set()
+    if workers > 1:
+        chunks = _findWOSChunks(isifile, workers * 4)
+        if chunks is not None and len(chunks) > 1:
+            recs, error = _parallelWOSParser(isifile, chunks, workers)
+            if stringPool is not None:
+                _internRecords(recs, stringPool)
+            return recs, error
+    return _collectRecords(wosRecordIter(isifile, fileStream = fileStream, stringPool = stringPool))
+
+def wosRecordIter(isifile, fileStream = None, stringPool = None):
+    """A generator that yields the [WOSRecords](../classes/WOSRecord.html#metaknowledge.WOS.WOSRecord) of _isifile_ one at a time, this is what [wosParser()](#metaknowledge.WOS.wosHandlers.wosParser) uses to read a file. When the generator finishes it returns (as the value of its `StopIteration`) the `BadWOSFile` error found or `None`.
+
+    # Parameters
+
+    _isifile_ : `str`
+
+    > The path to the target file
+
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _isifile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _isifile_ again. It is closed when the reading is done
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
+    # Returns
+
+    `generator[WOSRecord]`
+
+    > The `Records` in _isifile_, in the order they are found
+    """
     error = None
     try:
-        with open(isifile, 'r', encoding='utf-8-sig') as openfile:
+        with _openText(isifile if fileStream is None else fileStream, 'utf-8-sig') as openfile:
             f = enumerate(openfile, start = 0)
-            while "VR 1.0" not in f.__next__()[1]:
-                pass
-            notEnd = True
-            while notEnd:
-                line = f.__next__()
-                if line[1] == '':
-                    error =  BadWOSFile("'{}' does not have an 'EF', lines 1 to {} were checked".format(isifile, line[0] + 1))
-                elif line[1].isspace():
-                    continue
-                elif 'EF' in line[1][:2]:
-                    notEnd = False
-                    continue
-                else:
-                    try:
-                        plst.add(WOSRecord(itertools.chain([line], f), sFile = isifile, sLine = line[0]))
-                    except BadWOSFile as e:
-                        try:
-                            s = f.__next__()[1]
-                            while s[:2] != 'ER':
-                                s = f.__next__()[1]
-                        except:
-                            error =  BadWOSFile("The file {} was not terminated corrrectly caused the following error:\n{}".format(isifile, str(e)))
-            try:
-                f.__next__()
-            except StopIteration:
-                pass
+            for lineNum, line in f:
+                if "VR 1.0" in line:
+                    break
             else:
-                error =  BadWOSFile("EF not at end of " + isifile)
+                return BadWOSFile("The file '{}' ends before EF was found".format(isifile))
+            error = yield from _readWOSBody(f, isifile, stringPool = stringPool)
+    except UnicodeDecodeError:
+        try:
+            error =  BadWOSFile("'{}' has a unicode issue on line: {}.".format(isifile, f.__next__()[0]))
+        except:
+            #Fallback needed incase f.__next__() causes issues
+            error =  BadWOSFile("'{}' has a unicode issue. Probably when being opened or possibly on the first line".format(isifile))
+    return error
+
+def _readWOSBody(f, isifile, wosIndex = None, stringPool = None):
+    """A generator that yields the records from the enumerated lines _f_, which start after the header, and returns the error found in them (or `None`). Like the original `wosParser()` any unexpected exception ends the reading and the records found before it are kept.
+    """
+    error = None
+    try:
+        reachedEF, error = yield from _readWOSRecords(f, isifile, wosIndex = wosIndex, stringPool = stringPool)
+        if not reachedEF:
+            error =  BadWOSFile("The file '{}' ends before EF was found".format(isifile))
+        elif next(f, None) is not None:
+            error =  BadWOSFile("EF not at end of " + isifile)
     except UnicodeDecodeError:
         try:
             error =  BadWOSFile("'{}' has a unicode issue on line: {}.".format(isifile, f.__next__()[0]))
         except:
             #Fallback needed incase f.__next__() causes issues
             error =  BadWOSFile("'{}' has a unicode issue. Probably when being opened or possibly on the first line".format(isifile))
-    except StopIteration:
-        error =  BadWOSFile("The file '{}' ends before EF was found".format(isifile))
     except KeyboardInterrupt as e:
         error = e
     finally:
         if isinstance(error, KeyboardInterrupt):
             raise error
-        return plst, error
+        return error
+
+def _readWOSRecords(f, isifile, wosIndex = None, stringPool = None):
+    """A generator that yields the records from the enumerated lines _f_ until the line starting with `'EF'`. It returns a tuple of `True` if EF was found and the last error found (or `None`).
+
+    If _wosIndex_ is given _f_ must be its `lines()` and the records it can index are yielded unparsed.
+    """
+    error = None
+    for line in f:
+        if line[1] == '':
+            error =  BadWOSFile("'{}' does not have an 'EF', lines 1 to {} were checked".format(isifile, line[0] + 1))
+        elif line[1].isspace():
+            continue
+        elif 'EF' in line[1][:2]:
+            return True, error
+        else:
+            if wosIndex is not None:
+                R = wosIndex.indexRecord(f, line[0])
+                if R is not None:
+                    yield R
+                    continue
+            try:
+                R = WOSRecord(itertools.chain([line], f), sFile = isifile, sLine = line[0], stringPool = stringPool)
+            except BadWOSFile as e:
+                try:
+                    s = f.__next__()[1]
+                    while s[:2] != 'ER':
+                        s = f.__next__()[1]
+                except:
+                    error =  BadWOSFile("The file {} was not terminated corrrectly caused the following error:\n{}".format(isifile, str(e)))
+            else:
+                yield R
+    return False, error
+
+def _findWOSChunks(isifile, numChunks):
+    """Scans _isifile_ once, without decoding it, and splits the lines after the header into at most _numChunks_ ranges that each end on a line starting with `'ER'`, so no record is split between them.
+
+    # Returns
+
+    `list[tuple[int, int, int]]`
+
+    > The start byte, end byte and first line number of each range, or `None` if the header was not found
+    """
+    fileSize = os.path.getsize(isifile)
+    with open(isifile, 'rb') as openfile:
+        offset = 0
+        lineNum = 0
+        for line in openfile:
+            offset += len(line)
+            lineNum += 1
+            if b"VR 1.0" in line:
+                break
+        else:
+            return None
+        targetSize = max((fileSize - offset) // numChunks, 1)
+        chunks = []
+        chunkStart = offset
+        chunkLine = lineNum
+        for line in openfile:
+            offset += len(line)
+            lineNum += 1
+            if line[:2] == b'ER' and offset - chunkStart >= targetSize:
+                chunks.append((chunkStart, offset, chunkLine))
+                chunkStart = offset
+                chunkLine = lineNum
+        if offset > chunkStart:
+            chunks.append((chunkStart, offset, chunkLine))
+    return chunks
+
+def _parseWOSChunk(isifile, start, end, startLine, lastChunk):
+    """Parses the records in the bytes _start_ to _end_ of _isifile_, the first of which is on line _startLine_. _lastChunk_ should be `True` if the bytes go to the end of the file. This is used by the worker processes of [wosParser()](#metaknowledge.WOS.wosHandlers.wosParser).
+
+    # Returns
+
+    `tuple[set[WOSRecord], Exception, bool]`
+
+    > The records, the error (or `None`) and `True` if the end of the file was reached in the chunk, i.e. EF was found or the chunk could not be decoded
+    """
+    plst = set()
+    with open(isifile, 'rb') as openfile:
+        openfile.seek(start)
+        chunkLines = io.TextIOWrapper(io.BytesIO(openfile.read(end - start)), encoding = 'utf-8')
+    f = enumerate(chunkLines, start = startLine)
+    records = _readWOSRecords(f, isifile)
+    try:
+        while True:
+            plst.add(next(records))
+    except StopIteration as e:
+        reachedEF, error = e.value
+    except UnicodeDecodeError:
+        return plst, BadWOSFile("'{}' has a unicode issue in the lines following line: {}.".format(isifile, startLine)), True
+    except Exception:
+        #A serial read stops at unexpected errors and keeps what it has, so this does the same
+        return plst, None, True
+    if not reachedEF:
+        return plst, error, False
+    elif next(f, None) is not None or not lastChunk:
+        error =  BadWOSFile("EF not at end of " + isifile)
+    return plst, error, True
+
+def _parallelWOSParser(isifile, chunks, workers):
+    """Parses the _chunks_ of _isifile_ found by `_findWOSChunks()` with a pool of _workers_ processes and merges them in order, as if the file had been read serially."""
+    plst = set()
+    error = None
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(_parseWOSChunk, isifile, *chunk, lastChunk = (i == len(chunks) - 1)) for i, chunk in enumerate(chunks)]
+        try:
+            for future in futures:
+                recs, chunkError, reachedEnd = future.result()
+                plst |= recs
+                if chunkError is not None:
+                    error = chunkError
+                if reachedEnd:
+                    #Anything after EF is ignored, like in a serial read
+                    break
+            else:
+                error =  BadWOSFile("The file '{}' ends before EF was found".format(isifile))
+        finally:
+            for future in futures:
+                future.cancel()
+    return plst, error
+
+class WOSFileIndex(object):
+    """The backing store of lazily read [WOSRecords](../classes/WOSRecord.html#metaknowledge.WOS.WOSRecord). It memory maps _isifile_ to scan it and keeps, for each WOS number, the byte offset, byte length and first line number of its record, so the tags of a record can be parsed when they are first needed.
+
+    Once the file is scanned the map should be closed with `close()`, or by using the index as a context manager, so no file is held open by it. The bytes of a record are then read from the file each time it is parsed.
+
+    These are created by [lazyWOSRecordIter()](#metaknowledge.WOS.wosHandlers.lazyWOSRecordIter), which closes them when it is done, the file must not be modified while they are in use.
+
+    # Parameters
+
+    _isifile_ : `str`
+
+    > The path to the WOS file
+    """
+    def __init__(self, isifile):
+        self.isifile = isifile
+        self.offsets = {}
+        with open(isifile, 'rb') as openfile:
+            self.mmap = mmap.mmap(openfile.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the memory map, and with it the file, the records can still be read"""
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+
+    @property
+    def closed(self):
+        """`True` if the memory map is closed"""
+        return self.mmap is None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, wosNum):
+        return wosNum in self.offsets
+
+    def lines(self):
+        """Gives the lines of the file, enumerated, as they would be read from it in text mode"""
+        return _MappedLines(self.mmap)
+
+    def recordBytes(self, wosNum):
+        """Gives the bytes of the record with the WOS number _wosNum_ in the file"""
+        offset, length, sLine = self.offsets[wosNum]
+        if self.mmap is None:
+            with open(self.isifile, 'rb') as openfile:
+                openfile.seek(offset)
+                return openfile.read(length)
+        else:
+            return self.mmap[offset:offset + length]
+
+    def recordLines(self, wosNum):
+        """Gives the lines of the record with the WOS number _wosNum_, enumerated by their line numbers in the file, as [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) expects them.
+        """
+        recordText = io.TextIOWrapper(io.BytesIO(self.recordBytes(wosNum)), encoding = 'utf-8')
+        return enumerate(recordText, start = self.offsets[wosNum][2])
+
+    def indexRecord(self, f, lineNum):
+        """Checks the record whose first line, _lineNum_, was just read from _f_ (the `lines()` of this index). If [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) would accept it unchanged and its WOS number is new, it is added to the index, _f_ is moved past it and an unparsed `WOSRecord` is returned. Otherwise `None` is returned and _f_ is left as it was, so the record can be read normally.
+        """
+        recordStart = f.lineStart
+        if recordStart is None:
+            return None
+        lineEnd = self.mmap.tell()
+        recordEnd, wosNum = _scanWOSRecord(self.mmap, recordStart)
+        if recordEnd is None or wosNum in self.offsets:
+            self.mmap.seek(lineEnd)
+            return None
+        recordBytes = self.mmap[recordStart:recordEnd]
+        try:
+            recordBytes.decode('utf-8')
+        except UnicodeDecodeError:
+            self.mmap.seek(lineEnd)
+            return None
+        self.offsets[wosNum] = (recordStart, recordEnd - recordStart, lineNum)
+        f.lineNum += recordBytes.count(b'\n') - 1
+        return WOSRecord(LazyFieldDict(self, wosNum), sFile = self.isifile, sLine = lineNum)
+
+class _MappedLines(object):
+    """Iterates over the lines of a memory mapped file like `enumerate()` over the file opened in text mode (`utf-8-sig` with universal newlines), but as each line is read from the `mmap` its byte offset is known, `lineStart`, and the `mmap` can be moved past lines without decoding them. `lineStart` is `None` when a line was split off a longer one by a lone `'\\r'`.
+    """
+    def __init__(self, fileMap):
+        self.fileMap = fileMap
+        self.lineNum = -1
+        self.lineStart = None
+        self._pending = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pending:
+            self.lineStart = None
+            line = self._pending.pop(0)
+        else:
+            self.lineStart = self.fileMap.tell()
+            line = self.fileMap.readline()
+            if line == b'':
+                raise StopIteration
+            line = line.decode('utf-8-sig' if self.lineStart == 0 else 'utf-8')
+            if '\r' in line:
+                splitLines = line.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+                self._pending = [l + '\n' for l in splitLines[1:-1]]
+                if splitLines[-1]:
+                    self._pending.append(splitLines[-1])
+                line = splitLines[0] + '\n'
+        self.lineNum += 1
+        return self.lineNum, line
+
+def lazyWOSParser(isifile):
+    """Reads _isifile_ like [wosParser()](#metaknowledge.WOS.wosHandlers.wosParser) but the file is scanned through a memory map and the records only store where they are in it, their tags are parsed when they are first accessed and can be dropped again with [release()](../classes/WOSRecord.html#metaknowledge.WOS.WOSRecord.release). This is used by [RecordCollections](../classes/RecordCollection.html#metaknowledge.RecordCollection) created with `lazy = True`.
+
+    # Parameters
+
+    _isifile_ : `str`
+
+    > The path to the target file
+
+    # Returns
+
+    `set[WOSRecord]`
+
+    > All the `Records` found in _isifile_
+    """
+    return _collectRecords(lazyWOSRecordIter(isifile))
+
+def lazyWOSRecordIter(isifile):
+    """A generator that yields the same records of _isifile_, in the same order and with the same errors (although the line given for a unicode issue can differ), as [wosRecordIter()](#metaknowledge.WOS.wosHandlers.wosRecordIter) but without parsing them, see [lazyWOSParser()](#metaknowledge.WOS.wosHandlers.lazyWOSParser).
+
+    The file is scanned as bytes, checking only what [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) would reject. Records that could be malformed, have an already seen WOS number or are not valid utf-8 are parsed immediately, as by `wosRecordIter()`. The memory map is closed when the generator finishes or is closed, so reading many files does not use up the open file limit.
+
+    # Parameters
+
+    _isifile_ : `str`
+
+    > The path to the target file
+
+    # Returns
+
+    `generator[WOSRecord]`
+
+    > The `Records` in _isifile_, in the order they are found
+    """
+    try:
+        wosIndex = WOSFileIndex(isifile)
+    except ValueError:
+        #Empty files cannot be memory mapped
+        return (yield from wosRecordIter(isifile))
+    with wosIndex:
+        f = wosIndex.lines()
+        try:
+            for lineNum, line in f:
+                if "VR 1.0" in line:
+                    break
+            else:
+                return BadWOSFile("The file '{}' ends before EF was found".format(isifile))
+        except UnicodeDecodeError:
+            return BadWOSFile("'{}' has a unicode issue on line: {}.".format(isifile, f.lineNum + 1))
+        return (yield from _readWOSBody(f, isifile, wosIndex = wosIndex))
+
+def _scanWOSRecord(fileMap, recordStart):
+    """Reads the record starting at byte _recordStart_ of _fileMap_ and checks it would be accepted by [recordParser()](#metaknowledge.WOS.recordWOS.recordParser) and read the same way in text mode.
+
+    # Returns
+
+    `tuple[int, str]`
+
+    > The byte after the record's `'ER'` line and its WOS number, or `(None, None)` if the record must be read normally
+    """
+    fileMap.seek(recordStart)
+    tags = set()
+    wosNum = None
+    lastTag = None
+    for line in iter(fileMap.readline, b''):
+        if line[-1:] != b'\n' or b'\r' in line[:-2] or not all(b < 0x80 for b in line[:3]):
+            return None, None
+        elif line[:2] == b'ER':
+            if wosNum is None:
+                return None, None
+            return fileMap.tell(), wosNum
+        elif line[2:3] != b' ':
+            return None, None
+        elif line[:3] == b'   ':
+            if lastTag is None or lastTag == b'UT':
+                return None, None
+        else:
+            lastTag = line[:2]
+            if lastTag in tags:
+                return None, None
+            tags.add(lastTag)
+            if lastTag == b'UT':
+                try:
+                    wosNum = line[3:-2 if line[-2:] == b'\r\n' else -1].decode('utf-8')
+                except UnicodeDecodeError:
+                    return None, None
+    return None, None
@@ -30,20 +30,22 @@ Citations are handled by a special [Citation](./documentation/classes/Citation.h
 Note for those reading the docstrings metaknowledge's docs are written in markdown and are processed to produce the documentation found at [metaknowledge.readthedocs.io](https://metaknowledge.readthedocs.io/en/latest/), but you should have no problem reading them from the help function.
 """
 
-from .constants import VERBOSE_MODE, __version__, commonRecordFields, FAST_CITES
+from .constants import VERBOSE_MODE, __version__, commonRecordFields, FAST_CITES, LAZY_CITES, NUM_WORKERS
 from .mkExceptions import BadCitation, BadGrant, BadInputFile, BadProQuestFile, BadProQuestRecord, BadPubmedFile, BadPubmedRecord, BadRecord, BadWOSFile, BadWOSRecord, CollectionTypeError, GrantCollectionException, RCTypeError, RCValueError, RecordsNotCompatible, UnknownFile, cacheError, mkException, TagError, BadScopusRecord
 
 from .graphHelpers import writeEdgeList, writeNodeAttributeFile, writeGraph, readGraph, dropEdges, dropNodesByDegree, dropNodesByCount, mergeGraphs, graphStats, writeTnetFile
 from .diffusion import diffusionGraph, diffusionCount, diffusionAddCountsFromSource
 
-from .citation import Citation, filterNonJournals
-from .mkCollection import Collection, CollectionWithIDs
+from .citation import Citation, FastCitation, filterNonJournals, fastCitation, cachedCitation, setCitationCacheSize, clearCitationCache
+from .mkCollection import Collection, CollectionWithIDs, rankedSeries
+from .aggregation import aggregateCounts, SpaceSavingCounter
 from .mkRecord import Record, ExtendedRecord
 
 from .grantCollection import GrantCollection
 from .grants import NSERCGrant, CIHRGrant, MedlineGrant, NSFGrant, Grant, FallbackGrant
 
-from .recordCollection import RecordCollection
+from .recordCollection import RecordCollection, rpys, localCiteStats, mergeRecords, linkRecords
+from .fileHandlers import iterRecords
 from .WOS import WOSRecord
 from .medline import MedlineRecord
 from .proquest import ProQuestRecord
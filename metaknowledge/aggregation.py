@@ -0,0 +1,473 @@
+"""Counting the values of many tags of `Records` in one pass, this is what [rankedSeries()](./mkCollection.html#metaknowledge.mkCollection.rankedSeries), [timeSeries()](./classes/Collection.html#metaknowledge.CollectionWithIDs.timeSeries), [cooccurrenceCounts()](./classes/Collection.html#metaknowledge.CollectionWithIDs.cooccurrenceCounts), [localCiteStats()](./recordCollection.html#metaknowledge.recordCollection.localCiteStats) and [glimpse()](./classes/Collection.html#metaknowledge.CollectionWithIDs.glimpse) are built on.
+
+Each count is given by a spec, a tuple of its kind and the tags it uses, or just a tag for the most common kind, `'count'`:
+
++ `('count', tag)` counts the occurrences of each value of _tag_, as in `rankedSeries()`
++ `('yearCount', tag)` counts the occurrences of each value of _tag_ in each year, as in `timeSeries()`, if _tag_ is `None` the `Records` themselves are counted
++ `('cooccurrence', keyTag, tag1, tag2, ...)` counts the occurrences of each value of the tags with each value of _keyTag_, as in `cooccurrenceCounts()`
++ `('citeCount', keyType)` counts the citations, or their `'journal'`, `'year'` or `'author'`, as in `localCiteStats()`
++ `('topCount', tag, maxEntries)` and `('topCiteCount', keyType, maxEntries)` are approximate versions of `'count'` and `'citeCount'` that only keep _maxEntries_ values, using a [SpaceSavingCounter](#metaknowledge.aggregation.SpaceSavingCounter), so their memory use does not grow with the number of distinct values
+
+`'count'`, `'yearCount'` and `'topCount'` can also be given a collection of values after their other arguments, e.g. `('count', tag, limitTo)`, then only the values in _limitTo_ are counted, as with the _limitTo_ of `rankedSeries()` and `timeSeries()`
+"""
+import concurrent.futures
+import csv
+import heapq
+import itertools
+
+from .progressBar import _ProgressBar
+from .mkExceptions import mkException
+
+import metaknowledge
+
+#The number of Records counted in a worker process at once by aggregateCounts()
+aggregationChunkSize = 2**12
+
+def aggregateCounts(records, *specs, workers = 1):
+    """Counts the values of the `Records` given by each of the _specs_ (see [above](#metaknowledge.aggregation)) in one pass over _records_, so getting many counts of the same records costs little more than getting one.
+
+    # Parameters
+
+    _records_ : `iterable[Record]`
+
+    > The `Records` to be counted
+
+    _specs_ : `str or tuple, str or tuple, ...`
+
+    > Any number of specs, each a tag to be counted or a tuple of the kind of count and its tags
+
+    _workers_ : `optional [int]`
+
+    > Default `1`, the number of processes the records are split between. The records and the counts have to be sent between the processes so this is only faster when the tags are expensive to process, e.g. `'citations'`, and the processed values are not kept by the `Records`
+
+    # Returns
+
+    `list[dict]`
+
+    > The counts for each of the _specs_, in the same order, each is a `dict` mapping the values to their counts, or for `'yearCount'` and `'cooccurrence'` to `dicts` of years or values to counts, or for `'topCount'` and `'topCiteCount'` a `SpaceSavingCounter`
+    """
+    specs = [_normalizeSpec(spec) for spec in specs]
+    try:
+        recCount = len(records)
+    except TypeError:
+        #Generators have no length
+        recCount = None
+    progArgs = (0, "Starting to count {} specs".format(len(specs)))
+    if metaknowledge.VERBOSE_MODE:
+        progKwargs = {'dummy' : False}
+    else:
+        progKwargs = {'dummy' : True}
+    with _ProgressBar(*progArgs, **progKwargs) as PBar:
+        if workers > 1:
+            records = list(records)
+            chunks = [records[i:i + aggregationChunkSize] for i in range(0, len(records), aggregationChunkSize)]
+            counts = [_newCounts(spec) for spec in specs]
+            with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+                for i, chunkCounts in enumerate(executor.map(_countRecords, chunks, itertools.repeat(specs)), start = 1):
+                    PBar.updateVal(i / len(chunks), "Counted {} of {} chunks".format(i, len(chunks)))
+                    for count, chunkCount in zip(counts, chunkCounts):
+                        if isinstance(count, SpaceSavingCounter):
+                            count.merge(chunkCount)
+                        else:
+                            _mergeCounts(count, chunkCount)
+        else:
+            counts = _countRecords(records, specs, PBar = PBar, recCount = recCount)
+        PBar.finish("Done counting {} specs".format(len(specs)))
+    return counts
+
+def _normalizeSpec(spec):
+    if isinstance(spec, str):
+        return ('count', spec)
+    spec = tuple(spec)
+    if len(spec) < 2 or spec[0] not in _countFuncs:
+        raise mkException("{} is not a valid spec, it must be a tag or a tuple of one of '{}' and tags".format(spec, "', '".join(_countFuncs)))
+    elif spec[0] in ('citeCount', 'topCiteCount') and spec[1] not in ('citation', 'journal', 'year', 'author'):
+        raise mkException("{} is not a valid key type, only 'citation', 'journal', 'year' or 'author' are.".format(spec[1]))
+    elif spec[0] in _approximateKinds and (len(spec) < 3 or (len(spec) > 3 and spec[0] not in _limitedKinds) or not isinstance(spec[2], int) or spec[2] < 1):
+        raise mkException("{} is not a valid spec, '{}' must be given a tag and a positive int, the maximum number of entries.".format(spec, spec[0]))
+    elif spec[0] in _limitedKinds:
+        argCount = _limitedKinds[spec[0]]
+        if len(spec) > argCount + 2:
+            raise mkException("{} is not a valid spec, '{}' can only be given {} arguments and the values to limit the count to.".format(spec, spec[0], argCount))
+        elif len(spec) == argCount + 2:
+            limitTo = spec[-1]
+            if not limitTo:
+                limitTo = None
+            else:
+                try:
+                    limitTo = frozenset(limitTo)
+                except TypeError:
+                    #Unhashable values can still be checked with in
+                    pass
+            spec = spec[:-1] + (limitTo,)
+    return spec
+
+def _newCounts(spec):
+    if spec[0] in _approximateKinds:
+        return SpaceSavingCounter(spec[2])
+    else:
+        return {}
+
+def _countRecords(records, specs, PBar = None, recCount = None):
+    #Does the counting of aggregateCounts(), it is a module level function so it can be sent to worker processes
+    counters = [(_countFuncs[spec[0]], _newCounts(spec), spec[1:]) for spec in specs]
+    for i, R in enumerate(records, start = 1):
+        if PBar and i % 1000 == 0:
+            PBar.updateVal(i / recCount if recCount else 0, "Counted {} Records".format(i))
+        for countFunc, counts, tags in counters:
+            countFunc(counts, R, *tags)
+    return [counts for countFunc, counts, tags in counters]
+
+def _mergeCounts(counts, otherCounts):
+    #Adds otherCounts to counts, the counts can be nested dicts
+    for key, count in otherCounts.items():
+        if key not in counts:
+            counts[key] = count
+        elif isinstance(count, dict):
+            _mergeCounts(counts[key], count)
+        else:
+            counts[key] += count
+
+def _count(counts, R, tag, limitTo = None):
+    #This should be faster than using get, since get is a wrapper for __getitem__
+    try:
+        val = R[tag]
+    except KeyError:
+        return
+    if not isinstance(val, list):
+        val = [val]
+    for entry in val:
+        if limitTo is not None and entry not in limitTo:
+            continue
+        if entry in counts:
+            counts[entry] += 1
+        else:
+            counts[entry] = 1
+
+def _yearCount(counts, R, tag, limitTo = None):
+    try:
+        year = R['year']
+    except KeyError:
+        return
+    if tag is None:
+        counts[R] = {year : 1}
+        return
+    try:
+        val = R[tag]
+    except KeyError:
+        return
+    if not isinstance(val, list):
+        val = [val]
+    for entry in val:
+        if limitTo is not None and entry not in limitTo:
+            continue
+        if entry in counts:
+            try:
+                counts[entry][year] += 1
+            except KeyError:
+                counts[entry][year] = 1
+        else:
+            counts[entry] = {year : 1}
+
+def _cooccurrence(counts, R, keyTag, *countedTags):
+    keyVal = R.get(keyTag)
+    if keyVal is None:
+        return
+    if not isinstance(keyVal, list):
+        keyVal = [keyVal]
+    for key in keyVal:
+        if key not in counts:
+            counts[key] = {}
+    for tag in countedTags:
+        tagval = R.get(tag)
+        if tagval is None:
+            continue
+        if not isinstance(tagval, list):
+            tagval = [tagval]
+        for val in tagval:
+            for key in keyVal:
+                try:
+                    counts[key][val] += 1
+                except KeyError:
+                    counts[key][val] = 1
+
+def _citeCount(counts, R, keyType):
+    rCites = R.get('citations')
+    if rCites:
+        for c in rCites:
+            if keyType == 'citation':
+                cVal = c
+            else:
+                cVal = getattr(c, keyType)
+                if cVal is None:
+                    continue
+            if cVal in counts:
+                counts[cVal] += 1
+            else:
+                counts[cVal] = 1
+
+def _topCount(counter, R, tag, maxEntries, limitTo = None):
+    try:
+        val = R[tag]
+    except KeyError:
+        return
+    if not isinstance(val, list):
+        val = [val]
+    for entry in val:
+        if limitTo is None or entry in limitTo:
+            counter.add(entry)
+
+def _topCiteCount(counter, R, keyType, maxEntries):
+    rCites = R.get('citations')
+    if rCites:
+        for c in rCites:
+            if keyType == 'citation':
+                counter.add(c)
+            else:
+                cVal = getattr(c, keyType)
+                if cVal is not None:
+                    counter.add(cVal)
+
+_countFuncs = {
+    'count' : _count,
+    'yearCount' : _yearCount,
+    'cooccurrence' : _cooccurrence,
+    'citeCount' : _citeCount,
+    'topCount' : _topCount,
+    'topCiteCount' : _topCiteCount,
+}
+
+#The kinds of spec that give a SpaceSavingCounter instead of a dict
+_approximateKinds = {'topCount', 'topCiteCount'}
+
+#The kinds of spec that can be given the values to limit the count to, with the number of arguments they take before it
+_limitedKinds = {'count' : 1, 'yearCount' : 1, 'topCount' : 2}
+
+class SpaceSavingCounter(object):
+    """A counter that keeps at most _maxEntries_ values, so it can find the most common values of a stream with any number of distinct values in fixed memory. It uses the space-saving algorithm of Metwally, Agrawal and El Abbadi (2005): when a new value arrives and the counter is full the value with the lowest count is dropped and the new one takes its count plus one.
+
+    The counts are never too low and are too high by at most the total number of values added divided by _maxEntries_, so `1 / maxEntries` is the error bound as a fraction of the total. Any value occurring more often than the bound is guaranteed to be kept. The exact amount a count might be too high is given by [error()](#metaknowledge.aggregation.SpaceSavingCounter.error).
+
+    A `SpaceSavingCounter` has the reading methods of a `dict`, `items()`, `keys()`, `values()`, `get()`, `len()` and `in`, with the estimated counts as values.
+
+    ```
+    >>> counter = SpaceSavingCounter(1000)
+    >>> for R in metaknowledge.iterRecords('savedrecs.txt'):
+    ...     for c in R.get('citations', []):
+    ...         counter.add(c)
+    >>> counter.mostCommon(20)
+    ```
+
+    # Parameters
+
+    _maxEntries_ : `int`
+
+    > The number of values kept
+    """
+    __slots__ = ('maxEntries', 'total', 'counts', 'errors', '_heap', '_pushCount')
+
+    def __init__(self, maxEntries):
+        if maxEntries < 1:
+            raise mkException("A SpaceSavingCounter must keep at least 1 entry, not {}.".format(maxEntries))
+        self.maxEntries = maxEntries
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        #The heap has one entry per kept value, the entries' counts can be lower than the values' current counts as they are only updated when they reach the top
+        self._heap = []
+        self._pushCount = 0
+
+    def __getstate__(self):
+        return {'maxEntries' : self.maxEntries, 'total' : self.total, 'counts' : self.counts, 'errors' : self.errors}
+
+    def __setstate__(self, state):
+        self.maxEntries = state['maxEntries']
+        self.total = state['total']
+        self.counts = state['counts']
+        self.errors = state['errors']
+        self._rebuildHeap()
+
+    def _rebuildHeap(self):
+        #The push count breaks ties so the values are never compared
+        self._heap = [(c, i, v) for i, (v, c) in enumerate(self.counts.items())]
+        self._pushCount = len(self._heap)
+        heapq.heapify(self._heap)
+
+    def _popMin(self):
+        #Removes and returns the value with the lowest count, fixing any out of date entries it finds
+        heap = self._heap
+        while True:
+            count, i, val = heapq.heappop(heap)
+            if self.counts[val] == count:
+                return val
+            self._pushCount += 1
+            heapq.heappush(heap, (self.counts[val], self._pushCount, val))
+
+    def add(self, val, count = 1):
+        """Adds _count_ occurrences of _val_
+
+        # Parameters
+
+        _val_ : `hashable`
+
+        > The value to be counted
+
+        _count_ : `optional [int]`
+
+        > Default `1`, the number of times _val_ occurred
+        """
+        self.total += count
+        counts = self.counts
+        if val in counts:
+            counts[val] += count
+            return
+        if len(counts) < self.maxEntries:
+            newCount = count
+            self.errors[val] = 0
+        else:
+            minVal = self._popMin()
+            minCount = counts.pop(minVal)
+            del self.errors[minVal]
+            newCount = minCount + count
+            self.errors[val] = minCount
+        counts[val] = newCount
+        self._pushCount += 1
+        heapq.heappush(self._heap, (newCount, self._pushCount, val))
+
+    def merge(self, other):
+        """Adds the counts of the `SpaceSavingCounter` _other_ to this one, keeping the largest _maxEntries_. The error bound of the result is the sum of the two error bounds, as in Agarwal et al.'s (2012) mergeable summaries.
+
+        # Parameters
+
+        _other_ : `SpaceSavingCounter`
+
+        > The counter to be added
+        """
+        #A full counter may have dropped any value it does not have, so they could have occurred as often as its lowest count
+        selfMin = min(self.counts.values()) if len(self.counts) >= self.maxEntries else 0
+        otherMin = min(other.counts.values()) if len(other.counts) >= other.maxEntries else 0
+        counts = {}
+        errors = {}
+        for val in itertools.chain(self.counts, other.counts):
+            if val in counts:
+                continue
+            counts[val] = self.counts.get(val, selfMin) + other.counts.get(val, otherMin)
+            errors[val] = self.errors.get(val, selfMin) + other.errors.get(val, otherMin)
+        if len(counts) > self.maxEntries:
+            counts = dict(heapq.nlargest(self.maxEntries, counts.items(), key = lambda x: x[1]))
+            errors = {v : errors[v] for v in counts}
+        self.counts = counts
+        self.errors = errors
+        self.total += other.total
+        self._rebuildHeap()
+
+    def error(self, val):
+        """Gives the most the count of _val_ can be too high by, for values not in the counter this is the highest their count could be.
+
+        # Parameters
+
+        _val_ : `hashable`
+
+        > The value to be checked
+
+        # Returns
+
+        `int`
+
+        > The maximum error
+        """
+        try:
+            return self.errors[val]
+        except KeyError:
+            if len(self.counts) < self.maxEntries:
+                return 0
+            else:
+                return min(self.counts.values())
+
+    def mostCommon(self, n = None):
+        """Gives the _n_ values with the highest counts and their counts, ordered from highest to lowest
+
+        # Parameters
+
+        _n_ : `optional [int]`
+
+        > Default `None`, the number of values to give, if `None` all of them are given
+
+        # Returns
+
+        `list[tuple[value, int]]`
+
+        > The values with their estimated counts
+        """
+        if n is None:
+            return sorted(self.counts.items(), key = lambda x: x[1], reverse = True)
+        else:
+            return heapq.nlargest(n, self.counts.items(), key = lambda x: x[1])
+
+    def items(self):
+        return self.counts.items()
+
+    def keys(self):
+        return self.counts.keys()
+
+    def values(self):
+        return self.counts.values()
+
+    def get(self, val, default = None):
+        return self.counts.get(val, default)
+
+    def __getitem__(self, val):
+        return self.counts[val]
+
+    def __contains__(self, val):
+        return val in self.counts
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __repr__(self):
+        return "<{} of {} entries, {} counted>".format(type(self).__name__, len(self.counts), self.total)
+
+def _rankCounts(seriesDict, giveCounts = True, giveRanks = False, greatestFirst = True, pandasMode = True, outputFile = None, tag = None):
+    #The ordering and ranking of rankedSeries() from counts made by aggregateCounts()
+    seriesList = sorted(seriesDict.items(), key = lambda x: x[1], reverse = greatestFirst)
+    if outputFile is not None:
+        with open(outputFile, 'w') as f:
+            writer = csv.writer(f, dialect = 'excel')
+            writer.writerow((str(tag), 'count'))
+            writer.writerows(seriesList)
+    if giveCounts and not pandasMode:
+        return seriesList
+    elif giveRanks or pandasMode:
+        if not greatestFirst:
+            seriesList.reverse()
+        currentRank = 1
+        retList = []
+        panDict = {'entry' : [], 'count' : [], 'rank' : []}
+        try:
+            currentCount = seriesList[0][1]
+        except IndexError:
+            #Empty series so no need to loop
+            pass
+        else:
+            for valString, count in seriesList:
+                if currentCount > count:
+                    currentRank += 1
+                    currentCount = count
+                if pandasMode:
+                    panDict['entry'].append(valString)
+                    panDict['count'].append(count)
+                    panDict['rank'].append(currentRank)
+                else:
+                    retList.append((valString, currentRank))
+        if not greatestFirst:
+            retList.reverse()
+        if pandasMode:
+            return panDict
+        else:
+            return retList
+    else:
+        return [e for e,c in seriesList]
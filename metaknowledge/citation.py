@@ -5,6 +5,7 @@ try:
 except ImportError:
     import collections
     collections.abc = collections
+import functools
 import re
 
 from .mkExceptions import BadCitation
@@ -15,6 +16,9 @@ import metaknowledge
 #For journalAbbreviations, to reduce the number of times we read the dict
 abbrevDict = None
 
+#The default number of distinct citation strings cachedCitation() keeps
+citationCacheSize = 2**16
+
 class Citation(collections.abc.Hashable):
     """A class to hold citation strings and allow for comparison between them.
 
@@ -38,6 +42,8 @@ class Citation(collections.abc.Hashable):
 
     Citation's hashing and equality checking are based on [ID()](#metaknowledge.citation.Citation.ID) and use the values of `author`, `year` and `journal`.
 
+    If `metaknowledge.LAZY_CITES` is `True` when a WOS Citation is created, its `author`, `year` and `journal` are usually found with a simpler regex than the full parse and the other fields are only parsed when one of them is first used. This makes creating and comparing citations faster, e.g. for citation networks with `nodeType = 'full'`, but reading their fields slower, so it is `False` by default.
+
     When converted to a string a Citation will return the original string.
 
     # Attributes
@@ -60,18 +66,33 @@ class Citation(collections.abc.Hashable):
     """
     wosCiteRegex = re.compile(r"([^0-9,][^,]+)?(, )?(-?[0-9]{1,5})?(, )?([^,]+)?(, (V[^,]+))?(, (P[^,]+))?($|, DOI (.+)|((.+?)(, DOI (.+))?))")
 
+    #The author, year and journal of a WOS citation, when this matches they are the same as what wosCiteRegex gives, so the ID can be found without the full parse
+    wosIDRegex = re.compile(r"([^0-9,][^,]+), (-?[0-9]{1,5}), ([^,]+)(?:, |\Z)")
+
+    #The attributes set by the full parse of a WOS citation
+    _parsedAttributes = frozenset(('author', 'year', 'journal', 'V', 'P', 'DOI', 'misc', 'bad', 'error'))
+
+    #Set by __hash__(), it is a class attribute so looking it up does not go to __getattr__()
+    _hash = None
+
     scopusCiteRegex = re.compile(r"([\w\- ]+,? [\w\.\-]+\.), (([\w\- ]+,? [\w\-\.]+\., )+)?([^(]+? )?\((\d{2,5})\) ([^,]+)(, ([\w-]+)( \(([\w-]*)\))?)?(, P?P\. ([\w-]*))?(.*)")
 
 
     #(.*?, )?[^,(]*\((\d{2,5}\))[^,]*(, [^,(]*( \(\d+\))?)?(, (p?p\. .*))?")
 
+    def __new__(cls, cite = None, scopusMode = False):
+        #With FAST_CITES the WOS citations are FastCitations, cite is None when unpickling
+        if cls is Citation and cite is not None and not scopusMode and metaknowledge.FAST_CITES:
+            cls = FastCitation
+        return super().__new__(cls)
+
     def __init__(self, cite, scopusMode = False):
         #save original
         #setup attributes
         #Nunez R., 1998, MATH COGNITION, V4, P85, DOI 10.1080/135467998387343
         #Author, Year, Journal, Volume, Page, DOI
         if scopusMode:
-            regex = re.match(self.scopusCiteRegex, cite.upper())
+            regex = self.scopusCiteRegex.match(cite.upper())
             if regex is None:
                 self.bad = True
                 self.error = BadCitation("Regex parsing failed on a Scopus Citation this means the Citation is likely for a non-journal.")
@@ -102,56 +123,74 @@ class Citation(collections.abc.Hashable):
                         atrLst.append(self.journal)
                     self._id =  ', '.join(atrLst)
         else:
-            regex = re.match(self.wosCiteRegex, cite.upper())
-            if regex is None:
-                self.bad = True
-                self.error = BadCitation("Regex parsing failed.")
-            try:
-                self.author = regex.group(1).replace('.', '').title()
-            except AttributeError:
-                self.author = None
-            try:
-                self.year = int(regex.group(3))
-            except TypeError:
-                self.year = None
-            self.journal = regex.group(5)
-            self.V = regex.group(7)
-            self.P = regex.group(9)
-            self.DOI = regex.group(11)
-            if regex.group(12) is not None:
-                self.misc = regex.group(12)
-                self.DOI = regex.group(15)
-                self.bad = True
-                self.error = BadCitation("The citation did not fully match the expected pattern")
-                atrLst = []
-                if self.author:
-                    atrLst.append(self.author)
-                if self.year:
-                    atrLst.append(str(self.year))
-                if self.journal:
-                    atrLst.append(self.journal)
-                self._id =  ', '.join(atrLst)
-            elif self.author is None or self.year is None or self.journal is None:
-                self.bad = True
-                self.misc = None
-                self.error = BadCitation("Not a complete set of author, year and journal")
-                atrLst = []
-                if self.author:
-                    atrLst.append(self.author)
-                if self.year:
-                    atrLst.append(str(self.year))
-                if self.journal:
-                    atrLst.append(self.journal)
-                self._id =  ', '.join(atrLst)
+            #With LAZY_CITES the fields are only parsed when one of them is used, see __getattr__(), unless the ID cannot be found without them
+            idMatch = None if not metaknowledge.LAZY_CITES or metaknowledge.FAST_CITES or '\n' in cite else self.wosIDRegex.match(cite.upper())
+            if idMatch is not None and int(idMatch.group(2)) != 0:
+                self._id = "{0}, {1}, {2}".format(idMatch.group(1).replace('.', '').title(), int(idMatch.group(2)), idMatch.group(3))
             else:
-                self.bad = False
-                self.error = None
-                self.misc = None
-                self._id =  "{0}, {1}, {2}".format(self.author, self.year, self.journal)
+                self._parseWOS(cite)
         if not metaknowledge.FAST_CITES:
             self.original = cite
+
+    def _parseWOS(self, cite):
+        #Reads all the fields of the WOS citation string cite
+        regex = self.wosCiteRegex.match(cite.upper())
+        if regex is None:
+            self.bad = True
+            self.error = BadCitation("Regex parsing failed.")
+        try:
+            self.author = regex.group(1).replace('.', '').title()
+        except AttributeError:
+            self.author = None
+        try:
+            self.year = int(regex.group(3))
+        except TypeError:
+            self.year = None
+        self.journal = regex.group(5)
+        self.V = regex.group(7)
+        self.P = regex.group(9)
+        self.DOI = regex.group(11)
+        if regex.group(12) is not None:
+            self.misc = regex.group(12)
+            self.DOI = regex.group(15)
+            self.bad = True
+            self.error = BadCitation("The citation did not fully match the expected pattern")
+            atrLst = []
+            if self.author:
+                atrLst.append(self.author)
+            if self.year:
+                atrLst.append(str(self.year))
+            if self.journal:
+                atrLst.append(self.journal)
+            self._id =  ', '.join(atrLst)
+        elif self.author is None or self.year is None or self.journal is None:
+            self.bad = True
+            self.misc = None
+            self.error = BadCitation("Not a complete set of author, year and journal")
+            atrLst = []
+            if self.author:
+                atrLst.append(self.author)
+            if self.year:
+                atrLst.append(str(self.year))
+            if self.journal:
+                atrLst.append(self.journal)
+            self._id =  ', '.join(atrLst)
         else:
-            self = self._id
+            self.bad = False
+            self.error = None
+            self.misc = None
+            self._id =  "{0}, {1}, {2}".format(self.author, self.year, self.journal)
+
+    def __getattr__(self, name):
+        #This is only called when name is not found, the fields of lazily made Citations are parsed when one of them is first used
+        if name in self._parsedAttributes and 'bad' not in self.__dict__ and 'original' in self.__dict__:
+            self._finishParse()
+            return getattr(self, name)
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def _finishParse(self):
+        #Parses the fields of a lazily made Citation
+        self._parseWOS(self.original)
 
     def __str__(self):
         """
@@ -175,11 +214,16 @@ class Citation(collections.abc.Hashable):
         """
         A hash for Citation that should be equal to the hash of other citations that are equal to it. Based on the values returned by [ID()](#metaknowledge.citation.Citation.ID).
         """
-        try:
-            return self._hash
-        except AttributeError:
-            self._hash = hash(self.ID())
-            return self._hash
+        if self._hash is None:
+            #Set in the dict directly so the hash can be kept by the read only Citations too
+            self.__dict__['_hash'] = hash(self.ID())
+        return self._hash
+
+    def __getstate__(self):
+        #str hashes differ between processes, so the hash is recomputed by the process unpickling it
+        state = self.__dict__.copy()
+        state.pop('_hash', None)
+        return state
     #@profile
     def __eq__(self, other):
         """
@@ -361,6 +405,195 @@ class Citation(collections.abc.Hashable):
         else:
             abbrevDict.update(d)
 
+class FastCitation(Citation):
+    """A compact [Citation](#metaknowledge.citation.Citation) for WOS citation strings, it is what `Citation()` gives when `metaknowledge.FAST_CITES` is `True`.
+
+    It has the same fields, methods, hash and equality as a `Citation` but they are kept in `__slots__` instead of an instance dictionary, the original string is not kept, so `str()` gives the [ID()](#metaknowledge.citation.Citation.ID), and the hash is computed when it is created. This makes it less than half the size of a `Citation`, which matters when there are millions of them. The fields are all parsed when it is created, so it should not be modified.
+
+    # \_\_Init\_\_
+
+    # Parameters
+
+    _cite_ : `str`
+
+    > A str containing a WOS style citation.
+    """
+    __slots__ = ('author', 'year', 'journal', 'V', 'P', 'DOI', 'misc', 'bad', 'error', '_id', '_hash')
+
+    def __init__(self, cite, scopusMode = False):
+        if scopusMode:
+            raise BadCitation("FastCitations can only be made from WOS citations")
+        self._parseWOS(cite)
+        #Journals, volumes, pages and the cited works repeat a lot, the equal values of different FastCitations are made one object
+        self.author = _sharedValue(self.author)
+        self.year = _sharedValue(self.year)
+        self.journal = _sharedValue(self.journal)
+        self.V = _sharedValue(self.V)
+        self.P = _sharedValue(self.P)
+        self._id = _sharedValue(self._id)
+        self._hash = hash(self._id)
+
+    def __getattr__(self, name):
+        #Everything is parsed on creation, without this Citation's __getattr__() would give the instance a dict
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def __str__(self):
+        return self._id
+
+    def __repr__(self):
+        return "<metaknowledge.{} object {}>".format(type(self).__name__, self._id)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Citation):
+            return NotImplemented
+        return self._hash == hash(other)
+
+    def __reduce__(self):
+        #Pickling only needs the fields, not the empty dict every Citation subclass can have, the hash is left out as str hashes differ between processes
+        return _unpickleFastCitation, tuple(getattr(self, k) for k in self.__slots__ if k != '_hash')
+
+def _sameValue(value):
+    return value
+
+#Gives the first equal value it was given, if it has not been dropped by the LRU, used by FastCitation
+_sharedValue = functools.lru_cache(maxsize = citationCacheSize, typed = True)(_sameValue)
+
+def _unpickleFastCitation(*values):
+    c = object.__new__(FastCitation)
+    for k, v in zip(FastCitation.__slots__, values):
+        setattr(c, k, v)
+    c._hash = hash(c._id)
+    return c
+
+def fastCitation(cite):
+    """Converts _cite_ into a [FastCitation](#metaknowledge.citation.FastCitation), the compact form `Citation` uses when `metaknowledge.FAST_CITES` is `True`, regardless of the current setting.
+
+    # Parameters
+
+    _cite_ : `str or Citation`
+
+    > A WOS style citation string or a `Citation` made from one, `FastCitations` are returned unchanged
+
+    # Returns
+
+    `FastCitation`
+
+    > The compact citation
+    """
+    if isinstance(cite, FastCitation):
+        return cite
+    elif isinstance(cite, Citation):
+        try:
+            cite = cite.original
+        except AttributeError:
+            raise BadCitation("{} does not have its original string so cannot be converted".format(repr(cite)))
+    return FastCitation(cite)
+
+#The Citations and FastCitations shared between records, by cachedCitation() and RecordCollection.parseCitations(), are made one of the read only classes below so setting or deleting their attributes raises an AttributeError instead of changing every record citing them. They only differ from their base in these methods so the class of an existing Citation can be changed to them
+
+def _readOnlySetattr(self, name, value):
+    raise AttributeError("{} is shared between records so cannot be modified".format(repr(self)))
+
+def _readOnlyDelattr(self, name):
+    raise AttributeError("{} is shared between records so cannot be modified".format(repr(self)))
+
+def _readOnlyRepr(self):
+    #Shown as the class it was made as
+    return super(type(self), self).__repr__().replace(type(self).__name__, type(self).__base__.__name__, 1)
+
+class _ReadOnlyRegularCitation(Citation):
+    __slots__ = ()
+    __setattr__ = _readOnlySetattr
+    __delattr__ = _readOnlyDelattr
+    __repr__ = _readOnlyRepr
+
+    def _finishParse(self):
+        #Parsed into another Citation and copied directly into the dict
+        c = object.__new__(Citation)
+        c._parseWOS(self.original)
+        self.__dict__.update(c.__dict__)
+
+class _ReadOnlyFastCitation(FastCitation):
+    __slots__ = ()
+    __setattr__ = _readOnlySetattr
+    __delattr__ = _readOnlyDelattr
+    __repr__ = _readOnlyRepr
+
+_readOnlyClasses = {
+    Citation : _ReadOnlyRegularCitation,
+    FastCitation : _ReadOnlyFastCitation,
+}
+
+def _makeReadOnly(cite):
+    #Makes cite, a Citation or FastCitation, read only so it can be shared, this changes its class without copying it
+    readOnlyClass = _readOnlyClasses.get(type(cite))
+    if readOnlyClass is not None:
+        object.__setattr__(cite, '__class__', readOnlyClass)
+    return cite
+
+def _regularCitation(cite):
+    #A Citation, not a FastCitation, even when FAST_CITES is True
+    c = object.__new__(Citation)
+    c.__init__(cite)
+    return c
+
+def _sharedRegularCitation(cite):
+    return _makeReadOnly(_regularCitation(cite))
+
+def _sharedFastCitation(cite):
+    return _makeReadOnly(FastCitation(cite))
+
+_citationCache = functools.lru_cache(maxsize = citationCacheSize)(_sharedRegularCitation)
+_fastCitationCache = functools.lru_cache(maxsize = citationCacheSize)(_sharedFastCitation)
+
+def cachedCitation(cite, fast = None):
+    """Gives the [Citation](../classes/Citation.html#metaknowledge.citation.Citation) of the WOS citation string _cite_, like `Citation(cite)`, but the `Citations` are kept in a process wide cache of the most recently used ones. A highly cited work can appear as the same string in thousands of records, with the cache it is only parsed once and all of them share one `Citation`, so the `Citations` given by this are read only, setting or deleting any of their attributes raises an `AttributeError`. A modifiable copy can be made with `Citation(cite.original)`. This is what the `'citations'` of [WOSRecords](../classes/WOSRecord.html#metaknowledge.WOS.WOSRecord) uses.
+
+    When `metaknowledge.FAST_CITES` is `True` [FastCitations](#metaknowledge.citation.FastCitation) are given, they have their own cache.
+
+    # Parameters
+
+    _cite_ : `str`
+
+    > A str containing a WOS style citation
+
+    _fast_ : `optional [bool]`
+
+    > Default `None`, if `True` a `FastCitation` is given, if `False` a `Citation`, if `None` it depends on `metaknowledge.FAST_CITES`
+
+    # Returns
+
+    `Citation`
+
+    > The shared `Citation` of _cite_
+    """
+    if metaknowledge.FAST_CITES if fast is None else fast:
+        return _fastCitationCache(cite)
+    return _citationCache(cite)
+
+def setCitationCacheSize(maxSize = citationCacheSize):
+    """Sets the number of distinct citation strings [cachedCitation()](#metaknowledge.citation.cachedCitation) keeps, the least recently used ones are dropped first, and the number of field values [FastCitations](#metaknowledge.citation.FastCitation) share. This empties the caches.
+
+    # Parameters
+
+    _maxSize_ : `optional [int]`
+
+    > Default `2**16`, the size of the cache, `0` turns off caching and `None` lets it grow without limit
+    """
+    global _citationCache, _fastCitationCache, _sharedValue
+    _citationCache = functools.lru_cache(maxsize = maxSize)(_sharedRegularCitation)
+    _fastCitationCache = functools.lru_cache(maxsize = maxSize)(_sharedFastCitation)
+    _sharedValue = functools.lru_cache(maxsize = maxSize, typed = True)(_sameValue)
+
+def clearCitationCache():
+    """Empties the caches of [cachedCitation()](#metaknowledge.citation.cachedCitation) and `FastCitation`, freeing the values that are not used elsewhere."""
+    _citationCache.cache_clear()
+    _fastCitationCache.cache_clear()
+    _sharedValue.cache_clear()
+
 def filterNonJournals(citesLst, invert = False):
     """Removes the `Citations` from _citesLst_ that are not journals
 
@@ -41,4 +41,11 @@ def isInteractive():
 
 VERBOSE_MODE = isInteractive()
 
+#If True the WOS citations are made as the compact FastCitations, see metaknowledge.citation.FastCitation
 FAST_CITES = False
+
+#If True the fields of WOS citations other than their IDs are only parsed when first used, see metaknowledge.citation.Citation
+LAZY_CITES = False
+
+#The number of processes used to read the files of a directory, 1 reads them serially
+NUM_WORKERS = 1
@@ -1,24 +1,34 @@
+import bz2
+import concurrent.futures
+import gzip
+import io
+import lzma
+import os
+import os.path
+import tarfile
+import zipfile
 try:
     import collections.abc
 except ImportError:
     import collections
     collections.abc = collections
 
-from .mkExceptions import UnknownFile
+from .mkExceptions import UnknownFile, BadInputFile
+from .mkRecord import _internRecords
 
 from .grants.cihrGrant import parserCIHRfile, isCIHRfile
 from .grants.nsercGrant import parserNSERCfile, isNSERCfile
-from .grants.nsfGrant import parserNSFfile, isNSFfile
+from .grants.nsfGrant import parserNSFfile, isNSFfile, sniffNSFfile
 from .grants.baseGrant import parserFallbackGrantFile, isFallbackGrantFile
 
-from .WOS.wosHandlers import isWOSFile, wosParser
-from .medline.medlineHandlers import isMedlineFile, medlineParser
-from .proquest.proQuestHandlers import isProQuestFile, proQuestParser
-from .scopus.scopusHandlers import isScopusFile, scopusParser
+from .WOS.wosHandlers import isWOSFile, wosParser, wosRecordIter, lazyWOSParser
+from .medline.medlineHandlers import isMedlineFile, medlineParser, medlineRecordIter
+from .proquest.proQuestHandlers import isProQuestFile, proQuestParser, proQuestRecordIter
+from .scopus.scopusHandlers import isScopusFile, scopusParser, scopusRecordIter
 
 ProccessorTuple = collections.namedtuple("ProccessorTuple", ("type", "processor", "detector"))
 
-def unrecognizedFileHandler(fileName):
+def unrecognizedFileHandler(fileName, fileStream = None):
     raise UnknownFile("'{}' is not recognized my metaknowledge.".format(fileName))
 
 grantProcessors = [
@@ -31,6 +41,11 @@ grantProcessors = [
     ProccessorTuple("Invalid File", None, unrecognizedFileHandler),
 ]
 
+#Detectors that give what they read of the file instead of True, it is given to the processor as its fileStream so the file is not read twice, and None instead of False
+grantSniffers = {
+    "NSFGrant" : sniffNSFfile,
+}
+
 recordHandlers = [
     ProccessorTuple("WOSRecord", wosParser, isWOSFile),
     ProccessorTuple("MedlineRecord", medlineParser, isMedlineFile),
@@ -40,3 +55,374 @@ recordHandlers = [
     #This simplifes things at the other end
     ProccessorTuple("Invalid File", None, unrecognizedFileHandler),
 ]
+
+#The generators the processors are built on, these let records be read one at a time
+recordIterators = {
+    "WOSRecord" : wosRecordIter,
+    "MedlineRecord" : medlineRecordIter,
+    "ProQuestRecord" : proQuestRecordIter,
+    "ScopusRecord" : scopusRecordIter,
+}
+
+#The record types whose processors take a stringPool to intern the records' strings as they are parsed
+stringPoolRecordTypes = {"WOSRecord", "MedlineRecord", "ScopusRecord"}
+
+#The number of bytes read from the start of a file by sniffRecordFile()
+sniffSize = 2 ** 16
+
+#The processors that leave the records unparsed until they are used, for RecordCollections created with lazy = True
+lazyProcessors = {
+    "WOSRecord" : lazyWOSParser,
+}
+
+#The first bytes of the compression formats that are decompressed while reading, with the function that opens them and their usual suffix
+compressionFormats = [
+    (b'\x1f\x8b', gzip.open, '.gz'),
+    (b'BZh', bz2.open, '.bz2'),
+    (b'\xfd7zXZ\x00', lzma.open, '.xz'),
+]
+
+#Files with these suffixes are read as archives, so they are read from directories whatever the extension, and the files in them are checked for the extension instead
+archiveSuffixes = ('.zip', '.tar', '.tgz', '.tbz2', '.txz', '.tar.gz', '.tar.bz2', '.tar.xz')
+
+def matchesExtension(fileName, extension):
+    """Checks if _fileName_ should be read when looking for files with _extension_, it does if it ends with _extension_, possibly followed by the suffix of one of the `compressionFormats`, or is an archive (see `archiveSuffixes`) as the files in those are checked separately.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The name of the file
+
+    _extension_ : `str`
+
+    > The required suffix, if it is empty all files match
+
+    # Returns
+
+    `bool`
+
+    > `True` if the file is to be read
+    """
+    if fileName.endswith(extension) or fileName.endswith(archiveSuffixes):
+        return True
+    for magic, opener, suffix in compressionFormats:
+        if fileName.endswith(extension + suffix):
+            return True
+    return False
+
+def openInputFile(fileName):
+    """Opens _fileName_ for reading in binary mode, if it is compressed with one of the `compressionFormats` it is decompressed as it is read. The format is found from the first bytes of the file not its name.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The path to the file
+
+    # Returns
+
+    `file`
+
+    > The opened file, this is also how gzip, bz2 or xz files report if they are damaged
+    """
+    with open(fileName, 'rb') as f:
+        magic = f.read(6)
+    for formatMagic, opener, suffix in compressionFormats:
+        if magic.startswith(formatMagic):
+            return opener(fileName, 'rb')
+    return open(fileName, 'rb')
+
+def iterInputFiles(fileName, extension = ''):
+    """A generator that gives each file to be read from _fileName_. For most files that is just _fileName_ itself, opened with `openInputFile()` so that compressed files are decompressed. If _fileName_ is a zip or tar archive, including a compressed tar, each regular file in it whose name ends with _extension_ is given in turn.
+
+    Every file has a label to be used as its name, e.g. as the `sFile` of its records and the key of its errors. It is _fileName_ for files not in archives and for those in archives the path of the archive joined with its name in the archive, as Python does for modules imported from zip files, so `'exports.zip/savedrecs.txt'`. Each file is only open until the next is asked for.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The path to the file
+
+    _extension_ : `optional [str]`
+
+    > Default `''`, the suffix the files in archives must have
+
+    # Returns
+
+    `generator[tuple[str, file, bool]]`
+
+    > For each file its label, the file opened in binary mode and `True` if it is _fileName_ itself uncompressed, so it can be read again from its path
+    """
+    if zipfile.is_zipfile(fileName):
+        with zipfile.ZipFile(fileName) as zipArchive:
+            for info in zipArchive.infolist():
+                if info.filename.endswith('/') or not info.filename.endswith(extension):
+                    continue
+                with zipArchive.open(info) as memberStream:
+                    yield os.path.join(fileName, info.filename), memberStream, False
+        return
+    fileStream = openInputFile(fileName)
+    compressed = not isinstance(fileStream, io.BufferedReader)
+    with fileStream:
+        try:
+            tarArchive = tarfile.open(fileobj = fileStream, mode = 'r:')
+        except tarfile.TarError:
+            tarArchive = None
+        if tarArchive is None:
+            fileStream.seek(0)
+            yield fileName, fileStream, not compressed
+            return
+        for member in tarArchive:
+            if not member.isfile() or not member.name.endswith(extension):
+                continue
+            memberStream = tarArchive.extractfile(member)
+            if compressed:
+                #Going back to the start of a file in a compressed tar means decompressing it from the start of the archive again, so each file is read into memory once
+                memberStream = io.BytesIO(memberStream.read())
+            with memberStream:
+                yield os.path.join(fileName, member.name), memberStream, False
+
+def sniffRecordFile(fileName, fileStream, pathReadable = True):
+    """Finds the first of the `recordHandlers` whose detector accepts _fileName_. Instead of each detector opening the file, the first `sniffSize` bytes are read once from _fileStream_ and given to the detectors. Only if none accepts them and there was more to the file are the detectors given the path, so a file with very long lines is still recognized.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The path to the file
+
+    _fileStream_ : `file`
+
+    > _fileName_ opened in binary mode, it can then be given to the handler's processor
+
+    _pathReadable_ : `optional [bool]`
+
+    > Default `True`, if `False` _fileName_ is only a label, e.g. for a compressed file or one in an archive (see `iterInputFiles()`), and the detectors are never given it
+
+    # Returns
+
+    `ProccessorTuple`
+
+    > The handler of the file, `UnknownFile` is raised if there is none
+    """
+    head = fileStream.read(sniffSize)
+    sources = [head]
+    if len(head) == sniffSize and not pathReadable:
+        sources = [head[:head.rfind(b'\n') + 1]]
+    elif len(head) == sniffSize:
+        #Only complete lines are checked, so no characters are split
+        sources = [head[:head.rfind(b'\n') + 1], fileName]
+    for source in sources:
+        #The last handler only raises UnknownFile
+        for handler in recordHandlers[:-1]:
+            if handler.detector(source):
+                return handler
+    return recordHandlers[-1].detector(fileName)
+
+def processGrantFile(fileName, extension = ''):
+    """Reads the grants from each file `iterInputFiles()` gives for _fileName_, using the first of the `grantProcessors` whose detector accepts the file.
+
+    Files that are compressed or in archives are read into memory and the detectors and processors are each given a copy of them, as the grant files are read in full by the detectors. The types in `grantSniffers` are checked with their sniffer instead of their detector and what it read, e.g. the parsed XML of NSF files, is given to the processor, so those files are only parsed once.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The path to the file
+
+    _extension_ : `optional [str]`
+
+    > Default `''`, the suffix the files in an archive must have to be read
+
+    # Returns
+
+    `list[tuple[str, str, set[Grant], Exception]]`
+
+    > For each file read, the label `iterInputFiles()` gave it, the grant type, the grants and the processor's error (or `None`). If no detector accepts a file its grant type is `None`
+    """
+    results = []
+    for label, fileStream, isPlain in iterInputFiles(fileName, extension = extension):
+        data = None if isPlain else fileStream.read()
+        def streamKwargs():
+            if data is None:
+                return {}
+            return {'fileStream' : io.BytesIO(data)}
+        try:
+            for grantType, processor, detector in grantProcessors:
+                if grantType in grantSniffers:
+                    sniffed = grantSniffers[grantType](label, **streamKwargs())
+                    if sniffed is None:
+                        continue
+                    processorKwargs = {'fileStream' : sniffed}
+                elif detector(label, **streamKwargs()):
+                    processorKwargs = streamKwargs()
+                else:
+                    continue
+                grants, gError = processor(label, **processorKwargs)
+                results.append((label, grantType, grants, gError))
+                break
+        except UnknownFile:
+            results.append((label, None, set(), None))
+    return results
+
+def _processRecordFile(fileName, lazy = False, workers = 1, extension = '', stringPool = None):
+    """Reads each file `iterInputFiles()` gives for _fileName_, finding its handler with `sniffRecordFile()` and parsing the file with it, using the file that was opened to find the handler.
+
+    This is a module level function so it can be sent to worker processes.
+
+    # Parameters
+
+    _fileName_ : `str`
+
+    > The path to the file
+
+    _lazy_ : `optional [bool]`
+
+    > Default `False`, if `True` the processor from `lazyProcessors` is used when there is one, as long as the file is not compressed or in an archive
+
+    _workers_ : `optional [int]`
+
+    > Default 1, the number of processes a WOS file can be split between, see [wosParser()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.wosParser)
+
+    _extension_ : `optional [str]`
+
+    > Default `''`, the suffix the files in an archive must have to be read
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if given the strings of the records are interned in it as they are parsed, by the processors of the types in `stringPoolRecordTypes`. Lazily read records are not interned
+
+    # Returns
+
+    `list[tuple[str, str, set[Record], Exception]]`
+
+    > For each file read, the label `iterInputFiles()` gave it, the record type, the records and the parser's error (or `None`). If no handler accepts a file its record type is `None`
+    """
+    results = []
+    for label, fileStream, isPlain in iterInputFiles(fileName, extension = extension):
+        try:
+            recordType, processor, detector = sniffRecordFile(label, fileStream, pathReadable = isPlain)
+        except UnknownFile:
+            results.append((label, None, set(), None))
+            continue
+        if stringPool is not None and recordType in stringPoolRecordTypes:
+            poolKwargs = {'stringPool' : stringPool}
+        else:
+            poolKwargs = {}
+        if lazy and isPlain and recordType in lazyProcessors:
+            recs, pError = lazyProcessors[recordType](label)
+        elif recordType == "WOSRecord" and workers > 1 and isPlain:
+            recs, pError = processor(label, workers = workers, fileStream = fileStream, **poolKwargs)
+        else:
+            recs, pError = processor(label, fileStream = fileStream, **poolKwargs)
+        results.append((label, recordType, recs, pError))
+    return results
+
+def processRecordFiles(flist, workers = 1, lazy = False, extension = '', stringPool = None):
+    """A generator that parses each file in _flist_ with `_processRecordFile()` and yields the results in the same order as _flist_.
+
+    If _workers_ is greater than 1 the files are parsed in a pool of that many processes, the results are identical to a serial read. Lazy records are tied to the index of their file in the process that read them so if _lazy_ is `True` the files are always read serially.
+
+    # Parameters
+
+    _flist_ : `list[str]`
+
+    > The paths to the files
+
+    _workers_ : `optional [int]`
+
+    > Default 1, the number of processes used to parse the files
+
+    _lazy_ : `optional [bool]`
+
+    > Default `False`, if `True` the files that have a processor in `lazyProcessors` are read with it
+
+    _extension_ : `optional [str]`
+
+    > Default `''`, the suffix the files in archives must have to be read
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if given the strings of the records are interned in it, as they are parsed or, if the files are parsed in other processes, when they are returned
+
+    # Returns
+
+    `generator[tuple[str, list[tuple[str, str, set[Record], Exception]]]]`
+
+    > For each file a tuple of its path and the results of the files read from it, one for each file in it if it was an archive, each a tuple of the file's label, record type (`None` if the file was not recognized), records and error (or `None`)
+    """
+    if workers > 1 and len(flist) > 1 and not lazy:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+            futures = [executor.submit(_processRecordFile, fileName, extension = extension) for fileName in flist]
+            try:
+                for fileName, future in zip(flist, futures):
+                    results = future.result()
+                    if stringPool is not None:
+                        #The pool cannot be shared with the workers so the records are interned once they are back
+                        for label, recordType, recs, pError in results:
+                            _internRecords(recs, stringPool)
+                    yield fileName, results
+            finally:
+                #Don't parse the rest of the files if the caller stopped early
+                for future in futures:
+                    future.cancel()
+    else:
+        for fileName in flist:
+            yield fileName, _processRecordFile(fileName, lazy = lazy, extension = extension, stringPool = stringPool)
+
+def iterRecords(inPath, extension = '', errors = None):
+    """A generator that reads the records from a file, or directory of files, one at a time. Unlike a [RecordCollection](../classes/RecordCollection.html#metaknowledge.RecordCollection) the records are never all held in memory so this can be used on collections too large to load. The files are read with the same parsers as a `RecordCollection` uses, but as nothing is kept a `Record` found in more than one file is yielded once for each file. Compressed files and archives are read as described in `iterInputFiles()`. Any iterable of `Records` can be given to the functions that summarize them, e.g. [rankedSeries()](#metaknowledge.mkCollection.rankedSeries), [localCiteStats()](#metaknowledge.recordCollection.localCiteStats) and [rpys()](#metaknowledge.recordCollection.rpys).
+
+        >>> import metaknowledge as mk
+        >>> counts = mk.rankedSeries(mk.iterRecords("records/"), 'journal', pandasMode = False)
+
+    # Parameters
+
+    _inPath_ : `str`
+
+    > The path to a file or a directory of files
+
+    _extension_ : `optional [str]`
+
+    > Default `''`, the suffix the files must have to be read, if a file in a directory, or archive, has the suffix but is not recognized a `BadInputFile` exception is raised
+
+    _errors_ : `optional [dict]`
+
+    > Default `None`, if a dict is given the errors of each file that had issues will be added to it with the file's path (or label if it was in an archive) as the key, like the `errors` of a `RecordCollection`
+
+    # Returns
+
+    `generator[Record]`
+
+    > The `Records` of the files
+    """
+    inPath = os.path.realpath(os.path.expanduser(inPath))
+    if os.path.isfile(inPath):
+        if not matchesExtension(inPath, extension):
+            raise BadInputFile("extension of input file does not match requested extension")
+        flist = [inPath]
+    elif os.path.isdir(inPath):
+        flist = []
+        for f in os.listdir(inPath):
+            fullF = os.path.join(inPath, f)
+            if matchesExtension(fullF, extension) and not fullF.endswith('mkRecordDirCache') and os.path.isfile(fullF):
+                flist.append(fullF)
+    else:
+        raise BadInputFile("'{}' is not a path to a directory or file.".format(inPath))
+    for fileName in flist:
+        recognized = False
+        for label, fileStream, isPlain in iterInputFiles(fileName, extension = extension):
+            try:
+                recordType = sniffRecordFile(label, fileStream, pathReadable = isPlain).type
+            except UnknownFile:
+                if extension != '':
+                    raise BadInputFile("'{}' does not match any known file type.\nIts header might be damaged or it could have been modified by another program.".format(label))
+                else:
+                    continue
+            recognized = True
+            pError = yield from recordIterators[recordType](label, fileStream = fileStream)
+            if pError is not None and errors is not None:
+                errors[label] = pError
+        if not recognized and len(flist) == 1:
+            raise BadInputFile("'{}' does not match any known file type.\nIts header might be damaged or it could have been modified by another program.".format(fileName))
@@ -10,11 +10,11 @@ import networkx as nx
 from .progressBar import _ProgressBar
 
 from .mkCollection import CollectionWithIDs
-from .mkExceptions import GrantCollectionException, BadInputFile, UnknownFile
+from .mkExceptions import GrantCollectionException, BadInputFile
 
 from .grants.baseGrant import Grant
 
-from .fileHandlers import grantProcessors
+from .fileHandlers import processGrantFile, matchesExtension
 
 import metaknowledge
 
@@ -41,20 +41,21 @@ class GrantCollection(CollectionWithIDs):
             elif isinstance(inGrants, str):
                 if os.path.isfile(inGrants):
                     PBar.updateVal(.2, "GrantCollection from a file started")
-                    if not inGrants.endswith(extension):
+                    if not matchesExtension(inGrants, extension):
                         raise GrantCollectionException("extension of input file does not match requested extension '{}'.".format(extension))
                     if not name:
                         name = os.path.splitext(os.path.split(inGrants)[1])[0]
-                    try:
-                        for grantType, processor, detector in grantProcessors:
-                            if detector(inGrants):
-                                grantTypes.add(grantType)
-                                grantsSet, gError = processor(inGrants)
-                                if gError is not None:
-                                    bad = True
-                                    errors[inGrants] = gError
-                                break
-                    except UnknownFile:
+                    grantsSet = set()
+                    #An archive can hold many files, the ones that are not recognized are skipped
+                    for label, grantType, grants, gError in processGrantFile(inGrants, extension = extension):
+                        if grantType is None:
+                            continue
+                        grantTypes.add(grantType)
+                        if gError is not None:
+                            bad = True
+                            errors[label] = gError
+                        _mergeGrants(grantsSet, grants, grantType)
+                    if len(grantTypes) < 1:
                         raise BadInputFile("'{}' does not match any known grant file type and the default parser could not handle it.\nIts header might be damaged or it could have been modified by another program.".format(inGrants))
                 elif os.path.isdir(inGrants):
                     count = 0
@@ -67,7 +68,7 @@ class GrantCollection(CollectionWithIDs):
                     flist = []
                     for f in os.listdir(inGrants):
                         fullF = os.path.join(os.path.abspath(inGrants), f)
-                        if fullF.endswith(extension) and os.path.isfile(fullF):
+                        if matchesExtension(fullF, extension) and os.path.isfile(fullF):
                             flist.append(fullF)
                     if cached:
                         cacheName = os.path.join(inGrants, '{}.[{}].mkGrantDirCache'.format(os.path.basename(os.path.abspath(inGrants)), extension))
@@ -82,40 +83,17 @@ class GrantCollection(CollectionWithIDs):
                     for fileName in flist:
                         count += 1
                         PBar.updateVal(count / len(flist), "Reading grants from: {}".format(fileName))
-                        try:
-                            for grantType, processor, detector in grantProcessors:
-                                if detector(fileName):
-                                    grantTypes.add(grantType)
-                                    grants, gError = processor(fileName)
-                                    if gError is not None:
-                                        bad = True
-                                        errors[fileName] = gError
-                                    #This is need for any grants thats can span mutiple files
-                                    if grantType == "NSERCGrant":
-                                        if len(grants & grantsSet) > 0:
-                                            #In theory this could be done with
-                                            #the builtin operators (& and ^),
-                                            #but the exact results are not
-                                            #defined for objects with identical
-                                            #hashes without identical attributes
-                                            #so it could not be counted on
-                                            #Thus we get this mess
-                                            overlap = {}
-                                            for Gin in grants:
-                                                if Gin in grantsSet:
-                                                    overlap[Gin.id] = Gin
-                                            for Gover in overlap.values():
-                                                grants.remove(Gover)
-                                            for Gset in grantsSet:
-                                                if Gset.id in overlap:
-                                                    Gset.update(overlap[Gset.id])
-                                    grantsSet |= grants
-                                    break
-                        except UnknownFile:
-                            if extension != '':
-                                raise BadInputFile("'{}' does not match any known file type, but has the requested extension '{}'. Its header might be damaged or it could have been modified by another program.".format(fileName, extension))
-                            else:
-                                pass
+                        for label, grantType, grants, gError in processGrantFile(fileName, extension = extension):
+                            if grantType is None:
+                                if extension != '':
+                                    raise BadInputFile("'{}' does not match any known file type, but has the requested extension '{}'. Its header might be damaged or it could have been modified by another program.".format(label, extension))
+                                else:
+                                    continue
+                            grantTypes.add(grantType)
+                            if gError is not None:
+                                bad = True
+                                errors[label] = gError
+                            _mergeGrants(grantsSet, grants, grantType)
                 else:
                     raise GrantCollectionException("'{}' is not a path to a directory or file. Strings cannot be used to initialize GrantCollections".format(inGrants))
 
@@ -227,3 +205,25 @@ class GrantCollection(CollectionWithIDs):
             else:
                 PBar.finish("Done making a co-investigator network from {}".format(self))
         return grph
+
+def _mergeGrants(grantsSet, grants, grantType):
+    #This is need for any grants thats can span mutiple files
+    if grantType == "NSERCGrant":
+        if len(grants & grantsSet) > 0:
+            #In theory this could be done with
+            #the builtin operators (& and ^),
+            #but the exact results are not
+            #defined for objects with identical
+            #hashes without identical attributes
+            #so it could not be counted on
+            #Thus we get this mess
+            overlap = {}
+            for Gin in grants:
+                if Gin in grantsSet:
+                    overlap[Gin.id] = Gin
+            for Gover in overlap.values():
+                grants.remove(Gover)
+            for Gset in grantsSet:
+                if Gset.id in overlap:
+                    Gset.update(overlap[Gset.id])
+    grantsSet |= grants
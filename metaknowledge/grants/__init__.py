@@ -2,7 +2,7 @@ from .nsercGrant import NSERCGrant, isNSERCfile, parserNSERCfile
 from .medlineGrant import MedlineGrant
 from .baseGrant import Grant, FallbackGrant, isFallbackGrantFile, parserFallbackGrantFile
 from .cihrGrant import CIHRGrant, isCIHRfile, parserCIHRfile
-from .nsfGrant import NSFGrant, isNSFfile, parserNSFfile
+from .nsfGrant import NSFGrant, isNSFfile, parserNSFfile, sniffNSFfile
 
 
 """#Creating new grants
@@ -6,7 +6,7 @@ except ImportError:
 import csv
 import os
 
-from ..mkRecord import Record
+from ..mkRecord import Record, _openText
 from ..mkExceptions import BadGrant
 
 
@@ -128,6 +128,13 @@ def csvAndLinesReader(enumeratedFile, *csvArgs, **csvKwargs):
         row = next(readerIter)
         yield currentData['currentLineNum'], currentData['currentLineString'], row
 
+def _uncompressedName(fileName):
+    #The name checks are done on the name of the file a compressed file holds, the suffixes are those of fileHandlers.compressionFormats
+    root, ext = os.path.splitext(fileName)
+    if ext in ('.gz', '.bz2', '.xz'):
+        return root
+    return fileName
+
 class FallbackGrant(Grant):
     """A subclass of [Grant](./grants.html#metaknowledge.grants.Grant), it has the same attributes and is returned from the fall back constructor for grants.
     """
@@ -139,13 +146,13 @@ class FallbackGrant(Grant):
         idValue = "{}-l:{}-{:0=20}".format(os.path.basename(sFile), sLine, hash(original))
         Grant.__init__(self, original, grantdDict, idValue, False, None, sFile = sFile, sLine = sLine)
 
-def isFallbackGrantFile(fileName, useFileName = True, encoding = 'latin-1', dialect = 'excel'):
+def isFallbackGrantFile(fileName, useFileName = True, encoding = 'latin-1', dialect = 'excel', fileStream = None):
     if useFileName:
-        if not fileName.endswith('csv'):
+        if not _uncompressedName(fileName).endswith('csv'):
             return False
     try:
-        #Try to open it
-        with open(fileName, 'r', encoding = encoding) as openfile:
+        #Try to open it, fileStream is the file already opened in binary mode, if it is given fileName is only its name
+        with _openText(fileName if fileStream is None else fileStream, encoding) as openfile:
             #See if csv likes it
             reader = csv.DictReader(openfile, fieldnames = None, dialect = dialect)
 
@@ -171,12 +178,12 @@ def isFallbackGrantFile(fileName, useFileName = True, encoding = 'latin-1', dial
         #IF nothing caused an issue return True
         return True
 
-def parserFallbackGrantFile(fileName, encoding = 'latin-1', dialect = 'excel'):
+def parserFallbackGrantFile(fileName, encoding = 'latin-1', dialect = 'excel', fileStream = None):
     #Declare the returns out side of the block to show they are accessible everywhere inside it and so if there are issues with their creation it will no cause a problem with returning them
     grantSet = set()
     error = None
     try:
-        with open(fileName, 'r', encoding = encoding) as openfile:
+        with _openText(fileName if fileStream is None else fileStream, encoding) as openfile:
             f = enumerate(openfile, start = 1)
             reader = csvAndLinesReader(f, fieldnames = None, dialect = dialect)
             for lineNum, lineString, lineDict in reader:
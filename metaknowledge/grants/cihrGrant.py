@@ -1,7 +1,8 @@
 import os.path
 import csv
 
-from .baseGrant import Grant, csvAndLinesReader
+from .baseGrant import Grant, csvAndLinesReader, _uncompressedName
+from ..mkRecord import _openText
 from ..mkExceptions import BadGrant
 
 class CIHRGrant(Grant):
@@ -17,11 +18,11 @@ class CIHRGrant(Grant):
 
         Grant.__init__(self, original, grantdDict, idValue, bad, error, sFile = sFile, sLine = sLine)
 
-def isCIHRfile(fileName, useFileName = True):
-    if useFileName and not os.path.basename(fileName).startswith('cihr_'):
+def isCIHRfile(fileName, useFileName = True, fileStream = None):
+    if useFileName and not os.path.basename(_uncompressedName(fileName)).startswith('cihr_'):
         return False
     try:
-        with open(fileName, 'r', encoding = 'latin-1') as openfile:
+        with _openText(fileName if fileStream is None else fileStream, 'latin-1') as openfile:
             if not openfile.readline().startswith('Search Criteria'):
                 return False
             elif not openfile.readline().endswith(',,,,,,,,,\n'):
@@ -37,11 +38,11 @@ def isCIHRfile(fileName, useFileName = True):
     else:
         return True
 
-def parserCIHRfile(fileName):
+def parserCIHRfile(fileName, fileStream = None):
     grantSet = set()
     error = None
     try:
-        with open(fileName, 'r', encoding = 'latin-1') as openfile:
+        with _openText(fileName if fileStream is None else fileStream, 'latin-1') as openfile:
             f = enumerate(openfile, start = 1)
             next(f)
             next(f)
@@ -1,7 +1,8 @@
 import csv
 import os.path
 
-from .baseGrant import Grant, csvAndLinesReader
+from .baseGrant import Grant, csvAndLinesReader, _uncompressedName
+from ..mkRecord import _openText
 from ..mkExceptions import BadGrant
 
 class NSERCGrant(Grant):
@@ -61,11 +62,11 @@ class NSERCGrant(Grant):
                 tags.append(k)
         return super().getInvestigators(tags = tags, seperator = seperator, _getTag = _getTag)
 
-def isNSERCfile(fileName, useFileName = True):
-    if useFileName and not os.path.basename(fileName).startswith('NSERC_'):
+def isNSERCfile(fileName, useFileName = True, fileStream = None):
+    if useFileName and not os.path.basename(_uncompressedName(fileName)).startswith('NSERC_'):
         return False
     try:
-        with open(fileName, 'r', encoding = 'latin-1') as openfile:
+        with _openText(fileName if fileStream is None else fileStream, 'latin-1') as openfile:
             reader = csv.DictReader(openfile, fieldnames=None, dialect='excel')
             length = 0
             for row in reader:
@@ -79,11 +80,11 @@ def isNSERCfile(fileName, useFileName = True):
     else:
         return True
 
-def parserNSERCfile(fileName):
+def parserNSERCfile(fileName, fileStream = None):
     grantSet = set()
     error = None
     try:
-        with open(fileName, 'r', encoding = 'latin-1') as openfile:
+        with _openText(fileName if fileStream is None else fileStream, 'latin-1') as openfile:
             f = enumerate(openfile, start = 1)
             reader = csvAndLinesReader(f, fieldnames = None, dialect = 'excel')
             for lineNum, lineString, lineDict in reader:
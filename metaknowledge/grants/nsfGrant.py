@@ -3,7 +3,7 @@ import xml.etree.ElementTree as ET
 import os
 import os.path
 
-from .baseGrant import Grant
+from .baseGrant import Grant, _uncompressedName
 from ..mkExceptions import BadGrant
 
 class NSFGrant(Grant):
@@ -53,25 +53,34 @@ class NSFGrant(Grant):
             tags.append('Institution')
         return super().getInvestigators(tags = tags, seperator = seperator, _getTag = _getTag)
 
-def isNSFfile(fileName, useFileName = True):
-    if useFileName and not os.path.basename(fileName).endswith('.xml'):
-        return False
+def isNSFfile(fileName, useFileName = True, fileStream = None):
+    return sniffNSFfile(fileName, useFileName = useFileName, fileStream = fileStream) is not None
+
+def sniffNSFfile(fileName, useFileName = True, fileStream = None):
+    """Checks _fileName_ like isNSFfile(), but instead of `True` gives the parsed tree of the file, which can be given to parserNSFfile() as its _fileStream_ so the file is not parsed twice, and instead of `False` gives `None`"""
+    if useFileName and not os.path.basename(_uncompressedName(fileName)).endswith('.xml'):
+        return None
     try:
-        tree = ET.parse(fileName)
+        #fileStream is the file already opened in binary mode, if it is given fileName is only its name
+        tree = ET.parse(fileName if fileStream is None else fileStream)
         root = tree.getroot()
         if len(root.findall('Award')) != 1:
-            return False
+            return None
         else:
-            return True
+            return tree
     except (ET.ParseError, UnicodeError):
-        return False
+        return None
 
-def parserNSFfile(fileName):
+def parserNSFfile(fileName, fileStream = None):
     error = None
     grantSet = set()
     grantDict = {}
     try:
-        tree = ET.parse(fileName)
+        #fileStream can also be the tree sniffNSFfile() parsed
+        if isinstance(fileStream, ET.ElementTree):
+            tree = fileStream
+        else:
+            tree = ET.parse(fileName if fileStream is None else fileStream)
         top = tree.getroot().find('Award')
         #Organization is the only tag that goes 3 tags deep
         for org in top.findall('Organization'):
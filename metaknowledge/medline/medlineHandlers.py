@@ -1,8 +1,15 @@
 import itertools
+import re
 
 from ..mkExceptions import BadPubmedFile
 
-from .recordMedline import MedlineRecord
+from .recordMedline import MedlineRecord, medlineBlockParser
+from ..mkRecord import _collectRecords, _openText
+
+#Size, in characters, of the blocks medline files are read in
+medlineBlockSize = 2 ** 20
+
+_blankLinesRegex = re.compile(r'\n*')
 
 def isMedlineFile(infile, checkedLines = 2):
     """Determines if _infile_ is the path to a Medline file. A file is considerd to be a Medline file if it has the correct encoding (`latin-1`) and within the first _checkedLines_ a line starts with `"PMID- "`.
@@ -11,7 +18,7 @@ def isMedlineFile(infile, checkedLines = 2):
 
     _infile_ : `str`
 
-    > The path to the targets file
+    > The path to the targets file, or the first bytes of it
 
     _checkedLines_ : `optional [int]`
 
@@ -24,7 +31,7 @@ def isMedlineFile(infile, checkedLines = 2):
     > `True` if the file is a Medline file
     """
     try:
-        with open(infile, 'r', encoding='latin-1') as openfile:
+        with _openText(infile, 'latin-1') as openfile:
             f = enumerate(openfile, start = 0)
             for i in range(checkedLines):
                 if f.__next__()[1].startswith("PMID- "):
@@ -35,7 +42,7 @@ def isMedlineFile(infile, checkedLines = 2):
     else:
         return False
 
-def medlineParser(pubFile):
+def medlineParser(pubFile, fileStream = None, stringPool = None):
     """Parses a medline file, _pubFile_, to extract the individual entries as [MedlineRecords](#metaknowledge.medline.recordMedline.MedlineRecord).
 
     A medline file is a series of entries, each entry is a series of tags. A tag is a 2 to 4 character string each tag is padded with spaces on the left to make it 4 characters which is followed by a dash and a space (`'- '`). Everything after the tag and on all lines after it not starting with a tag is considered associated with the tag. Each entry's first tag is `PMID`, so a first line looks something like `PMID- 26524502`. Entries end with a single blank line.
@@ -46,44 +53,129 @@ def medlineParser(pubFile):
 
     > A path to a valid medline file, use [isMedlineFile](#metaknowledge.medline.medlineHandlers.isMedlineFile) to verify
 
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _pubFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _pubFile_ again. It is closed when the reading is done
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
     # Returns
 
     `set[MedlineRecord]`
 
+    > Records for each of the entries
+    """
+    return _collectRecords(medlineRecordIter(pubFile, fileStream = fileStream, stringPool = stringPool))
+
+def medlineRecordIter(pubFile, fileStream = None, stringPool = None):
+    """A generator that yields the [MedlineRecords](#metaknowledge.medline.recordMedline.MedlineRecord) of _pubFile_ one at a time, this is what [medlineParser()](#metaknowledge.medline.medlineHandlers.medlineParser) uses to read a file. When the generator finishes it returns (as the value of its `StopIteration`) the `BadPubmedFile` error found or `None`.
+
+    # Parameters
+
+    _pubFile_ : `str`
+
+    > A path to a valid medline file
+
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _pubFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _pubFile_ again. It is closed when the reading is done
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
+    # Returns
+
+    `generator[MedlineRecord]`
+
     > Records for each of the entries
     """
     #assumes the file is MEDLINE
-    recSet = set()
     error = None
     lineNum = 0
     try:
-        with open(pubFile, 'r', encoding = 'latin-1') as openfile:
-            f = enumerate(openfile, start = 1)
-            lineNum, line = next(f)
-            try:
+        with _openText(pubFile if fileStream is None else fileStream, 'latin-1') as openfile:
+            buff = ''
+            while True:
+                block = openfile.read(medlineBlockSize)
+                buff += block
+                if block:
+                    #Only complete entries are read, the rest waits for the next block
+                    cut = buff.rfind('\n\n')
+                    if cut < 0:
+                        continue
+                    text, buff = buff[:cut + 2], buff[cut + 2:]
+                else:
+                    text, buff = buff, ''
+                pos = 0
+                end = len(text)
                 while True:
-                    if line.startswith("PMID- "):
-                        try:
-                            r = MedlineRecord(itertools.chain([(lineNum, line)], f), sFile = pubFile, sLine = lineNum)
-                            recSet.add(r)
-                        except BadPubmedFile as e:
-                            badLine = lineNum
-                            try:
-                                lineNum, line = next(f)
-                                while not line.startswith("PMID- "):
-                                    lineNum, line = next(f)
-                            except (StopIteration, UnicodeDecodeError) as e:
-                                if error is None:
-                                    error = BadPubmedFile("The file '{}' becomes unparsable after line: {}, due to the error: {} ".format(pubFile, badLine, e))
-                                raise e
-                    elif line != '\n':
+                    #Blank lines between entries
+                    blankEnd = _blankLinesRegex.match(text, pos).end()
+                    lineNum += blankEnd - pos
+                    pos = blankEnd
+                    if pos >= end:
+                        break
+                    entryEnd = text.find('\n\n', pos)
+                    entryEnd = end if entryEnd < 0 else entryEnd + 1
+                    entry = text[pos:entryEnd]
+                    fieldDict = None
+                    if entry.startswith("PMID- ") and entry.endswith('\n'):
+                        fieldDict = medlineBlockParser(entry, stringPool = stringPool)
+                    if fieldDict is not None:
+                        yield MedlineRecord(fieldDict, sFile = pubFile, sLine = lineNum + 1)
+                    else:
+                        entryError = yield from _readMedlineLines(enumerate(_splitLines(entry), start = lineNum + 1), pubFile, stringPool = stringPool)
                         if error is None:
-                            error = BadPubmedFile("The file '{}' has parts of it that are unparsable starting at line: {}.".format(pubFile, lineNum))
-                    lineNum, line = next(f)
-            except StopIteration:
-                #End of the file has been reached
-                pass
+                            error = entryError
+                    lineNum += entry.count('\n') + (0 if entry.endswith('\n') else 1)
+                    pos = entryEnd
+                if not block:
+                    break
     except UnicodeDecodeError:
         if error is None:
             error = BadPubmedFile("The file '{}' has parts of it that are unparsable starting at line: {}.".format(pubFile, lineNum))
-    return recSet, error
+    return error
+
+def _splitLines(text):
+    #Like iterating over a file, str.splitlines() would also split on characters like \x85
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+        return [l + '\n' for l in lines]
+    else:
+        return [l + '\n' for l in lines[:-1]] + [lines[-1]]
+
+def _readMedlineLines(f, pubFile, stringPool = None):
+    #The line by line reader, used for the entries medlineBlockParser() cannot handle
+    error = None
+    try:
+        lineNum, line = next(f)
+    except StopIteration:
+        return error
+    try:
+        while True:
+            if line.startswith("PMID- "):
+                try:
+                    r = MedlineRecord(itertools.chain([(lineNum, line)], f), sFile = pubFile, sLine = lineNum, stringPool = stringPool)
+                    yield r
+                except BadPubmedFile as e:
+                    badLine = lineNum
+                    try:
+                        lineNum, line = next(f)
+                        while not line.startswith("PMID- "):
+                            lineNum, line = next(f)
+                    except (StopIteration, UnicodeDecodeError) as e:
+                        if error is None:
+                            error = BadPubmedFile("The file '{}' becomes unparsable after line: {}, due to the error: {} ".format(pubFile, badLine, e))
+                        raise e
+            elif line != '\n':
+                if error is None:
+                    error = BadPubmedFile("The file '{}' has parts of it that are unparsable starting at line: {}.".format(pubFile, lineNum))
+            lineNum, line = next(f)
+    except StopIteration:
+        #End of the entry has been reached
+        pass
+    return error
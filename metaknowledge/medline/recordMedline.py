@@ -3,19 +3,28 @@
 import collections
 import itertools
 import io
+import operator
+import re
 
 from ..mkExceptions import BadPubmedRecord, RCTypeError
-from ..mkRecord import ExtendedRecord
+from ..mkRecord import ExtendedRecord, _internFields
 from .tagProcessing.tagNames import tagNameConverterDict, authorBasedTags
 from .tagProcessing.tagFunctions import medlineTagToFunc
 from .tagProcessing.specialFunctions import medlineSpecialTagToFunc
 
+#The tags with values shared by many records, the names, dates, journals and MeSH terms
+medlineInternedTags = frozenset(('OWN', 'STAT', 'DA', 'DCOM', 'LR', 'IS', 'VI', 'IP', 'DP', 'LA', 'PT', 'PL', 'TA', 'JT', 'JID', 'SB', 'MH', 'OT', 'OTO', 'AU', 'FAU', 'AD', 'AUID', 'CN', 'CI', 'RN', 'GR', 'PST', 'EDAT', 'MHDA', 'CRDT', 'DEP', 'PHST'))
+
 class MedlineRecord(ExtendedRecord):
     """Class for full Medline(Pubmed) entries.
 
     This class is an [ExtendedRecord](./ExtendedRecord.html#metaknowledge.ExtendedRecord) capable of generating its own id number. You should not create them directly, but instead use [medlineParser()](../modules/medline.html#metaknowledge.medline.medlineHandlers.medlineParser) on a medline file.
     """
-    def __init__(self, inRecord, sFile = "", sLine = 0):
+    __slots__ = ('_pubNum',)
+
+    _internedTags = medlineInternedTags
+
+    def __init__(self, inRecord, sFile = "", sLine = 0, stringPool = None):
         bad = False
         error = None
         fieldDict = None
@@ -23,14 +32,14 @@ class MedlineRecord(ExtendedRecord):
             if isinstance(inRecord, dict) or isinstance(inRecord, collections.OrderedDict):
                 fieldDict = collections.OrderedDict(inRecord)
             elif isinstance(inRecord, itertools.chain):
-                fieldDict = medlineRecordParser(inRecord)
+                fieldDict = medlineRecordParser(inRecord, stringPool = stringPool)
             elif isinstance(inRecord, io.IOBase):
-                fieldDict = medlineRecordParser(enumerate(inRecord))
+                fieldDict = medlineRecordParser(enumerate(inRecord), stringPool = stringPool)
             elif isinstance(inRecord, str):
                 def addCharToEnd(lst):
                     for s in lst:
                         yield s + '\n'
-                fieldDict = medlineRecordParser(enumerate(addCharToEnd(inRecord.split('\n')), start = 1))
+                fieldDict = medlineRecordParser(enumerate(addCharToEnd(inRecord.split('\n')), start = 1), stringPool = stringPool)
                 #string io
             else:
                 raise RCTypeError("Unsupported input type '{}', PubmedRecords cannot be created from '{}'".format(inRecord, type(inRecord)))
@@ -87,7 +96,7 @@ class MedlineRecord(ExtendedRecord):
                             for authVal in authTags.get(v,[]):
                                 f.write(authVal)
 
-def medlineRecordParser(record):
+def medlineRecordParser(record, stringPool = None):
     """The parser [`MedlineRecord`](../classes/MedlineRecord.html#metaknowledge.medline.MedlineRecord) use. This takes an entry from [medlineParser()](#metaknowledge.medline.medlineHandlers.medlineParser) and parses it a part of the creation of a `MedlineRecord`.
 
     # Parameters
@@ -96,6 +105,10 @@ def medlineRecordParser(record):
 
     > a file wrapped by `enumerate()`
 
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the tags and the values of the tags in `medlineInternedTags` are replaced by the equal strings in it, or added to it, so the records parsed with the same pool share them
+
     # Returns
 
     `collections.OrderedDict`
@@ -124,4 +137,52 @@ def medlineRecordParser(record):
             break
         else:
             raise BadPubmedRecord("Tag not formed correctly on line {}: '{}'".format(lineNum, line))
+    if stringPool is not None:
+        tagDict = _internFields(tagDict, medlineInternedTags, stringPool)
+    return tagDict
+
+#A tag line, the tag is padded to 4 characters, and all of its continuation lines (indented by 6 spaces)
+medlineFieldRegex = re.compile(r'(?=[A-Za-z ]{4}-)([A-Za-z]+) *-.(.*(?:\n      .*)*)\n')
+
+def medlineBlockParser(block, stringPool = None):
+    """The fast path of [medlineParser()](#metaknowledge.medline.medlineHandlers.medlineParser). This takes the full text of an entry, every line of it including the last ending with a newline and no blank lines, and builds the same dictionary as [medlineRecordParser()](#metaknowledge.medline.recordMedline.medlineRecordParser) would, but all the tags are matched at once instead of being read line by line.
+
+    Only regular entries are handled, if any line of _block_ is not a correctly formed tag or continuation line `None` is returned and the entry should be given to `medlineRecordParser()` instead, so that errors are reported the same way.
+
+    # Parameters
+
+    _block_ : `str`
+
+    > The text of an entry
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, the string pool, as used by `medlineRecordParser()`
+
+    # Returns
+
+    `collections.OrderedDict or None`
+
+    > An ordered dictionary of the key-vaue pairs in the entry or `None` if the entry is not regular
+    """
+    fields = medlineFieldRegex.findall(block)
+    #Each match is the value plus 7 characters, if they do not add up to the entry something was skipped
+    if len(''.join(map(operator.itemgetter(1), fields))) + 7 * len(fields) != len(block):
+        return None
+    tagDict = collections.OrderedDict()
+    mostRecentAuthor = None
+    for tag, contents in fields:
+        if '\n' in contents:
+            contents = contents.replace('\n      ', '\n')
+        if tag == 'AU':
+            mostRecentAuthor = contents.split('\n', 1)[0]
+        elif tag in authorBasedTags:
+            contents = "{} : {}".format(mostRecentAuthor, contents)
+        #Most tags only occur once so checking is cheaper than catching the KeyError
+        if tag in tagDict:
+            tagDict[tag].append(contents)
+        else:
+            tagDict[tag] = [contents]
+    if stringPool is not None:
+        tagDict = _internFields(tagDict, medlineInternedTags, stringPool)
     return tagDict
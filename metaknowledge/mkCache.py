@@ -0,0 +1,506 @@
+"""The binary format used for the caches of [RecordCollections](./classes/RecordCollection.html#metaknowledge.RecordCollection). Unlike a pickle reading a cache can only create records, exceptions and basic containers so it is safe to share them.
+
+A cache file is `cacheMagic` followed by 4 blocks, each prefixed by its length as an 8 byte little-endian integer:
+
+1. The header, a JSON object
+2. The lengths, in characters, of the strings in the string pool, as 4 byte integers
+3. The strings of the pool concatenated and encoded as utf-8
+4. The encoded value, as 4 byte integers
+
+Every string, including every tag, is stored once in the pool and referred to by its index. The value is encoded as a type code followed by its contents, see `_CacheEncoder`. The tags of the records that are not bad are stored in blocks prefixed with their length so they can be skipped when the cache is read, a record's tags are only decoded when it is first accessed. The blocks are still checked when the cache is read, so a damaged cache is found then and not when a record is used.
+"""
+import array
+import builtins
+import collections
+import collections.abc
+import itertools
+import json
+import struct
+import sys
+
+from . import mkExceptions
+from .mkExceptions import cacheError
+from .mkRecord import _slotNames
+
+from .WOS.recordWOS import WOSRecord, LazyFieldDict
+from .medline.recordMedline import MedlineRecord
+from .proquest.recordProQuest import ProQuestRecord
+from .scopus.recordScopus import ScopusRecord
+
+cacheMagic = b'mkCache\x01'
+
+#The classes that can be created when reading a cache
+recordClasses = {c.__name__ : c for c in (WOSRecord, MedlineRecord, ProQuestRecord, ScopusRecord)}
+
+#The type codes of the encoded values
+_NONE, _FALSE, _TRUE, _INT, _BIGINT, _FLOAT, _STR, _LIST, _TUPLE, _SET, _DICT, _ODICT, _ERROR, _RECORD, _DEFERRED, _STRLIST, _STRKEYDICT, _STRKEYODICT = range(18)
+
+_lengthStruct = struct.Struct('<Q')
+
+def writeCache(cacheName, header, value):
+    """Writes _value_ to the file _cacheName_ with the JSON serializable _header_.
+
+    # Parameters
+
+    _cacheName_ : `str`
+
+    > The path to the cache file
+
+    _header_ : `dict`
+
+    > Information about the cache, e.g. the metaknowledge version
+
+    _value_ : `object`
+
+    > The contents of the cache, it can contain `None`, `bools`, `ints`, `floats`, `strs`, `lists`, `tuples`, `sets`, `dicts`, exceptions and [Records](./classes/Record.html#metaknowledge.Record)
+    """
+    encoder = _CacheEncoder()
+    encoder.encode(value)
+    lengths = array.array('I', (len(s) for s in encoder.strings))
+    if sys.byteorder == 'big':
+        lengths.byteswap()
+        encoder.tokens.byteswap()
+    blocks = [
+        json.dumps(header).encode('utf-8'),
+        lengths.tobytes(),
+        ''.join(encoder.strings).encode('utf-8'),
+        encoder.tokens.tobytes(),
+    ]
+    with open(cacheName, 'wb') as f:
+        f.write(cacheMagic)
+        for block in blocks:
+            f.write(_lengthStruct.pack(len(block)))
+            f.write(block)
+
+def readCache(cacheName):
+    """Reads a cache written by [writeCache()](#metaknowledge.mkCache.writeCache).
+
+    `cacheError` is raised if the file is not a valid cache.
+
+    # Parameters
+
+    _cacheName_ : `str`
+
+    > The path to the cache file
+
+    # Returns
+
+    `tuple[dict, object]`
+
+    > The header and the value of the cache
+    """
+    with open(cacheName, 'rb') as f:
+        data = f.read()
+    if not data.startswith(cacheMagic):
+        raise cacheError("'{}' is not a metaknowledge cache".format(cacheName))
+    blocks = []
+    offset = len(cacheMagic)
+    try:
+        for i in range(4):
+            blockLength, = _lengthStruct.unpack_from(data, offset)
+            offset += _lengthStruct.size
+            if offset + blockLength > len(data):
+                raise cacheError("'{}' is truncated".format(cacheName))
+            blocks.append(data[offset:offset + blockLength])
+            offset += blockLength
+        header = json.loads(blocks[0].decode('utf-8'))
+        lengths = array.array('I')
+        lengths.frombytes(blocks[1])
+        tokens = array.array('I')
+        tokens.frombytes(blocks[3])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+            tokens.byteswap()
+        reader = _CacheReader(_CacheStrings(blocks[2].decode('utf-8'), lengths), tokens)
+        value, end = reader.decode(0)
+        if end != len(tokens):
+            raise cacheError("'{}' has data after its value".format(cacheName))
+        return header, value
+    except cacheError:
+        raise
+    except Exception as e:
+        #Any damage to the file must give a cacheError so the cache is rebuilt
+        raise cacheError("'{}' could not be read: {}".format(cacheName, e))
+
+class CachedFieldDict(collections.abc.Mapping):
+    """A read only mapping that acts as the `_fieldDict` of a [Record](./classes/Record.html#metaknowledge.Record) read from a cache. The tags are decoded from the cache the first time they are needed, they were checked when the cache was read so this cannot fail.
+
+    It only holds the encoding of its own tags and the string pool of the cache, both are dropped once it is decoded. Copying it gives the original `dict` or `OrderedDict`.
+    """
+    __slots__ = ('_strings', '_tokens', '_fields')
+
+    def __init__(self, strings, tokens):
+        self._strings = strings
+        self._tokens = tokens
+        self._fields = None
+
+    def _decoded(self):
+        if self._fields is None:
+            self._fields = _CacheReader(self._strings, self._tokens).decode(0)[0]
+            self._strings = None
+            self._tokens = None
+        return self._fields
+
+    def __getitem__(self, key):
+        return self._decoded()[key]
+
+    def __contains__(self, key):
+        return key in self._decoded()
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def copy(self):
+        return self._decoded().copy()
+
+class _CacheEncoder(object):
+    """Encodes values as a list of integers and a pool of strings.
+
+    The encodings are:
+
+    + `None`, `False` and `True` are just their type code
+    + `ints` from 0 to 2^32 - 1 are `_INT` then the value, other `ints` are `_BIGINT` then their string
+    + `floats` are `_FLOAT` then their `repr()`
+    + `strs` are `_STR` then their index in the pool
+    + `lists` of only `strs`, like the values of most tags, are `_STRLIST`, their length and then the strings' indices in the pool
+    + Other `lists`, `tuples` and `sets` are their type code, their length and then their elements
+    + `dicts` and `OrderedDicts` whose keys are all `strs`, like the tags of records, are `_STRKEYDICT` or `_STRKEYODICT`, their length and then the keys' indices in the pool alternating with the values
+    + Other `dicts` and `OrderedDicts` are their type code, their length and then their keys and values alternating
+    + Exceptions are `_ERROR`, their class name and their `args` as a `tuple`
+    + `Records` are `_RECORD`, their class name, the number of their attributes and the attributes' names and values, the values computed from the tags are not stored. The tags of `Records` that are not bad are `_DEFERRED`, the length of their encoding and then their encoding. If the tags are a `CachedFieldDict` that has not been decoded its encoding is copied, with the string indices changed to this pool's, and the tags of a lazily read record are encoded without being kept by it
+    """
+    def __init__(self):
+        self.tokens = array.array('I')
+        self.strings = []
+        self._stringIndices = {}
+        #Maps each _CacheStrings that tags were copied from to the indices in this pool of its strings
+        self._poolIndices = {}
+
+    def addString(self, s):
+        try:
+            self.tokens.append(self._stringIndices[s])
+        except KeyError:
+            self._stringIndices[s] = len(self.strings)
+            self.tokens.append(len(self.strings))
+            self.strings.append(s)
+
+    def encode(self, value):
+        tokens = self.tokens
+        if value is None:
+            tokens.append(_NONE)
+        elif value is False:
+            tokens.append(_FALSE)
+        elif value is True:
+            tokens.append(_TRUE)
+        elif isinstance(value, str):
+            tokens.append(_STR)
+            self.addString(value)
+        elif isinstance(value, int):
+            if 0 <= value < 2 ** 32:
+                tokens.append(_INT)
+                tokens.append(value)
+            else:
+                tokens.append(_BIGINT)
+                self.addString(str(value))
+        elif isinstance(value, float):
+            tokens.append(_FLOAT)
+            self.addString(repr(value))
+        elif type(value).__name__ in recordClasses:
+            #Records are Mappings so must be checked first
+            self.encodeRecord(value)
+        elif isinstance(value, collections.abc.Mapping):
+            ordered = isinstance(value, collections.OrderedDict) or not isinstance(value, dict)
+            strKeys = all(isinstance(k, str) for k in value.keys())
+            if strKeys:
+                tokens.append(_STRKEYODICT if ordered else _STRKEYDICT)
+            else:
+                tokens.append(_ODICT if ordered else _DICT)
+            tokens.append(len(value))
+            for k, v in value.items():
+                if strKeys:
+                    self.addString(k)
+                else:
+                    self.encode(k)
+                self.encode(v)
+        elif isinstance(value, list) and all(isinstance(v, str) for v in value):
+            tokens.append(_STRLIST)
+            tokens.append(len(value))
+            for v in value:
+                self.addString(v)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            if isinstance(value, list):
+                tokens.append(_LIST)
+            elif isinstance(value, tuple):
+                tokens.append(_TUPLE)
+            else:
+                tokens.append(_SET)
+            tokens.append(len(value))
+            for v in value:
+                self.encode(v)
+        elif isinstance(value, BaseException):
+            tokens.append(_ERROR)
+            self.addString(type(value).__name__)
+            self.encode(tuple(value.args))
+        else:
+            raise cacheError("{} cannot be cached".format(type(value)))
+
+    def encodeRecord(self, R):
+        tokens = self.tokens
+        tokens.append(_RECORD)
+        self.addString(type(R).__name__)
+        state = {k : v for k, v in R._state().items() if k != '_computedFields'}
+        tokens.append(len(state))
+        for k, v in state.items():
+            self.addString(k)
+            if k == '_fieldDict' and not R.bad:
+                tokens.append(_DEFERRED)
+                lengthIndex = len(tokens)
+                tokens.append(0)
+                if isinstance(v, CachedFieldDict) and v._fields is None:
+                    self.copyFields(v._strings, v._tokens)
+                elif isinstance(v, LazyFieldDict):
+                    #The tags are parsed without being kept so the record stays lazy
+                    self.encode(v.fields())
+                else:
+                    self.encode(v)
+                tokens[lengthIndex] = len(tokens) - lengthIndex - 1
+            else:
+                self.encode(v)
+
+    def copyFields(self, strings, fieldTokens):
+        """Adds the tags encoded in _fieldTokens_, using the `_CacheStrings` _strings_, without decoding them. The encoding was checked by `_CacheReader.checkFields()` so it only has the types it allows."""
+        try:
+            poolIndices = self._poolIndices[strings]
+        except KeyError:
+            poolIndices = [None] * len(strings)
+            self._poolIndices[strings] = poolIndices
+        addString = self.addString
+        tokens = self.tokens
+
+        def copyString(index):
+            newIndex = poolIndices[index]
+            if newIndex is None:
+                addString(strings.get(index))
+                poolIndices[index] = tokens[-1]
+            else:
+                tokens.append(newIndex)
+
+        def copyValue(i):
+            code = fieldTokens[i]
+            tokens.append(code)
+            i += 1
+            if code == _STRLIST:
+                length = fieldTokens[i]
+                tokens.append(length)
+                for index in fieldTokens[i + 1:i + 1 + length]:
+                    copyString(index)
+                return i + 1 + length
+            elif code == _STRKEYDICT or code == _STRKEYODICT or code == _LIST or code == _TUPLE:
+                length = fieldTokens[i]
+                tokens.append(length)
+                i += 1
+                for j in range(length):
+                    if code == _STRKEYDICT or code == _STRKEYODICT:
+                        copyString(fieldTokens[i])
+                        i += 1
+                    i = copyValue(i)
+                return i
+            elif code == _STR or code == _BIGINT or code == _FLOAT:
+                copyString(fieldTokens[i])
+                return i + 1
+            elif code == _INT:
+                tokens.append(fieldTokens[i])
+                return i + 1
+            else:
+                return i
+
+        copyValue(0)
+
+class _CacheStrings(object):
+    """The string pool of a cache, the strings are only sliced out of _text_ when they are first used."""
+    __slots__ = ('text', 'offsets', 'strings')
+
+    def __init__(self, text, lengths):
+        self.text = text
+        self.offsets = array.array('Q', itertools.chain([0], itertools.accumulate(lengths)))
+        if self.offsets[-1] != len(text):
+            raise cacheError("The string pool does not match its lengths")
+        self.strings = [None] * len(lengths)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def get(self, index):
+        s = self.strings[index]
+        if s is None:
+            s = self.text[self.offsets[index]:self.offsets[index + 1]]
+            self.strings[index] = s
+        return s
+
+class _CacheReader(object):
+    """Decodes the values encoded by `_CacheEncoder` in _tokens_, using the `_CacheStrings` _strings_."""
+    def __init__(self, strings, tokens):
+        self.strings = strings
+        self.string = strings.get
+        self.tokens = tokens
+
+    def decode(self, i):
+        """Decodes the value starting at token _i_ and returns it and the index of the token after it"""
+        tokens = self.tokens
+        code = tokens[i]
+        i += 1
+        if code == _STR:
+            return self.string(tokens[i]), i + 1
+        elif code == _STRLIST:
+            length = tokens[i]
+            string = self.string
+            return [string(j) for j in tokens[i + 1:i + 1 + length]], i + 1 + length
+        elif code == _LIST or code == _TUPLE or code == _SET:
+            length = tokens[i]
+            i += 1
+            values = []
+            for j in range(length):
+                v, i = self.decode(i)
+                values.append(v)
+            if code == _TUPLE:
+                return tuple(values), i
+            elif code == _SET:
+                return set(values), i
+            return values, i
+        elif code == _STRKEYDICT or code == _STRKEYODICT:
+            length = tokens[i]
+            i += 1
+            d = collections.OrderedDict() if code == _STRKEYODICT else {}
+            string = self.string
+            for j in range(length):
+                k = string(tokens[i])
+                if tokens[i + 1] == _STRLIST:
+                    #Inlined as this is the value of almost every tag
+                    valueLength = tokens[i + 2]
+                    i += 3
+                    d[k] = [string(n) for n in tokens[i:i + valueLength]]
+                    i += valueLength
+                else:
+                    d[k], i = self.decode(i + 1)
+            return d, i
+        elif code == _DICT or code == _ODICT:
+            length = tokens[i]
+            i += 1
+            d = collections.OrderedDict() if code == _ODICT else {}
+            for j in range(length):
+                k, i = self.decode(i)
+                d[k], i = self.decode(i)
+            return d, i
+        elif code == _NONE:
+            return None, i
+        elif code == _FALSE:
+            return False, i
+        elif code == _TRUE:
+            return True, i
+        elif code == _INT:
+            return tokens[i], i + 1
+        elif code == _BIGINT:
+            return int(self.string(tokens[i])), i + 1
+        elif code == _FLOAT:
+            return float(self.string(tokens[i])), i + 1
+        elif code == _RECORD:
+            return self.decodeRecord(i)
+        elif code == _ERROR:
+            errorName = self.string(tokens[i])
+            args, i = self.decode(i + 1)
+            errorClass = getattr(mkExceptions, errorName, None) or getattr(builtins, errorName, None)
+            if not isinstance(errorClass, type) or not issubclass(errorClass, BaseException):
+                raise cacheError("'{}' is not a known exception".format(errorName))
+            return errorClass(*args), i
+        else:
+            raise cacheError("Unknown type code {} at {}".format(code, i - 1))
+
+    def decodeRecord(self, i):
+        tokens = self.tokens
+        try:
+            recordClass = recordClasses[self.string(tokens[i])]
+        except KeyError:
+            raise cacheError("'{}' is not a known record type".format(self.string(tokens[i])))
+        attributeNames = _slotNames(recordClass)
+        numAttributes = tokens[i + 1]
+        i += 2
+        R = recordClass.__new__(recordClass)
+        state = {}
+        for j in range(numAttributes):
+            k = self.string(tokens[i])
+            if k not in attributeNames or k == '_computedFields':
+                raise cacheError("'{}' is not an attribute of {}".format(k, recordClass.__name__))
+            if tokens[i + 1] == _DEFERRED:
+                start = i + 3
+                i = start + tokens[i + 2]
+                if k != '_fieldDict':
+                    raise cacheError("'{}' of a {} cannot be deferred".format(k, recordClass.__name__))
+                self.checkFields(start, i)
+                state[k] = CachedFieldDict(self.strings, tokens[start:i])
+            else:
+                state[k], i = self.decode(i + 1)
+        state['_computedFields'] = {}
+        R.__setstate__(state)
+        return R, i
+
+    def checkFields(self, start, end):
+        """Checks that the tags in tokens _start_ to _end_ can be decoded, without decoding them. Tags can only contain strings, numbers, `None`, `bools` and `lists`, `tuples` and `dicts` with string keys of them.
+
+        Every string index in the tags is at most the largest token in them, so the indices are only checked one by one if that is not in the pool.
+        """
+        tokens = self.tokens
+        if end > len(tokens) or start >= end or (tokens[start] != _STRKEYDICT and tokens[start] != _STRKEYODICT):
+            raise cacheError("The tags at {} are not a dict".format(start))
+        checkStrings = max(tokens[start:end]) >= len(self.strings)
+        if self.checkValue(start, checkStrings) != end:
+            raise cacheError("The tags at {} do not match their length".format(start))
+
+    def checkValue(self, i, checkStrings):
+        """Checks the value starting at token _i_ like `checkFields()` and returns the index of the token after it, if _checkStrings_ is `False` the string indices are known to be in the pool"""
+        tokens = self.tokens
+        numStrings = len(self.strings)
+        code = tokens[i]
+        i += 1
+        if code == _STRLIST:
+            length = tokens[i]
+            if checkStrings and length > 0 and max(tokens[i + 1:i + 1 + length]) >= numStrings:
+                raise cacheError("The list of strings at {} is damaged".format(i - 1))
+            return i + 1 + length
+        elif code == _STRKEYDICT or code == _STRKEYODICT:
+            length = tokens[i]
+            i += 1
+            for j in range(length):
+                if checkStrings and tokens[i] >= numStrings:
+                    raise cacheError("The string at {} is not in the pool".format(i))
+                if tokens[i + 1] == _STRLIST:
+                    #Inlined as this is the value of almost every tag
+                    valueLength = tokens[i + 2]
+                    i += 3
+                    if checkStrings and valueLength > 0 and max(tokens[i:i + valueLength]) >= numStrings:
+                        raise cacheError("The list of strings at {} is damaged".format(i - 3))
+                    i += valueLength
+                else:
+                    i = self.checkValue(i + 1, checkStrings)
+            return i
+        elif code == _LIST or code == _TUPLE:
+            length = tokens[i]
+            i += 1
+            for j in range(length):
+                i = self.checkValue(i, checkStrings)
+            return i
+        elif code == _STR or code == _BIGINT or code == _FLOAT:
+            s = self.string(tokens[i])
+            if code == _BIGINT:
+                int(s)
+            elif code == _FLOAT:
+                float(s)
+            return i + 1
+        elif code == _INT:
+            return i + 1
+        elif code == _NONE or code == _FALSE or code == _TRUE:
+            return i
+        else:
+            raise cacheError("The type code {} at {} cannot be in the tags of a record".format(code, i - 1))
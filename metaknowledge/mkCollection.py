@@ -1,4 +1,5 @@
 import copy
+import hashlib
 import pickle
 import os
 import os.path
@@ -14,8 +15,10 @@ import networkx as nx
 from .progressBar import _ProgressBar
 
 from .RCglimpse import _glimpse
+from .aggregation import aggregateCounts, _rankCounts
 
 from .constants import __version__
+from .mkCache import readCache, writeCache
 
 from .mkExceptions import CollectionTypeError, cacheError, TagError, mkException
 
@@ -406,16 +409,235 @@ class Collection(collections.abc.MutableSet, collections.abc.Hashable):
         with open(cacheFile, 'wb') as f:
             pickle.dump((dat, self), f)
 
+    def _loadFileCache(self, cacheName, flist, extension):
+        """Reads the per file cache written by `_createFileCache()`, in the format of the [mkCache](../modules/mkCache.html) module, and gives the cached results of the files in _flist_ that have not changed. A file is unchanged if its size is the same and either its modification time or the hash of its contents is the same, so the contents are only read if the modification time changed.
+
+        If the cache cannot be used at all it is deleted and nothing is returned.
+
+        # Returns
+
+        `tuple[dict[str : tuple], bool]`
+
+        > The first element maps each unchanged file to its cache entry, a tuple of its size, modification time, hash and the results of the files read from it (one for each file in it if it is an archive), each a tuple of the label of the file, item type, items and error. The second is `True` if the cache has exactly the files in _flist_ with their current modification times, so it does not need to be written again
+        """
+        if not os.path.isfile(cacheName):
+            return {}, False
+        try:
+            dat, fileEntries = readCache(cacheName)
+            if dat["metaknowledge Version"] != __version__:
+                raise cacheError("mk version mismatch")
+            if dat["File Extension"] != extension:
+                raise cacheError("Extension mismatch")
+            if not isinstance(fileEntries, dict):
+                raise cacheError("Not a per file cache")
+        except (cacheError, KeyError, TypeError):
+            os.remove(cacheName)
+            return {}, False
+        #Any file that was added, dropped, changed or touched means the cache must be rewritten
+        upToDate = len(fileEntries) == len(flist)
+        unchangedFiles = {}
+        for fileName in flist:
+            try:
+                fileSize, fileMtime, fileHash, results = fileEntries[fileName]
+            except (KeyError, ValueError):
+                upToDate = False
+                continue
+            fileStat = os.stat(fileName)
+            if fileStat.st_size != fileSize:
+                upToDate = False
+                continue
+            elif fileStat.st_mtime != fileMtime:
+                upToDate = False
+                if _fileHash(fileName) != fileHash:
+                    continue
+                fileMtime = fileStat.st_mtime
+            unchangedFiles[fileName] = (fileSize, fileMtime, fileHash, results)
+        return unchangedFiles, upToDate
+
+    def _createFileCache(self, cacheName, fileResults, extension, unchangedFiles = None):
+        """Writes the per file cache read by `_loadFileCache()`. _fileResults_ maps each file to a list of the results of the files read from it, each a tuple of the file's label, item type, items and error, the entries in _unchangedFiles_ (as given by `_loadFileCache()`) are reused for the files in it so they do not need to be hashed again.
+        """
+        if unchangedFiles is None:
+            unchangedFiles = {}
+        dat = {
+            "metaknowledge Version" : __version__,
+            "File Extension" : extension,
+        }
+        fileEntries = {}
+        for fileName, results in fileResults.items():
+            if fileName in unchangedFiles:
+                fileSize, fileMtime, fileHash = unchangedFiles[fileName][:3]
+            else:
+                fileStat = os.stat(fileName)
+                fileSize, fileMtime, fileHash = fileStat.st_size, fileStat.st_mtime, _fileHash(fileName)
+            fileEntries[fileName] = (fileSize, fileMtime, fileHash, results)
+        writeCache(cacheName, dat, fileEntries)
+
 class CollectionWithIDs(Collection):
     """A [Collection](./Collection.html#metaknowledge.Collection) with a few extra methods that assume all the contained items have an id attribute and a bad attribute, e.g. [Records](./Record.html#metaknowledge.Record) or [Grants](./Grant.html#metaknowledge.grants.Grant).
 
     \_\_Init\_\_
 
     As `CollectionWithIDs` is mostly meant to be base for other classes all but one of the arguments in the `__init__` are not optional and the optional one is not used. The `__init__()` function is the same as a [Collection](./Collection.html#metaknowledge.Collection).
+
+    The items are indexed by their ids so the methods that take an id do not search the whole collection. The index, like any other index of a subclass, is made the first time it is used and then kept up to date by `add()`, `discard()`, `remove()`, `pop()`, `clear()` and the in place operators (`|=`, `-=`, etc), if the collection is changed in any other way the indexes are remade when next needed.
     """
     def __init__(self, inSet, allowedTypes, collectedTypes, name, bad, errors, quietStart = False):
 
         Collection.__init__(self, inSet, allowedTypes, collectedTypes, name, bad, errors, quietStart = quietStart)
+        self._clearIndexes()
+
+    def __getstate__(self):
+        #The indexes are remade when needed instead of being pickled
+        state = self.__dict__.copy()
+        state.update(self._emptyIndexes())
+        state['_indexedCollection'] = None
+        return state
+
+    #The indexes are all made from the same _collection and kept up to date together
+
+    def _emptyIndexes(self):
+        #The attributes holding the indexes with their values when there are no indexes
+        return {'_idIndex' : None}
+
+    def _clearIndexes(self):
+        self.__dict__.update(self._emptyIndexes())
+        self._indexedCollection = None
+        self._indexedLength = 0
+
+    def _indexesValid(self):
+        #If the indexes were made from the current _collection and it has not been changed without updating them
+        return self.__dict__.get('_indexedCollection') is self._collection and self._indexedLength == len(self._collection)
+
+    def _checkIndexes(self):
+        #Drops the indexes if the collection was changed without updating them
+        if not self._indexesValid():
+            self._clearIndexes()
+            self._indexedCollection = self._collection
+            self._indexedLength = len(self._collection)
+
+    def _addToIndexes(self, elem):
+        #Called after elem was added to a collection with valid indexes
+        self._indexedLength += 1
+        if self._idIndex is not None:
+            self._idIndex.setdefault(elem.id, elem)
+
+    def _removeFromIndexes(self, elem):
+        #Called after elem was removed from a collection with valid indexes
+        self._indexedLength -= 1
+        if self._idIndex is not None:
+            if len(self._idIndex) == self._indexedLength + 1:
+                #There are no duplicate ids so elem was the only item with its id
+                self._idIndex.pop(elem.id, None)
+            else:
+                self._idIndex = None
+
+    def _getIDIndex(self):
+        """Gives the `dict` mapping the ids of the items to the items, making it if it is not up to date. If multiple items have the same id one of them is in the index.
+        """
+        self._checkIndexes()
+        if self._idIndex is None:
+            idIndex = {}
+            for i in self._collection:
+                idIndex.setdefault(i.id, i)
+            self._idIndex = idIndex
+        return self._idIndex
+
+    #The mutating methods of Collection with the indexes kept up to date
+
+    def add(self, elem):
+        """ Adds _elem_ to the collection.
+
+        # Parameters
+
+        _elem_ : `object`
+
+        > The object to be added
+        """
+        indexesValid = self._indexesValid()
+        Collection.add(self, elem)
+        if indexesValid and len(self._collection) != self._indexedLength:
+            self._addToIndexes(elem)
+
+    def discard(self, elem):
+        """Removes _elem_ from the collection, will not raise an Exception if _elem_ is missing
+
+        # Parameters
+
+        _elem_ : `object`
+
+        > The object to be removed
+
+        """
+        indexesValid = self._indexesValid()
+        Collection.discard(self, elem)
+        if indexesValid and len(self._collection) != self._indexedLength:
+            self._removeFromIndexes(elem)
+
+    def remove(self, elem):
+        """Removes _elem_ from the collection, will raise a KeyError is _elem_ is missing
+
+        # Parameters
+
+        _elem_ : `object`
+
+        > The object to be removed
+        """
+        indexesValid = self._indexesValid()
+        Collection.remove(self, elem)
+        if indexesValid:
+            self._removeFromIndexes(elem)
+
+    def pop(self):
+        """Removes a random element from the collection and returns it
+
+        # Returns
+
+        `object`
+
+        > A random object from the collection
+        """
+        indexesValid = self._indexesValid()
+        elem = Collection.pop(self)
+        if indexesValid:
+            self._removeFromIndexes(elem)
+        return elem
+
+    def clear(self):
+        """"Removes all elements from the collection and resets the error handling
+        """
+        Collection.clear(self)
+        self._clearIndexes()
+
+    def __ior__(self, other):
+        if type(self) != type(other) or not self._indexesValid():
+            return Collection.__ior__(self, other)
+        added = [i for i in other._collection if i not in self._collection]
+        Collection.__ior__(self, other)
+        for i in added:
+            self._addToIndexes(i)
+        return self
+
+    def __isub__(self, other):
+        if type(self) != type(other) or not self._indexesValid():
+            return Collection.__isub__(self, other)
+        removed = [i for i in other._collection if i in self._collection]
+        Collection.__isub__(self, other)
+        for i in removed:
+            self._removeFromIndexes(i)
+        return self
+
+    def __iand__(self, other):
+        retVal = Collection.__iand__(self, other)
+        if retVal is self:
+            self._clearIndexes()
+        return retVal
+
+    def __ixor__(self, other):
+        retVal = Collection.__ixor__(self, other)
+        if retVal is self:
+            self._clearIndexes()
+        return retVal
 
     def containsID(self, idVal):
         """Checks if the collected items contains the give _idVal_
@@ -432,10 +654,7 @@ class CollectionWithIDs(Collection):
 
         > `True` if the item is in the collection
         """
-        for i in self:
-            if i.id == idVal:
-                return True
-        return False
+        return idVal in self._getIDIndex()
 
     def discardID(self, idVal):
         """Checks if the collected items contains the give _idVal_ and discards it if it is found, will not raise an exception if item is not found
@@ -446,10 +665,10 @@ class CollectionWithIDs(Collection):
 
         > The discarded id string
         """
-        for i in self:
-            if i.id == idVal:
-                self._collection.discard(i)
-                return
+        try:
+            self.discard(self._getIDIndex()[idVal])
+        except KeyError:
+            pass
 
     def removeID(self, idVal):
         """Checks if the collected items contains the give _idVal_ and removes it if it is found, will raise a `KeyError` if item is not found
@@ -460,11 +679,11 @@ class CollectionWithIDs(Collection):
 
         > The removed id string
         """
-        for i in self:
-            if i.id == idVal:
-                self._collection.remove(i)
-                return
-        raise KeyError("A Record with the ID '{}' was not found in the RecordCollection: '{}'.".format(idVal, self))
+        try:
+            elem = self._getIDIndex()[idVal]
+        except KeyError:
+            raise KeyError("A Record with the ID '{}' was not found in the RecordCollection: '{}'.".format(idVal, self)) from None
+        self.remove(elem)
 
     def getID(self, idVal):
         """Looks up an item with _idVal_ and returns it if it is found, returns `None` if it does not find the item
@@ -481,10 +700,7 @@ class CollectionWithIDs(Collection):
 
         > The requested object or `None`
         """
-        for i in self:
-            if i.id == idVal:
-                return i
-        return None
+        return self._getIDIndex().get(idVal)
 
     def badEntries(self):
         """Creates a new collection of the same type with only the bad entries
@@ -522,7 +738,32 @@ class CollectionWithIDs(Collection):
             tags |= set(i.keys())
         return tags
 
-    def glimpse(self, *tags, compact = False):
+    def aggregateCounts(self, *specs, workers = 1):
+        """Counts the values of many tags of the `Records` in one pass over the collection, see [aggregateCounts()](../modules/aggregation.html#metaknowledge.aggregation.aggregateCounts) for the specs that can be given. This is what [glimpse()](#metaknowledge.CollectionWithIDs.glimpse), [rankedSeries()](#metaknowledge.CollectionWithIDs.rankedSeries), [timeSeries()](#metaknowledge.CollectionWithIDs.timeSeries) and [cooccurrenceCounts()](#metaknowledge.CollectionWithIDs.cooccurrenceCounts) use.
+
+        ```
+        >>> authCounts, journalCounts = RC.aggregateCounts('authorsFull', 'journal')
+        ```
+
+        # Parameters
+
+        _specs_ : `str or tuple, str or tuple, ...`
+
+        > Any number of tags, or tuples of the kind of count and its tags, e.g. `('yearCount', 'journal')`
+
+        _workers_ : `optional [int]`
+
+        > Default `1`, the number of processes the `Records` are split between. The `Records` and counts have to be sent between the processes so this is usually slower, see [aggregateCounts()](../modules/aggregation.html#metaknowledge.aggregation.aggregateCounts) for when it helps
+
+        # Returns
+
+        `list[dict]`
+
+        > The counts for each of the _specs_, in the same order
+        """
+        return aggregateCounts(self, *specs, workers = workers)
+
+    def glimpse(self, *tags, compact = False, maxEntries = None):
         """Creates a printable table with the most frequently occurring values of each of the requested _tags_, or if none are provided the top authors, journals and citations. The table will be as wide and as tall as the terminal (or 80x24 if there is no terminal) so `print(RC.glimpse())`should always create a nice looking table. Below is a table created from some of the testing files:
 
         ```
@@ -558,15 +799,19 @@ class CollectionWithIDs(Collection):
 
         > Any number of tag strings to be made into columns in the output table
 
+        _maxEntries_ : `optional [int]`
+
+        > Default `None`, if given each column is counted approximately keeping only _maxEntries_ values, see [rankedSeries()](#metaknowledge.CollectionWithIDs.rankedSeries), which saves memory when there are very many distinct values, e.g. citations
+
         # Returns
 
         `str`
 
         > A string containing the table
         """
-        return _glimpse(self, *tags, compact = compact)
+        return _glimpse(self, *tags, compact = compact, maxEntries = maxEntries)
 
-    def rankedSeries(self, tag, outputFile = None, giveCounts = True, giveRanks = False, greatestFirst = True, pandasMode = True, limitTo = None):
+    def rankedSeries(self, tag, outputFile = None, giveCounts = True, giveRanks = False, greatestFirst = True, pandasMode = True, limitTo = None, maxEntries = None):
         """Creates an pandas dict of the ordered list of all the values of _tag_, with and ranked by their number of occurrences. A list can also be returned with the the counts or ranks added or it can be written to a file.
 
         # Parameters
@@ -599,68 +844,17 @@ class CollectionWithIDs(Collection):
 
         > Default `None`, if a list is provided only those values in the list will be counted or returned
 
+        _maxEntries_ : `optional [int]`
+
+        > Default `None`, if given only about the _maxEntries_ most common values are kept, using a [SpaceSavingCounter](../modules/aggregation.html#metaknowledge.aggregation.SpaceSavingCounter), so the memory used is fixed. The counts are then estimates that can be too high by at most the total count divided by _maxEntries_, and values rarer than that may be missing. This is for finding the top values of tags with very many distinct values, e.g. `'citations'`
+
         # Returns
 
         `dict[str:list[value]] or list[str]`
 
         > A `dict` or `list` will be returned depending on if _pandasMode_ is `True`
         """
-        if giveRanks and giveCounts:
-            raise mkException("rankedSeries cannot return counts and ranks only one of giveRanks or giveCounts can be True.")
-        seriesDict = {}
-        for R in self:
-            #This should be faster than using get, since get is a wrapper for __getitem__
-            try:
-                val = R[tag]
-            except KeyError:
-                continue
-            if not isinstance(val, list):
-                val = [val]
-            for entry in val:
-                if limitTo and entry not in limitTo:
-                    continue
-                if entry in seriesDict:
-                    seriesDict[entry] += 1
-                else:
-                    seriesDict[entry] = 1
-        seriesList = sorted(seriesDict.items(), key = lambda x: x[1], reverse = greatestFirst)
-        if outputFile is not None:
-            with open(outputFile, 'w') as f:
-                writer = csv.writer(f, dialect = 'excel')
-                writer.writerow((str(tag), 'count'))
-                writer.writerows(seriesList)
-        if giveCounts and not pandasMode:
-            return seriesList
-        elif giveRanks or pandasMode:
-            if not greatestFirst:
-                seriesList.reverse()
-            currentRank = 1
-            retList = []
-            panDict = {'entry' : [], 'count' : [], 'rank' : []}
-            try:
-                currentCount = seriesList[0][1]
-            except IndexError:
-                #Empty series so no need to loop
-                pass
-            else:
-                for valString, count in seriesList:
-                    if currentCount > count:
-                        currentRank += 1
-                        currentCount = count
-                    if pandasMode:
-                        panDict['entry'].append(valString)
-                        panDict['count'].append(count)
-                        panDict['rank'].append(currentRank)
-                    else:
-                        retList.append((valString, currentRank))
-            if not greatestFirst:
-                retList.reverse()
-            if pandasMode:
-                return panDict
-            else:
-                return retList
-        else:
-            return [e for e,c in seriesList]
+        return rankedSeries(self, tag, outputFile = outputFile, giveCounts = giveCounts, giveRanks = giveRanks, greatestFirst = greatestFirst, pandasMode = pandasMode, limitTo = limitTo, maxEntries = maxEntries)
 
     def timeSeries(self, tag = None, outputFile = None, giveYears = True, greatestFirst = True, limitTo = False, pandasMode = True):
         """Creates an pandas dict of the ordered list of all the values of _tag_, with and ranked by the year the occurred in, multiple year occurrences will create multiple entries. A list can also be returned with the the counts or years added or it can be written to a file.
@@ -699,32 +893,7 @@ class CollectionWithIDs(Collection):
 
         > A `dict` or `list` will be returned depending on if _pandasMode_ is `True`
         """
-        seriesDict = {}
-        for R in self:
-            #This should be faster than using get, since get is a wrapper for __getitem__
-            try:
-                year = R['year']
-            except KeyError:
-                continue
-            if tag is None:
-                seriesDict[R] = {year : 1}
-            else:
-                try:
-                    val = R[tag]
-                except KeyError:
-                    continue
-                if not isinstance(val, list):
-                    val = [val]
-                for entry in val:
-                    if limitTo and entry not in limitTo:
-                        continue
-                    if entry in seriesDict:
-                        try:
-                            seriesDict[entry][year] += 1
-                        except KeyError:
-                            seriesDict[entry][year] = 1
-                    else:
-                        seriesDict[entry] = {year : 1}
+        seriesDict = self.aggregateCounts(('yearCount', tag, limitTo))[0]
         seriesList = []
         for e, yd in seriesDict.items():
             seriesList += [(e, y) for y in yd.keys()]
@@ -772,37 +941,7 @@ class CollectionWithIDs(Collection):
         for tag in countedTags:
             if not isinstance(tag, str):
                 raise TagError("'{}' is not a string it cannot be used as a tag.".format(tag))
-        occurenceDict = {}
-        progArgs = (0, "Starting to count the co-occurrences of '{}' and' {}'".format(keyTag, "','".join(countedTags)))
-        if metaknowledge.VERBOSE_MODE:
-            progKwargs = {'dummy' : False}
-        else:
-            progKwargs = {'dummy' : True}
-        with _ProgressBar(*progArgs, **progKwargs) as PBar:
-
-            for i, R in enumerate(self):
-                PBar.updateVal(i / len(self), "Analyzing {}".format(R))
-                keyVal = R.get(keyTag)
-                if keyVal is None:
-                    continue
-                if not isinstance(keyVal, list):
-                    keyVal = [keyVal]
-                for key in keyVal:
-                    if key not in occurenceDict:
-                        occurenceDict[key] = {}
-                for tag in countedTags:
-                    tagval = R.get(tag)
-                    if tagval is None:
-                        continue
-                    if not isinstance(tagval, list):
-                        tagval = [tagval]
-                    for val in tagval:
-                        for key in keyVal:
-                            try:
-                                occurenceDict[key][val] += 1
-                            except KeyError:
-                                occurenceDict[key][val] = 1
-            PBar.finish("Done extracting the co-occurrences of '{}' and '{}'".format(keyTag, "','".join(countedTags)))
+        occurenceDict = self.aggregateCounts(('cooccurrence', keyTag) + countedTags)[0]
         return occurenceDict
 
     def networkMultiLevel(self, *modes, nodeCount = True, edgeWeight = True, stemmer = None, edgeAttribute = None, nodeAttribute = None, _networkTypeString = 'n-level network'):
@@ -1306,3 +1445,42 @@ class CollectionWithIDs(Collection):
             if PBar:
                 PBar.finish("Done making a {}-mode network of: {}".format(len(tags), ', '.join(tags)))
         return grph
+
+def rankedSeries(records, tag, outputFile = None, giveCounts = True, giveRanks = False, greatestFirst = True, pandasMode = True, limitTo = None, maxEntries = None):
+    """The function behind [rankedSeries()](../classes/Collection.html#metaknowledge.Collection.rankedSeries), it takes any iterable of `Records`, so it can be used with the generator from [iterRecords()](#metaknowledge.fileHandlers.iterRecords) to count the values of _tag_ without loading all the records. The other parameters and the returned value are the same as the method's.
+
+    # Parameters
+
+    _records_ : `iterable[Record]`
+
+    > The `Records` to be counted
+
+    _tag_ : `str`
+
+    > The tag to be ranked
+
+    _maxEntries_ : `optional [int]`
+
+    > Default `None`, if given the values are counted approximately in fixed memory, which works well with a generator of `Records` too large to load at once
+
+    # Returns
+
+    `dict[str:list[value]] or list[str]`
+
+    > A `dict` or `list` will be returned depending on if _pandasMode_ is `True`
+    """
+    if giveRanks and giveCounts:
+        raise mkException("rankedSeries cannot return counts and ranks only one of giveRanks or giveCounts can be True.")
+    if maxEntries is None:
+        seriesDict = aggregateCounts(records, ('count', tag, limitTo))[0]
+    else:
+        seriesDict = aggregateCounts(records, ('topCount', tag, maxEntries, limitTo))[0]
+    return _rankCounts(seriesDict, giveCounts = giveCounts, giveRanks = giveRanks, greatestFirst = greatestFirst, pandasMode = pandasMode, outputFile = outputFile, tag = tag)
+
+def _fileHash(fileName):
+    """Gives the sha1 hex digest of the contents of the file _fileName_, this is used to check if cached files have changed"""
+    fileHash = hashlib.sha1()
+    with open(fileName, 'rb') as f:
+        for block in iter(lambda: f.read(2 ** 20), b''):
+            fileHash.update(block)
+    return fileHash.hexdigest()
@@ -18,6 +18,8 @@ except ImportError:
     import collections
     collections.abc = collections
 import copy
+import io
+import sys
 
 from .constants import commonRecordFields
 
@@ -25,6 +27,41 @@ from .mkExceptions import BadRecord
 
 from .genders.nameGender import recordGenders
 
+_slotNamesCache = {}
+
+def _internFields(fieldDict, internedTags, stringPool):
+    #Gives a copy of fieldDict where the tags and the values of the tags in internedTags are the strings in stringPool, equal strings from different records are then the same object
+    internedDict = type(fieldDict)()
+    for tag, value in fieldDict.items():
+        tag = stringPool.setdefault(tag, tag)
+        if tag in internedTags:
+            if isinstance(value, str):
+                value = stringPool.setdefault(value, value)
+            else:
+                value = [stringPool.setdefault(v, v) for v in value]
+        internedDict[tag] = value
+    return internedDict
+
+def _internRecords(records, stringPool):
+    #Interns the strings of the records in stringPool, lazily read and cached records are skipped as their tags are not parsed or decoded yet
+    for R in records:
+        if isinstance(R._fieldDict, dict):
+            R._fieldDict = _internFields(R._fieldDict, getattr(R, '_internedTags', ()), stringPool)
+
+def _slotNames(cls):
+    #The names of all the __slots__ of _cls_ and its bases, not including '__weakref__' and '__dict__'
+    try:
+        return _slotNamesCache[cls]
+    except KeyError:
+        names = []
+        for c in reversed(cls.__mro__):
+            slots = c.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names += [k for k in slots if k not in ('__weakref__', '__dict__') and k not in names]
+        _slotNamesCache[cls] = tuple(names)
+        return _slotNamesCache[cls]
+
 class Record(collections.abc.Mapping, collections.abc.Hashable):
     """A dictionary with error handling and an id string.
 
@@ -72,9 +109,13 @@ class Record(collections.abc.Mapping, collections.abc.Hashable):
     #This is for the documentation generation, it doesn't do anything on its own
     _documented = ['__hash__', '__eq__', '__str__', '__repr__']
 
+    #There can be millions of records so they do not get a __dict__, subclasses that do not give __slots__ will have one though
+    __slots__ = ('_sourceFile', '_sourceLine', 'bad', 'error', '_id', '_fieldDict', '__weakref__')
+
     def __init__(self, fieldDict, idValue, bad, error, sFile = "", sLine = 0):
         #File stuff for debug/error messages
-        self._sourceFile = sFile
+        #All the records from a file share the one string
+        self._sourceFile = sys.intern(sFile) if type(sFile) is str else sFile
         self._sourceLine = sLine
 
         #Error message stuff
@@ -190,14 +231,30 @@ class Record(collections.abc.Mapping, collections.abc.Hashable):
             return bytes(''.join(strLst), self.encoding())
 
     def __getstate__(self):
-        #Makes a slightly smaller object than __dict__
-        d = self.__dict__.copy()
+        d = self._state()
         #Make copy.copy() produce a shallow copy
         d['_fieldDict'] = d['_fieldDict'].copy()
         return d
 
     def __setstate__(self, state):
-        self.__dict__ = state
+        for k, v in state.items():
+            if k == '_sourceFile' and type(v) is str:
+                v = sys.intern(v)
+            setattr(self, k, v)
+
+    def _state(self):
+        #The attributes of the record, from its __slots__ and its __dict__ if it has one
+        state = {}
+        for k in _slotNames(type(self)):
+            try:
+                state[k] = getattr(self, k)
+            except AttributeError:
+                pass
+        try:
+            state.update(self.__dict__)
+        except AttributeError:
+            pass
+        return state
 
     def copy(self):
         """Correctly copies the `Record`
@@ -283,6 +340,11 @@ class ExtendedRecord(Record, metaclass = abc.ABCMeta):
     #Overwriting the Record attribute
     _documented = ['encoding', 'getAltName', 'specialFuncs', 'tagProcessingFunc', 'writeRecord']
 
+    __slots__ = ('_computedFields',)
+
+    #The tags whose values are often the same across records, e.g. author or journal names, they are interned by parsers given a string pool
+    _internedTags = frozenset()
+
     def __init__(self, fieldDict, idValue, bad, error, sFile = "", sLine = 0):
         """Base constructor for Records
 
@@ -444,11 +506,8 @@ class ExtendedRecord(Record, metaclass = abc.ABCMeta):
     #these need a slight tweak over Record's thanks to `_computedFields`
 
     def __getstate__(self):
-        #Makes a slightly smaller object than __dict__
-        d = self.__dict__.copy()
+        d = Record.__getstate__(self)
         d['_computedFields'] = {}
-        #Make copy.copy() produce a shallow copy
-        d['_fieldDict'] = d['_fieldDict'].copy()
         return d
 
     #Making the 'virtual' methods
@@ -830,3 +889,24 @@ def _pandasPrep(cites, addcounts):
             except AttributeError:
                 retDict['fraction-cites-year'].append(None)
     return retDict
+
+def _collectRecords(recordIter):
+    """Exhausts a record generator, like [wosRecordIter()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.wosRecordIter), and gives the tuple the file parsers return, the set of records and the value the generator returned (its error).
+    """
+    recSet = set()
+    while True:
+        try:
+            recSet.add(next(recordIter))
+        except StopIteration as e:
+            return recSet, e.value
+
+def _openText(source, encoding):
+    """Opens _source_ as a text file with _encoding_, this is how the file detectors and parsers open their files. _source_ can be the path to the file, the first bytes of the file (as given to the detectors by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile)) or a binary file that is already open, which is read from its start and closed along with the returned file.
+    """
+    if isinstance(source, str):
+        return open(source, 'r', encoding = encoding)
+    elif isinstance(source, (bytes, bytearray)):
+        return io.TextIOWrapper(io.BytesIO(source), encoding = encoding)
+    else:
+        source.seek(0)
+        return io.TextIOWrapper(source, encoding = encoding)
@@ -1,6 +1,7 @@
 from ..mkExceptions import BadProQuestFile
 
 from .recordProQuest import ProQuestRecord
+from ..mkRecord import _collectRecords, _openText
 
 def isProQuestFile(infile, checkedLines = 2):
     """Determines if _infile_ is the path to a ProQuest file. A file is considered to be a Proquest file if it has the correct encoding (`utf-8`) and within the first _checkedLines_ the following starts.
@@ -13,7 +14,7 @@ def isProQuestFile(infile, checkedLines = 2):
 
     _infile_ : `str`
 
-    > The path to the targets file
+    > The path to the targets file, or the first bytes of it
 
     _checkedLines_ : `optional [int]`
 
@@ -26,7 +27,7 @@ def isProQuestFile(infile, checkedLines = 2):
     > `True` if the file is a valid ProQuest file
     """
     try:
-        with open(infile, 'r', encoding='utf-8') as openfile:
+        with _openText(infile, 'utf-8') as openfile:
             f = enumerate(openfile, start = 0)
             for i in range(checkedLines):
                 #This seems like enough checking
@@ -39,7 +40,7 @@ def isProQuestFile(infile, checkedLines = 2):
     else:
         return False
 
-def proQuestParser(proFile):
+def proQuestParser(proFile, fileStream = None):
     """Parses a ProQuest file, _proFile_, to extract the individual entries.
 
     A ProQuest file has three sections, first a list of the contained entries, second the full metadata and finally a bibtex formatted entry for the record. This parser only uses the first two as the bibtex contains no information the second section does not. Also, the first section is only used to verify the second section. The returned [ProQuestRecord](../classes/ProQuestRecord.html#metaknowledge.proquest.ProQuestRecord) contains the data from the second section, with the same key strings as ProQuest uses and the unlabeled sections are called in order, `'Name'`, `'Author'` and `'url'`.
@@ -50,19 +51,43 @@ def proQuestParser(proFile):
 
     > A path to a valid ProQuest file, use [isProQuestFile](#metaknowledge.proquest.proQuestHandlers.isProQuestFile) to verify
 
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _proFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _proFile_ again. It is closed when the reading is done
+
     # Returns
 
     `set[ProQuestRecord]`
 
+    > Records for each of the entries
+    """
+    return _collectRecords(proQuestRecordIter(proFile, fileStream = fileStream))
+
+def proQuestRecordIter(proFile, fileStream = None):
+    """A generator that yields the [ProQuestRecords](../classes/ProQuestRecord.html#metaknowledge.proquest.ProQuestRecord) of _proFile_ one at a time, this is what [proQuestParser()](#metaknowledge.proquest.proQuestHandlers.proQuestParser) uses to read a file. When the generator finishes it returns (as the value of its `StopIteration`) the `BadProQuestFile` error found or `None`.
+
+    # Parameters
+
+    _proFile_ : `str`
+
+    > A path to a valid ProQuest file
+
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _proFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _proFile_ again. It is closed when the reading is done
+
+    # Returns
+
+    `generator[ProQuestRecord]`
+
     > Records for each of the entries
     """
     #assumes the file is ProQuest
     nameDict = {}
-    recSet = set()
     error = None
     lineNum = 0
     try:
-        with open(proFile, 'r', encoding = 'utf-8') as openfile:
+        with _openText(proFile if fileStream is None else fileStream, 'utf-8') as openfile:
             f = enumerate(openfile, start = 1)
             for i in range(12):
                 lineNum, line = next(f)
@@ -88,7 +113,7 @@ def proQuestParser(proFile):
                     if R.get('Title') != nameDict[n]:
                         error = BadProQuestFile("The numbering of the titles at the beginning of the file does not match the records inside. Line {} has a record titled '{}' with number {}, the name should be '{}'.".format(lineNum, R.get('Title', "TITLE MISSING"), n, nameDict[n]))
                         raise StopIteration
-                    recSet.add(R)
+                    yield R
                     lineNum, line = next(f)
                 else:
                     #Parsing failed
@@ -97,4 +122,4 @@ def proQuestParser(proFile):
     except (UnicodeDecodeError, StopIteration, ValueError) as e:
         if error is None:
             error = BadProQuestFile("The file '{}' has parts of it that are unparsable starting at line: {}.\nThe error was: '{}'".format(proFile, lineNum, e))
-    return recSet, error
+    return error
@@ -13,6 +13,8 @@ class ProQuestRecord(ExtendedRecord):
 
     This class is an [ExtendedRecord](./ExtendedRecord.html#metaknowledge.ExtendedRecord) capable of generating its own id number. You should not create them directly, but instead use [proQuestParser()](../modules/proquest.html#metaknowledge.proquest.proQuestHandlers.proQuestParser) on a ProQuest file.
     """
+    __slots__ = ('_proID',)
+
     def __init__(self, inRecord, recNum = None, sFile = "", sLine = 0):
         bad = False
         error = None
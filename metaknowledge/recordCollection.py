@@ -1,8 +1,12 @@
 #Written by Reid McIlroy-Young for Dr. John McLevey, University of Waterloo 2015
 import os
 import os.path
+import concurrent.futures
 import csv
+import itertools
 import re
+import time
+import unicodedata
 try:
     import collections.abc
 except ImportError:
@@ -11,19 +15,29 @@ except ImportError:
 import networkx as nx
 
 from .constants import __version__
-from .mkRecord import Record, _pandasPrep
+from .mkRecord import Record, _pandasPrep, _internRecords
+from .WOS.recordWOS import LazyFieldDict
 from .progressBar import _ProgressBar
 from .WOS.tagProcessing.funcDicts import tagToFullDict, fullToTagDict, normalizeToTag
-from .citation import Citation
-from .fileHandlers import recordHandlers
-from .mkExceptions import BadWOSRecord, RCTypeError, BadInputFile, BadRecord, RCValueError, RecordsNotCompatible, UnknownFile
+from .citation import Citation, FastCitation, _regularCitation, _makeReadOnly
+from .fileHandlers import processRecordFiles, matchesExtension, _processRecordFile
+from .mkExceptions import BadWOSRecord, RCTypeError, BadInputFile, BadRecord, RCValueError, RecordsNotCompatible, cacheError
+from .mkCache import readCache, writeCache
 
 from .mkCollection import CollectionWithIDs
+from .aggregation import aggregateCounts
 
 from .scopus.scopusHandlers import scopusHeader
 
 import metaknowledge
 
+#The keys linkRecords() can join records on and the tags the databases keep PubMed IDs in
+linkageKeys = ('DOI', 'PMID', 'title')
+pubMedIDTags = ('PM', 'PMID', 'PubMed ID')
+
+_doiPrefixRegex = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)')
+_nonWordRegex = re.compile(r'[\W_]+')
+
 class RecordCollection(CollectionWithIDs):
     """A container for a large number of indivual records.
 
@@ -31,6 +45,8 @@ class RecordCollection(CollectionWithIDs):
 
     When being created if there are issues the Record collection will be declared bad, `bad` wil be set to `False`, it will then mostly return `None` or False. The attribute `error` contains the exception that occurred.
 
+    When the files read have records with the same id but different tags, e.g. overlapping WOS exports made at different times, the most complete record is kept, see [mergeRecords()](../modules/recordCollection.html#metaknowledge.recordCollection.mergeRecords). The others are in the attribute `conflicts`, a dict mapping the ids to lists of the records that were not kept.
+
     They also possess an attribute `name` also accessed with `__repr__()`, this is used to auto generate the names of files and can be set at creation, note though that any operations that modify the RecordCollection's contents will update the name to include what occurred.
 
     # Customizations
@@ -51,24 +67,38 @@ class RecordCollection(CollectionWithIDs):
 
     > If a directory is provided. First each file in the directory is checked for the correct header and all those that do are then read like indivual files. The records are then collected into a single set in the RecordCollection.
 
+    > Files compressed with gzip, bz2 or xz are decompressed as they are read and zip or tar archives are read like directories, see [iterInputFiles()](../modules/fileHandlers.html#metaknowledge.fileHandlers.iterInputFiles). The records from a file in an archive have its label, e.g. `'exports.zip/savedrecs.txt'`, as their source file and it is the key for its errors.
+
     _name_ : `optional [str]`
 
     > The name of the RecordCollection, defaults to empty string. If left empty the name of the Record collection is set to the name of the file or directory used to create the collection. If provided the name id set to _name_
 
     _extension_ : `optional [str]`
 
-    > The extension to search for when reading a directory for files. _extension_ is the suffix searched for when a directory is read for files, by default it is empty so all files are read.
+    > The extension to search for when reading a directory for files. _extension_ is the suffix searched for when a directory is read for files, by default it is empty so all files are read. Compressed files match if their name without the compression suffix does, and archives are always read but only the files in them with _extension_ are used.
 
     _cached_ : `optional [bool]`
 
-    > Default `False`, if `True` and the _inCollection_ is a directory (a string giving the path to a directory) then the initialized `RecordCollection` will be saved in the directory as a Python pickle with the suffix `'.mkDirCache'`. Then if the `RecordCollection` is initialized a second time it will be recovered from the file, which is much faster than reprising every file in the directory.
+    > Default `False`, if `True` and the _inCollection_ is a directory (a string giving the path to a directory) then the initialized `RecordCollection` will be saved in the directory in a compact binary format, see [mkCache](../modules/mkCache.html), with the suffix `'.mkRecordDirCache'`. Then if the `RecordCollection` is initialized a second time it will be recovered from the file, which is much faster than reprising every file in the directory.
+
+    > The records are cached separately for each file, along with the file's size, last modification time and a hash of its contents. When the `RecordCollection` is recreated only the files that are new or whose contents changed are parsed, the others are read from the cache, and then the cache is rewritten. The extension given to `__init__()` is taken into account as well and each suffix is given its own cache.
+
+    > Unlike a pickle reading the cache cannot run arbitrary code, it can only create records. The tags of the cached records are only decoded when they are first used.
+
+    _workers_ : `optional [int]`
+
+    > Default `None`, the number of processes used to parse the files when _inCollection_ is a directory, or the records of a single WOS file (see [wosParser()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.wosParser)). If `None` the value of `metaknowledge.NUM_WORKERS` is used, which is 1 by default, so the files are read serially. The `RecordCollection` created is the same regardless of the number of workers.
+
+    _lazy_ : `optional [bool]`
+
+    > Default `False`, if `True` WOS files, that are not compressed or in an archive, are scanned through a memory map and each `Record` only keeps where it is in its file, its tags are parsed when it is first accessed and can be dropped again with [release()](./WOSRecord.html#metaknowledge.WOS.WOSRecord.release), see [lazyWOSParser()](../modules/WOS.html#metaknowledge.WOS.wosHandlers.lazyWOSParser). This greatly reduces the memory used by large collections where only a few fields are used. The files must not be modified while the `RecordCollection` is in use and lazy reading is always serial so _workers_ is ignored.
 
-    > _metaknowledge_ saves the names of the parsed files as well as their last modification times and will check these when recreating the `RecordCollection`, so modifying existing files or adding new ones will result in the entire directory being reanalyzed and a new cache file being created. The extension given to `__init__()` is taken into account as well and each suffix is given its own cache.
+    _stringPool_ : `optional [dict[str : str]]`
 
-    > **Note** The pickle allows for arbitrary python code execution so only use caches that you trust.
+    > Default `None`, if a dict is given the equal strings of the records read from files are made the same object as they are parsed, using it as the pool, see [internStrings()](#metaknowledge.RecordCollection.internStrings). Records parsed by other processes are interned once they are returned. Lazily read records and those read from the cache are left as they are, their tags are only decoded when they are used and the equal strings of a cache are already the same object. Giving the same dict to many collections lets them share their strings.
     """
 
-    def __init__(self, inCollection = None, name = '', extension = '', cached = False, quietStart = False):
+    def __init__(self, inCollection = None, name = '', extension = '', cached = False, quietStart = False, workers = None, lazy = False, stringPool = None):
         progArgs = (0, "Starting to make a RecordCollection")
         if metaknowledge.VERBOSE_MODE and not quietStart:
             progKwargs = {'dummy' : False}
@@ -77,6 +107,7 @@ class RecordCollection(CollectionWithIDs):
         with _ProgressBar(*progArgs, **progKwargs) as PBar:
             bad = False
             errors = {}
+            conflicts = {}
             name = name
             recordTypes = set()
             if cached:
@@ -90,20 +121,25 @@ class RecordCollection(CollectionWithIDs):
                 inCollection = os.path.realpath(os.path.expanduser(inCollection))
                 if os.path.isfile(inCollection):
                     PBar.updateVal(.2, "RecordCollection from a file started")
-                    if not inCollection.endswith(extension):
+                    if not matchesExtension(inCollection, extension):
                         raise RCTypeError("extension of input file does not match requested extension")
                     if not name:
                         name = os.path.splitext(os.path.split(inCollection)[1])[0]
-                    try:
-                        for recordType, processor, detector in recordHandlers:
-                            if detector(inCollection):
-                                recordTypes.add(recordType)
-                                recordsSet, pError = processor(inCollection)
-                                if pError is not None:
-                                    bad = True
-                                    errors[inCollection] = pError
-                                break
-                    except UnknownFile:
+                    if workers is None:
+                        workers = metaknowledge.NUM_WORKERS
+                    recordsSet = set()
+                    recordIndex = {}
+                    #An archive can hold many files, the ones that are not recognized are skipped
+                    for label, recordType, recs, pError in _processRecordFile(inCollection, lazy = lazy, workers = workers, extension = extension, stringPool = stringPool):
+                        if recordType is None:
+                            continue
+                        recordTypes.add(recordType)
+                        if pError is not None:
+                            bad = True
+                            errors[label] = pError
+                        _mergeRecordsInto(recordIndex, recordsSet, recs, conflicts)
+                    recordsSet.update(recordIndex.values())
+                    if len(recordTypes) < 1:
                         raise BadInputFile("'{}' does not match any known file type.\nIts header might be damaged or it could have been modified by another program.".format(inCollection))
                 elif os.path.isdir(inCollection):
                     count = 0
@@ -113,40 +149,45 @@ class RecordCollection(CollectionWithIDs):
                     elif not name:
                         name = "files-from-{}".format(inCollection)
                     recordsSet = set()
+                    #The files often overlap so the records are joined on their ids, keeping the most complete, see mergeRecords()
+                    recordIndex = {}
                     flist = []
                     for f in os.listdir(inCollection):
                         fullF = os.path.join(os.path.abspath(inCollection), f)
-                        if fullF.endswith(extension) and not fullF.endswith('mkRecordDirCache') and os.path.isfile(fullF):
+                        if matchesExtension(fullF, extension) and not fullF.endswith('mkRecordDirCache') and os.path.isfile(fullF):
                             flist.append(fullF)
+                    unchangedFiles = {}
+                    cacheUpToDate = False
                     if cached:
                         PBar.updateVal(0, "Trying to load from cache")
                         cacheName = os.path.join(inCollection, '{}.[{}].mkRecordDirCache'.format(os.path.basename(os.path.abspath(inCollection)), extension))
-                        if self._loadFromCache(cacheName, flist, name, extension):
-                            try:
-                                PBar.finish("Done reloading {} Records from cache".format(len(self)))
-                            except AttributeError:
-                                PBar.finish("Done reloading from the cache {}. Warning an error occured.".format(cacheName))
-                            return
-                        else:
-                            PBar.updateVal(0, 'Cache error, rereading files')
+                        unchangedFiles, cacheUpToDate = self._loadFileCache(cacheName, flist, extension)
+                    if workers is None:
+                        workers = metaknowledge.NUM_WORKERS
+                    fileResults = {}
+                    #Only the files that are not in the cache are parsed, the results are still merged in the order of flist
+                    parsedFiles = processRecordFiles([f for f in flist if f not in unchangedFiles], workers = workers, lazy = lazy, extension = extension, stringPool = stringPool)
                     for fileName in flist:
                         count += 1
-                        PBar.updateVal(count / len(flist), "Reading records from: {}".format(fileName))
-                        try:
-                            for recordType, processor, detector in recordHandlers:
-                                if detector(fileName):
-                                    recordTypes.add(recordType)
-                                    recs, pError = processor(fileName)
-                                    if pError is not None:
-                                        bad = True
-                                        errors[fileName] = pError
-                                    recordsSet |= recs
-                                    break
-                        except UnknownFile:
-                            if extension != '':
-                                raise BadInputFile("'{}' does not match any known file type, but has the requested extension '{}'. Its header might be damaged or it could have been modified by another program.".format(fileName, extension))
-                            else:
-                                pass
+                        if fileName in unchangedFiles:
+                            PBar.updateVal(count / len(flist), "Reading records from the cache of: {}".format(fileName))
+                            results = unchangedFiles[fileName][3]
+                        else:
+                            PBar.updateVal(count / len(flist), "Reading records from: {}".format(fileName))
+                            results = next(parsedFiles)[1]
+                        fileResults[fileName] = results
+                        for label, recordType, recs, pError in results:
+                            if recordType is None:
+                                if extension != '':
+                                    raise BadInputFile("'{}' does not match any known file type, but has the requested extension '{}'. Its header might be damaged or it could have been modified by another program.".format(label, extension))
+                                else:
+                                    continue
+                            recordTypes.add(recordType)
+                            if pError is not None:
+                                bad = True
+                                errors[label] = pError
+                            _mergeRecordsInto(recordIndex, recordsSet, recs, conflicts)
+                    recordsSet.update(recordIndex.values())
                 else:
                     raise RCTypeError("'{}' is not a path to a directory or file. Strings cannot be used to initialize RecordCollections".format(inCollection))
             elif isinstance(inCollection, collections.abc.Iterable):
@@ -158,17 +199,38 @@ class RecordCollection(CollectionWithIDs):
             else:
                 raise RCTypeError("A RecordCollection cannot be created from {}.".format(inCollection))
             CollectionWithIDs.__init__(self, recordsSet, Record, recordTypes, name, bad, errors)
+            #The records not kept when records with the same id differed, see mergeRecords()
+            self.conflicts = conflicts
+            #The trigram indexes of the citations, see makeCiteTrigramIndex()
+            self._citeTrigramIndexes = {}
+            self._cacheName = None
             if cached:
                 if cacheName is None:
                     pass
                 else:
-                    PBar.updateVal(1, "Writing RecordCollection cache to {}".format(cacheName))
-                    self._createCache(cacheName, flist, name, extension)
+                    if not cacheUpToDate:
+                        PBar.updateVal(1, "Writing RecordCollection cache to {}".format(cacheName))
+                        self._createFileCache(cacheName, fileResults, extension, unchangedFiles = unchangedFiles)
+                    self._cacheName = cacheName
+                    self._citeTrigramIndexes = _loadCiteTrigramCache(cacheName)
             try:
                 PBar.finish("Done making a RecordCollection of {} Records".format(len(self)))
             except AttributeError:
                 PBar.finish("Done making a RecordCollection. Warning an error occured.")
 
+    def copy(self):
+        """Creates a shallow copy of the `RecordCollection`, the trigram indexes made by [makeCiteTrigramIndex()](#metaknowledge.RecordCollection.makeCiteTrigramIndex) are copied so they are updated separately
+
+        # Returns
+
+        `RecordCollection`
+
+        > A copy of the `RecordCollection`
+        """
+        collectedCopy = CollectionWithIDs.copy(self)
+        collectedCopy._citeTrigramIndexes = {field : trigramIndex.copy() for field, trigramIndex in self._citeTrigramIndexes.items()}
+        return collectedCopy
+
     def __bytes__(self):
         encoding = self.peek().encoding()
         try:
@@ -179,15 +241,8 @@ class RecordCollection(CollectionWithIDs):
     def __add__(self, other):
         self_name = '' if not hasattr(self, 'name') else self.name
         other_name = '' if not hasattr(other, 'name') else other.name
-
-        new_col = metaknowledge.RecordCollection(name='{} {}'.format(self_name, other_name))
-        for rec in self:
-            new_col.add(rec)
-
-        for rec in other:
-            new_col.add(rec)
-
-        return new_col
+        #Records with the same id are merged, keeping the most complete, see mergeRecords()
+        return mergeRecords((self, other), name = '{} {}'.format(self_name, other_name))
 
     def dropNonJournals(self, ptVal = 'J', dropBad = True, invert = False):
         """Drops the non journal type `Records` from the collection, this is done by checking _ptVal_ against the PT tag
@@ -789,84 +844,7 @@ class RecordCollection(CollectionWithIDs):
         > The table of values from the _Referenced Publication Years Spectroscopy_
         """
 
-        def deviation(targetYear, targetValue, targetDict):
-            yearCounts = [targetValue]
-            for deltaY in [-2, -1, 1, 2]:
-                try:
-                    yearCounts.append(targetDict[targetYear + deltaY])
-                except KeyError:
-                    yearCounts.append(0)
-            medianCount = list(sorted(yearCounts))[2]
-            absDiff = targetValue - medianCount
-            return absDiff
-
-        if dropYears is None:
-            dropYears = set()
-        yearCounts = {}
-        retDict = {'year' : [], 'count' : [], 'abs-deviation' : [], 'rank' : []}
-
-        for R in self:
-            try:
-                cites = R['citations']
-            except KeyError:
-                continue
-            recYear = R.get('year', float('inf'))
-            for cite in cites:
-                try:
-                    #year can be None
-                    cYear = int(cite.year)
-                except (AttributeError, TypeError):
-                    continue
-                else:
-                    #need the extra years for the normlization
-                    if (maxYear is not None and cYear > (maxYear + 2)) or (minYear is not None and cYear < (minYear - 2)):
-                        continue
-                    #years from before the paper are an error
-                    elif recYear < (cYear + 2):
-                        continue
-                if cYear in yearCounts:
-                    yearCounts[cYear] += 1
-                else:
-                    yearCounts[cYear] = 1
-
-        if minYear is None:
-            smallest = min(yearCounts.keys())
-            if smallest > 1000:
-                minYear = smallest
-        if maxYear is None:
-            biggest = max(yearCounts.keys())
-            if biggest < 2100:
-                maxYear = biggest
-
-        targetYears = set(( i for i in range(minYear, maxYear + 1) if i not in dropYears))
-
-        ranks = {}
-        yearDeviances = {}
-
-        for y in targetYears:
-            try:
-                c = yearCounts[y]
-            except KeyError:
-                c = 0
-            yearDeviances[y] = deviation(y, c, yearCounts)
-
-        for rank, year in enumerate(sorted(yearDeviances.items(), key = lambda x: x[1], reverse = False), start = 1):
-            ranks[year[0]] = rank
-
-        for y in targetYears:
-            try:
-                c = yearCounts[y]
-            except KeyError:
-                c = 0
-            if c == 0 and not rankEmptyYears:
-                retDict['rank'].append(0)
-            else:
-                retDict['rank'].append(ranks[y])
-            retDict['abs-deviation'].append(yearDeviances[y])
-            retDict['year'].append(y)
-            retDict['count'].append(c)
-
-        return retDict
+        return rpys(self, minYear = minYear, maxYear = maxYear, dropYears = dropYears, rankEmptyYears = rankEmptyYears)
 
     def genderStats(self, asFractions = False):
         """Creates a dict (`{'Male' : maleCount, 'Female' : femaleCount, 'Unknown' : unknownCount}`) with the numbers of male, female and unknown names in the collection.
@@ -1382,21 +1360,169 @@ class RecordCollection(CollectionWithIDs):
 
         > A RecordCollection of Records from _startYear_ to _endYear_
         """
-        recordsInRange = set()
-        for R in self:
-            try:
-                if R.get('year') >= startYear and R.get('year') <= endYear:
-                    recordsInRange.add(R)
-            except TypeError:
-                if dropMissingYears:
-                    pass
-                else:
-                    raise
+        yearIndex = self._getTagIndex('year')
+        if not dropMissingYears and None in yearIndex:
+            raise TypeError("'{}' has Records without years".format(self.name))
+        recordsInRange = set().union(*(recs for year, recs in yearIndex.items() if year is not None and startYear <= year <= endYear))
         RCret = RecordCollection(recordsInRange, name = "{}({}-{})".format(self.name, startYear, endYear), quietStart = True)
         RCret._collectedTypes = self._collectedTypes.copy()
         return RCret
 
-    def localCiteStats(self, pandasFriendly = False, keyType = "citation"):
+    def tagFilter(self, tag, values):
+        """Creates a `RecordCollection` of the `Records` whose _tag_ is one of _values_, for tags with lists of values, like `'authorsFull'`, any of the values in the list can match. `Records` without _tag_ are matched by `None`.
+
+        The `Records` are found with an index of _tag_ made the first time _tag_ is used and kept up to date as `Records` are added to or removed from the collection, so after the first time this takes time proportional to the number of `Records` found.
+
+        # Parameters
+
+        _tag_ : `str`
+
+        > The tag to be checked, its values must be hashable
+
+        _values_ : `object or list[object]`
+
+        > The value or a `list`, `tuple` or `set` of values to look for
+
+        # Returns
+
+        `RecordCollection`
+
+        > A `RecordCollection` of the `Records` with one of _values_
+        """
+        if isinstance(values, (list, tuple, set, frozenset)):
+            values = list(values)
+        else:
+            values = [values]
+        tagIndex = self._getTagIndex(tag)
+        try:
+            foundRecords = set().union(*(tagIndex[v] for v in values if v in tagIndex))
+        except TypeError:
+            raise RCValueError("The values of {} must be hashable".format(tag)) from None
+        if len(values) == 1:
+            name = "{}({} = {})".format(self.name, tag, values[0])
+        else:
+            name = "{}({} in {} values)".format(self.name, tag, len(values))
+        RCret = RecordCollection(foundRecords, name = name, quietStart = True)
+        RCret._collectedTypes = self._collectedTypes.copy()
+        return RCret
+
+    def tagRangeFilter(self, tag, minValue = None, maxValue = None):
+        """Creates a `RecordCollection` of the `Records` whose _tag_ is between _minValue_ and _maxValue_ inclusive, for tags with lists of values any of the values in the list can be in the range. `Records` without _tag_ are not included.
+
+        Like [tagFilter()](#metaknowledge.RecordCollection.tagFilter) this uses an index of _tag_, so it takes time proportional to the number of different values of _tag_ and `Records` found.
+
+        # Parameters
+
+        _tag_ : `str`
+
+        > The tag to be checked, its values must be hashable and comparable to _minValue_ and _maxValue_
+
+        _minValue_ : `optional [object]`
+
+        > Default `None`, the smallest value included, if `None` there is no minimum
+
+        _maxValue_ : `optional [object]`
+
+        > Default `None`, the largest value included, if `None` there is no maximum
+
+        # Returns
+
+        `RecordCollection`
+
+        > A `RecordCollection` of the `Records` with a value of _tag_ in the range
+        """
+        foundRecords = set()
+        for value, recs in self._getTagIndex(tag).items():
+            if value is None:
+                continue
+            elif minValue is not None and value < minValue:
+                continue
+            elif maxValue is not None and value > maxValue:
+                continue
+            foundRecords |= recs
+        RCret = RecordCollection(foundRecords, name = "{}({} from {} to {})".format(self.name, tag, minValue, maxValue), quietStart = True)
+        RCret._collectedTypes = self._collectedTypes.copy()
+        return RCret
+
+    def _emptyIndexes(self):
+        emptyIndexes = CollectionWithIDs._emptyIndexes(self)
+        #The indexes of tags, each mapping the values of the tag to the set of Records with it
+        emptyIndexes['_tagIndexes'] = {}
+        #The indexes of the citations, each mapping the values of a field of the citations to the set of Records citing them
+        emptyIndexes['_citeIndexes'] = {}
+        #For each index above, the values each Record is indexed under. A Record's values can change, e.g. parseCitations() replaces its citations, so it is removed under these
+        emptyIndexes['_tagIndexKeys'] = {}
+        emptyIndexes['_citeIndexKeys'] = {}
+        return emptyIndexes
+
+    def _addToIndexes(self, R):
+        CollectionWithIDs._addToIndexes(self, R)
+        for tag, tagIndex in self._tagIndexes.items():
+            values = _tagIndexValues(R, tag)
+            self._tagIndexKeys[tag][R] = values
+            _addToIndex(tagIndex, R, values)
+        for field, citeIndex in self._citeIndexes.items():
+            values = _citeIndexValues(R, field)
+            self._citeIndexKeys[field][R] = values
+            trigramIndex = self._citeTrigramIndexes.get(field)
+            if trigramIndex is not None and trigramIndex.syncedWith is citeIndex:
+                for value in values:
+                    trigramIndex.add(value)
+            _addToIndex(citeIndex, R, values)
+
+    def _removeFromIndexes(self, R):
+        CollectionWithIDs._removeFromIndexes(self, R)
+        for tag, tagIndex in self._tagIndexes.items():
+            _removeFromIndex(tagIndex, R, self._tagIndexKeys[tag].pop(R, []))
+        for field, citeIndex in self._citeIndexes.items():
+            values = self._citeIndexKeys[field].pop(R, [])
+            _removeFromIndex(citeIndex, R, values)
+            trigramIndex = self._citeTrigramIndexes.get(field)
+            if trigramIndex is not None and trigramIndex.syncedWith is citeIndex:
+                for value in values:
+                    if value not in citeIndex:
+                        trigramIndex.remove(value)
+
+    def _getTagIndex(self, tag):
+        """Gives the `dict` mapping the values of _tag_ to the `set` of `Records` with them, making it if it is not up to date. `Records` without _tag_ are under `None`.
+        """
+        self._checkIndexes()
+        try:
+            return self._tagIndexes[tag]
+        except KeyError:
+            pass
+        tagIndex = {}
+        tagIndexKeys = {}
+        try:
+            for R in self._collection:
+                values = _tagIndexValues(R, tag)
+                tagIndexKeys[R] = values
+                _addToIndex(tagIndex, R, values)
+        except TypeError:
+            raise RCValueError("The values of {} cannot be indexed as they are not hashable".format(tag)) from None
+        self._tagIndexes[tag] = tagIndex
+        self._tagIndexKeys[tag] = tagIndexKeys
+        return tagIndex
+
+    def _getCiteIndex(self, field):
+        """Gives the `dict` mapping the values of _field_ of the citations to the `set` of `Records` citing them, making it if it is not up to date. The _field_ `'citation'` gives the `Citations` themselves, `'original'` their original strings, `'upperOriginal'` their upper cased original strings and `'anonymous'` and `'bad'` map `True` and `False` to the `Records` with citations that are or are not anonymous or bad.
+        """
+        self._checkIndexes()
+        try:
+            return self._citeIndexes[field]
+        except KeyError:
+            pass
+        citeIndex = {}
+        citeIndexKeys = {}
+        for R in self._collection:
+            values = _citeIndexValues(R, field)
+            citeIndexKeys[R] = values
+            _addToIndex(citeIndex, R, values)
+        self._citeIndexes[field] = citeIndex
+        self._citeIndexKeys[field] = citeIndexKeys
+        return citeIndex
+
+    def localCiteStats(self, pandasFriendly = False, keyType = "citation", maxEntries = None):
         """Returns a dict with all the citations in the CR field as keys and the number of times they occur as the values
 
         # Parameters
@@ -1409,52 +1535,17 @@ class RecordCollection(CollectionWithIDs):
 
         > default `'citation'`, the type of key to use for the dictionary, the valid strings are `'citation'`, `'journal'`, `'year'` or `'author'`. IF changed from `'citation'` all citations matching the requested option will be contracted and their counts added together.
 
+        _maxEntries_ : `optional [int]`
+
+        > Default `None`, if given only about the _maxEntries_ most common keys are kept, using a [SpaceSavingCounter](../modules/aggregation.html#metaknowledge.aggregation.SpaceSavingCounter), so the memory used is fixed no matter how many distinct citations there are. The counts are then estimates that can be too high by at most the total number of citations divided by _maxEntries_, and a `SpaceSavingCounter` is returned instead of a `dict`
+
         # Returns
 
         `dict[str, int or Citation : int]`
 
         > A dictionary with keys as given by _keyType_ and integers giving their rates of occurrence in the collection
         """
-        count = 0
-        recCount = len(self)
-        progArgs = (0, "Starting to get the local stats on {}s.".format(keyType))
-        if metaknowledge.VERBOSE_MODE:
-            progKwargs = {'dummy' : False}
-        else:
-            progKwargs = {'dummy' : True}
-        with _ProgressBar(*progArgs, **progKwargs) as PBar:
-            keyTypesLst = ["citation", "journal", "year", "author"]
-            citesDict = {}
-            if keyType not in keyTypesLst:
-                raise TypeError("{} is not a valid key type, only '{}' or '{}' are.".format(keyType, "', '".join(keyTypesLst[:-1]), keyTypesLst[-1]))
-            for R in self:
-                rCites = R.get('citations')
-                if PBar:
-                    count += 1
-                    PBar.updateVal(count / recCount, "Analysing: {}".format(R.UT))
-                if rCites:
-                    for c in rCites:
-                        if keyType == keyTypesLst[0]:
-                            cVal = c
-                        else:
-                            cVal = getattr(c, keyType)
-                            if cVal is None:
-                                continue
-                        if cVal in citesDict:
-                            citesDict[cVal] += 1
-                        else:
-                            citesDict[cVal] = 1
-            if PBar:
-                PBar.finish("Done, {} {} fields analysed".format(len(citesDict), keyType))
-        if pandasFriendly:
-            citeLst = []
-            countLst = []
-            for cite, occ in citesDict.items():
-                citeLst.append(cite)
-                countLst.append(occ)
-            return {"Citations" : citeLst, "Counts" : countLst}
-        else:
-            return citesDict
+        return localCiteStats(self, pandasFriendly = pandasFriendly, keyType = keyType, maxEntries = maxEntries)
 
     def localCitesOf(self, rec):
         """Takes in a Record, WOS string, citation string or Citation and returns a RecordCollection of all records that cite it.
@@ -1474,7 +1565,7 @@ class RecordCollection(CollectionWithIDs):
         localCites = []
         if isinstance(rec, Record):
             recCite = rec.createCitation()
-        if isinstance(rec, str):
+        elif isinstance(rec, str):
             try:
                 recCite = self.getID(rec)
             except ValueError:
@@ -1491,13 +1582,7 @@ class RecordCollection(CollectionWithIDs):
             recCite = rec
         else:
             raise ValueError("{} is not a valid input, rec must be a Record, string or Citation object.".format(rec))
-        for R in self:
-            rCites = R.get('citations')
-            if rCites:
-                for cite in rCites:
-                    if recCite == cite:
-                        localCites.append(R)
-                        break
+        localCites = self._getCiteIndex('citation').get(recCite, localCites)
         return RecordCollection(inCollection = localCites, name = "Records_citing_'{}'".format(rec), quietStart = True)
 
     def citeFilter(self, keyString = '', field = 'all', reverse = False, caseSensitive = False):
@@ -1531,89 +1616,787 @@ class RecordCollection(CollectionWithIDs):
 
         > Default `False`, if `True` causes the search across the original to be case sensitive, **only** the `'all'` option can be case sensitive
         """
-        retRecs = []
         keyString = str(keyString)
-        for R in self:
-            try:
-                if field == 'all':
-                    for cite in R.get('citations'):
-                        if caseSensitive:
-                            if keyString in cite.original:
-                                retRecs.append(R)
-                                break
-                        else:
-                            if keyString.upper() in cite.original.upper():
-                                retRecs.append(R)
-                                break
-                elif field == 'author':
-                    for cite in R.get('citations'):
-                        try:
-                            if keyString.upper() in cite.author.upper():
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'journal':
-                    for cite in R.get('citations'):
-                        try:
-                            if keyString.upper() in cite.journal:
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'year':
-                    for cite in R.get('citations'):
-                        try:
-                            if int(keyString) == cite.year:
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'V':
-                    for cite in R.get('citations'):
-                        try:
-                            if keyString.upper() in cite.V:
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'P':
-                    for cite in R.get('citations'):
-                        try:
-                            if keyString.upper() in cite.P:
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'misc':
-                    for cite in R.get('citations'):
-                        try:
-                            if keyString.upper() in cite.misc:
-                                retRecs.append(R)
-                                break
-                        except AttributeError:
-                            pass
-                elif field == 'anonymous':
-                    for cite in R.get('citations'):
-                        if cite.isAnonymous():
-                            retRecs.append(R)
-                            break
-                elif field == 'bad':
-                    for cite in R.get('citations'):
-                        if cite.bad:
-                            retRecs.append(R)
-                            break
-            except TypeError:
-                pass
+        upperKeyString = keyString.upper()
+        #The distinct values of the field are checked with an index instead of every citation of every Record
+        #and if the field has a trigram index only the values with all the trigrams of the key string are checked
+        searchedString = upperKeyString
+        if field == 'all':
+            if caseSensitive:
+                citeField = 'original'
+                searchedString = keyString
+                matches = lambda value: keyString in value
+            else:
+                citeField = 'upperOriginal'
+                matches = lambda value: upperKeyString in value
+            citeIndex = self._getCiteIndex(citeField)
+        elif field == 'author':
+            citeField = 'author'
+            citeIndex = self._getCiteIndex('author')
+            matches = lambda value: upperKeyString in value.upper()
+        elif field in ('journal', 'V', 'P', 'misc'):
+            citeField = field
+            citeIndex = self._getCiteIndex(field)
+            matches = lambda value: upperKeyString in value
+        elif field == 'year':
+            year = int(keyString)
+            citeIndex = self._getCiteIndex('year')
+            matches = lambda value: value == year
+        elif field in ('anonymous', 'bad'):
+            #Citations with the same ID can differ in these, so they are indexed by their own values not by the Citations
+            citeIndex = self._getCiteIndex(field)
+            matches = lambda value: value is True
+        else:
+            citeIndex = {}
+            matches = None
+        values = None
+        if field in ('all', 'author', 'journal', 'V', 'P', 'misc') and citeField in self._citeTrigramIndexes:
+            trigramIndex = self._citeTrigramIndexes[citeField]
+            trigramIndex.sync(citeIndex)
+            values = trigramIndex.candidates(searchedString)
+        if values is None:
+            values = citeIndex.keys()
+        retRecs = set()
+        for value in values:
+            recs = citeIndex.get(value)
+            if recs is not None and matches(value):
+                retRecs |= recs
         if reverse:
-            excluded = []
-            for R in self:
-                if R not in retRecs:
-                    excluded.append(R)
+            excluded = [R for R in self if R not in retRecs]
             return RecordCollection(inCollection = excluded, name = self.name, quietStart = True)
         else:
             return RecordCollection(inCollection = retRecs, name = self.name, quietStart = True)
 
+    def makeCiteTrigramIndex(self, fields = ('all', 'author', 'journal', 'V', 'P', 'misc'), caseSensitive = False):
+        """Makes trigram indexes of the fields of the citations for [citeFilter()](#metaknowledge.RecordCollection.citeFilter), so searching a field only checks the values containing every three character substring of the key string, instead of every different value. This is worth it for large collections that are searched many times, the indexes take a few times the memory of the strings they index.
+
+        Once made the indexes are kept up to date as `Records` are added to or removed from the collection. If the collection was read from a directory with _cached_ `True` the indexes are also written next to its cache and read back the next time it is read from the cache.
+
+        # Parameters
+
+        _fields_ : `optional [list[str]]`
+
+        > Default `('all', 'author', 'journal', 'V', 'P', 'misc')`, the fields to index, they are the same as the fields of [citeFilter()](#metaknowledge.RecordCollection.citeFilter) that search strings
+
+        _caseSensitive_ : `optional [bool]`
+
+        > Default `False`, if `True` the index of `'all'` is for case sensitive searches
+        """
+        for field in fields:
+            if field == 'all':
+                citeField = 'original' if caseSensitive else 'upperOriginal'
+            elif field in ('author', 'journal', 'V', 'P', 'misc'):
+                citeField = field
+            else:
+                raise RCValueError("'{}' is not a field of the citations that can be indexed".format(field))
+            if citeField not in self._citeTrigramIndexes:
+                #author is searched case insensitively, the other fields are already upper case
+                self._citeTrigramIndexes[citeField] = _CiteTrigramIndex(upper = citeField == 'author')
+            self._citeTrigramIndexes[citeField].sync(self._getCiteIndex(citeField))
+        if self._cacheName is not None:
+            _writeCiteTrigramCache(self._cacheName, self._citeTrigramIndexes)
+
+    def mergeLinked(self, linkOn = linkageKeys, linked = None):
+        """Creates a RecordCollection with each publication in the collection only once, the records found to be the same by [linkRecords()](../modules/recordCollection.html#metaknowledge.recordCollection.linkRecords) are merged and the most complete of them, the one with the most tags, is kept. This is how records from different databases, e.g. WOS and Scopus, can be combined.
+
+        # Parameters
+
+        _linkOn_ : `optional [iterable[str]]`
+
+        > Default `('DOI', 'PMID', 'title')`, the keys records are linked on, any of `'DOI'`, `'PMID'` and `'title'`
+
+        _linked_ : `optional [dict]`
+
+        > Default `None`, if a dict is given, for each group of linked records the records that were not kept are added to it, in a list with the id of the kept record as the key
+
+        # Returns
+
+        `RecordCollection`
+
+        > The collection with one record for each group of linked records
+        """
+        mergedRecords = set(self)
+        for cluster in linkRecords(self, linkOn = linkOn):
+            kept = max(cluster, key = _recordCompleteness)
+            dropped = [R for R in cluster if R is not kept]
+            mergedRecords.difference_update(dropped)
+            if linked is not None:
+                linked[kept.id] = dropped
+        return RecordCollection(inCollection = mergedRecords, name = "{}_linked".format(self.name), quietStart = True)
+
+    def parseCitations(self, workers = None, fast = None):
+        """Parses the citations of all the WOS `Records` in the collection at once, instead of each record's when its `'citations'` are first used. Each distinct citation string is parsed once, the records citing it share the `Citation`, and they are all fully parsed, so the records are ready for making networks or anything else that reads the citations.
+
+        The parsed citations are stored in the `Records` themselves, replacing any already there, so they are seen by every collection holding the `Records`. Like those of [cachedCitation()](../modules/citation.html#metaknowledge.citation.cachedCitation) they are shared so they are read only.
+
+        # Parameters
+
+        _workers_ : `optional [int]`
+
+        > Default `None`, the number of processes the citation strings are split between, if `None` `metaknowledge.NUM_WORKERS` is used. Sending the citations between processes costs about as much as parsing them, so more workers only help with very large collections
+
+        _fast_ : `optional [bool]`
+
+        > Default `None`, if `True` the citations are [FastCitations](../classes/FastCitation.html#metaknowledge.citation.FastCitation), if `False` regular `Citations`, if `None` it depends on `metaknowledge.FAST_CITES`
+        """
+        if workers is None:
+            workers = metaknowledge.NUM_WORKERS
+        _parseRecordCitations([R for R in self if isinstance(R, metaknowledge.WOSRecord) and 'CR' in R._fieldDict], workers, fast)
+
+    def materialize(self, tags = None, workers = None):
+        """Processes _tags_ for all the `Records` in the collection now and stores them as if they had been accessed, so later uses of the tags, e.g. in making networks, do not pay for processing them.
+
+        With more than one worker the raw values of the tags are sent to a pool of processes to be processed, only the tags given by the special functions of the records, like `'selfCitation'`, are processed in this process. Sending the values back and forth costs about as much as processing simple tags, like `'year'`, so this is best for collections with many records and expensive tags, like `'citations'` or `'authAddress'`. The citations of WOS `Records` are parsed as by [parseCitations()](#metaknowledge.RecordCollection.parseCitations), so the records citing the same string share its `Citation` as they do when processed in this process.
+
+        # Parameters
+
+        _tags_ : `optional [list[str]]`
+
+        > Default `None`, the tags to process, they can be tags or their long names. If `None` all the tags of each `Record` are processed
+
+        _workers_ : `optional [int]`
+
+        > Default `None`, the number of processes to use, if `None` `metaknowledge.NUM_WORKERS` is used
+
+        # Returns
+
+        `dict[str : float]`
+
+        > A dict with the time in seconds spent processing each tag, with more than one worker this is the time spent in all the workers together not the elapsed time
+        """
+        if workers is None:
+            workers = metaknowledge.NUM_WORKERS
+        if tags is None:
+            tags = list(dict.fromkeys(itertools.chain.from_iterable(R._fieldDict.keys() for R in self)))
+        elif isinstance(tags, str):
+            tags = [tags]
+        tagTimes = {}
+        progArgs = (0, "Starting to materialize tags")
+        if metaknowledge.VERBOSE_MODE:
+            progKwargs = {'dummy' : False}
+        else:
+            progKwargs = {'dummy' : True}
+        with _ProgressBar(*progArgs, **progKwargs) as PBar:
+            if workers > 1:
+                #Records needing a tag are grouped by their type and the raw tag, as the processing functions depend on both
+                jobs = {}
+                #The WOS Records needing their citations, for each tag
+                citingRecords = {}
+                for tag in tags:
+                    tagTimes[tag] = 0
+                    specialStart = time.perf_counter()
+                    for R in self:
+                        if tag in R._computedFields:
+                            continue
+                        if tag in R._fieldDict:
+                            rawTag = tag
+                        elif R.getAltName(tag) in R._fieldDict:
+                            rawTag = R.getAltName(tag)
+                        else:
+                            R.get(tag)
+                            continue
+                        if rawTag == 'CR' and isinstance(R, metaknowledge.WOSRecord):
+                            citingRecords.setdefault(tag, []).append(R)
+                        else:
+                            jobs.setdefault((tag, type(R), rawTag), []).append(R)
+                    tagTimes[tag] += time.perf_counter() - specialStart
+                for tag, recs in citingRecords.items():
+                    PBar.updateVal(0, "Parsing the citations of {} Records".format(len(recs)))
+                    citeStart = time.perf_counter()
+                    #The records can be here for both 'CR' and 'citations'
+                    _parseRecordCitations([R for R in recs if 'CR' not in R._computedFields], workers, None)
+                    tagTimes[tag] += time.perf_counter() - citeStart
+                with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+                    futures = {}
+                    for (tag, recordType, rawTag), recs in jobs.items():
+                        for i in range(0, len(recs), materializeChunkSize):
+                            chunk = recs[i:i + materializeChunkSize]
+                            futures[executor.submit(_processTagValues, recordType, rawTag, [R._fieldDict[rawTag] for R in chunk])] = (tag, rawTag, chunk)
+                    for count, future in enumerate(concurrent.futures.as_completed(futures), start = 1):
+                        tag, rawTag, chunk = futures[future]
+                        values, seconds = future.result()
+                        tagTimes[tag] += seconds
+                        for R, val in zip(chunk, values):
+                            R._computedFields[rawTag] = val
+                            alt = R.getAltName(rawTag)
+                            if alt is not None:
+                                R._computedFields[alt] = val
+                        PBar.updateVal(count / len(futures), "Processed {} Records' {}".format(len(chunk), tag))
+            else:
+                for i, tag in enumerate(tags):
+                    PBar.updateVal(i / len(tags), "Processing {}".format(tag))
+                    tagStart = time.perf_counter()
+                    for R in self:
+                        R.get(tag)
+                    tagTimes[tag] = time.perf_counter() - tagStart
+            PBar.finish("Done processing {} tags of {} Records".format(len(tags), len(self)))
+        return tagTimes
+
+    def compactCitations(self):
+        """Makes the citations of the WOS `Records` in the collection [FastCitations](../classes/FastCitation.html#metaknowledge.citation.FastCitation), as if they were read with `metaknowledge.FAST_CITES` set to `True`, without changing `metaknowledge.FAST_CITES`. This is [parseCitations()](#metaknowledge.RecordCollection.parseCitations) with _fast_ `True`.
+
+        The `Records` themselves are changed, so any other collection holding them, e.g. one from [yearSplit()](#metaknowledge.RecordCollection.yearSplit) or [tagFilter()](#metaknowledge.RecordCollection.tagFilter), gets the `FastCitations` too and `str()` of their citations gives their ids instead of the original strings.
+
+        Lazily read records go back to regular `Citations` when they are [released](./WOSRecord.html#metaknowledge.WOS.WOSRecord.release).
+        """
+        self.parseCitations(workers = 1, fast = True)
+
+    def internStrings(self, stringPool = None):
+        """Makes the equal strings in the `Records`, their tags and the values of tags that are often repeated, e.g. author names, journals and citations, the same object. This shrinks large collections and makes comparing the strings faster. It works on records from any source, including those made directly or merged from other collections. To intern the strings as the files are parsed, before the duplicates are ever kept, give the pool to the `RecordCollection` when it is created with _stringPool_.
+
+        Lazily read records and records read from a cache are skipped, their tags are not parsed or decoded yet.
+
+        # Parameters
+
+        _stringPool_ : `optional [dict[str : str]]`
+
+        > Default `None`, the pool of strings to use, giving the same one to many collections lets them share their strings. If `None` a new one is made
+
+        # Returns
+
+        `dict[str : str]`
+
+        > The string pool, with the strings of this collection added
+        """
+        if stringPool is None:
+            stringPool = {}
+        _internRecords(self, stringPool)
+        return stringPool
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _CiteTrigramIndex(object):
+    """The trigram index of a field of the citations used by `RecordCollection.citeFilter()`. Each value is given a number, its position in _values_, and _postings_ maps each trigram to the numbers of the values containing it. Removed values are replaced with `None` in _values_ and taken out of _postings_, their numbers are in _freeIDs_ to be given to the next values added.
+    """
+    __slots__ = ('upper', 'values', 'valueIDs', 'postings', 'freeIDs', 'syncedWith')
+
+    def __init__(self, upper = False, values = None, postings = None):
+        self.upper = upper
+        self.values = values if values is not None else []
+        self.valueIDs = {v : i for i, v in enumerate(self.values)}
+        self.postings = postings if postings is not None else {}
+        self.freeIDs = []
+        #The index of the citations this has the same values as
+        self.syncedWith = None
+
+    def __reduce__(self):
+        return (_CiteTrigramIndex.fromCache, (self.toCache(),))
+
+    def add(self, value):
+        if value not in self.valueIDs:
+            if len(self.freeIDs) > 0:
+                valueID = self.freeIDs.pop()
+                self.values[valueID] = value
+            else:
+                valueID = len(self.values)
+                self.values.append(value)
+            self.valueIDs[value] = valueID
+            for gram in _trigrams(value.upper() if self.upper else value):
+                self.postings.setdefault(gram, set()).add(valueID)
+
+    def remove(self, value):
+        valueID = self.valueIDs.pop(value, None)
+        if valueID is not None:
+            for gram in _trigrams(value.upper() if self.upper else value):
+                valueIDs = self.postings[gram]
+                valueIDs.discard(valueID)
+                if len(valueIDs) < 1:
+                    del self.postings[gram]
+            self.values[valueID] = None
+            self.freeIDs.append(valueID)
+
+    def copy(self):
+        """Gives a copy not synced with any index of the citations"""
+        return _CiteTrigramIndex.fromCache(self.toCache())
+
+    def sync(self, citeIndex):
+        """Makes the values the same as the keys of _citeIndex_, this is only needed when _citeIndex_ has been remade"""
+        if self.syncedWith is not citeIndex:
+            for value in [v for v in self.valueIDs if v not in citeIndex]:
+                self.remove(value)
+            for value in citeIndex:
+                self.add(value)
+            self.syncedWith = citeIndex
+
+    def candidates(self, searchedString):
+        """Gives the values with all the trigrams of _searchedString_, or `None` if it is too short to have any"""
+        grams = _trigrams(searchedString.upper() if self.upper else searchedString)
+        if len(grams) < 1:
+            return None
+        try:
+            postings = sorted((self.postings[g] for g in grams), key = len)
+        except KeyError:
+            return []
+        values = self.values
+        return [values[i] for i in postings[0].intersection(*postings[1:])]
+
+    def toCache(self):
+        #The state without the removed values, it can be written with mkCache
+        newIDs = {}
+        values = []
+        for valueID, value in enumerate(self.values):
+            if value is not None:
+                newIDs[valueID] = len(values)
+                values.append(value)
+        postings = {}
+        for gram, valueIDs in self.postings.items():
+            postings[gram] = [newIDs[i] for i in valueIDs]
+        return (self.upper, values, postings)
+
+    @classmethod
+    def fromCache(cls, state):
+        upper, values, postings = state
+        return cls(upper, values, {gram : set(valueIDs) for gram, valueIDs in postings.items()})
+
+def _citeTrigramCacheName(cacheName):
+    #The indexes are next to the cache, its name ends the same way so it is not read as a record file
+    return "{}trigrams.mkRecordDirCache".format(cacheName[:-len('mkRecordDirCache')])
+
+def _writeCiteTrigramCache(cacheName, trigramIndexes):
+    header = {"metaknowledge Version" : __version__}
+    writeCache(_citeTrigramCacheName(cacheName), header, {field : list(trigramIndex.toCache()) for field, trigramIndex in trigramIndexes.items()})
+
+def _loadCiteTrigramCache(cacheName):
+    #Gives the indexes written next to the cache, if there are none or they cannot be read there are no indexes
+    trigramCacheName = _citeTrigramCacheName(cacheName)
+    if not os.path.isfile(trigramCacheName):
+        return {}
+    try:
+        header, indexes = readCache(trigramCacheName)
+        if header["metaknowledge Version"] != __version__:
+            raise cacheError("mk version mismatch")
+        return {field : _CiteTrigramIndex.fromCache(state) for field, state in indexes.items()}
+    except (cacheError, KeyError, TypeError, ValueError, AttributeError):
+        os.remove(trigramCacheName)
+        return {}
+
+def _addToIndex(index, R, values):
+    for value in values:
+        index.setdefault(value, set()).add(R)
+
+def _removeFromIndex(index, R, values):
+    for value in values:
+        recs = index.get(value)
+        if recs is not None:
+            recs.discard(R)
+            if len(recs) == 0:
+                del index[value]
+
+def _citeIndexValues(R, field):
+    #The values R is indexed under in the index of field of the citations, see RecordCollection._getCiteIndex()
+    values = []
+    for cite in R.get('citations') or []:
+        if field == 'citation':
+            value = cite
+        elif field == 'anonymous':
+            value = cite.isAnonymous()
+        elif field == 'bad':
+            value = bool(cite.bad)
+        elif field == 'original' or field == 'upperOriginal':
+            #FastCitations do not keep their original strings
+            value = getattr(cite, 'original', None) or str(cite)
+            if field == 'upperOriginal':
+                value = value.upper()
+        else:
+            value = getattr(cite, field, None)
+        if value is not None:
+            values.append(value)
+    return values
+
+def _tagIndexValues(R, tag):
+    #The values R is indexed under in the index of tag
+    value = R.get(tag)
+    if isinstance(value, list):
+        return value
+    else:
+        return [value]
+
+#The number of Records whose values of a tag are sent to a worker process at once by RecordCollection.materialize()
+materializeChunkSize = 2**10
+
+def _processTagValues(recordType, tag, values):
+    #Processes the raw values of a tag as recordType's Records would, this is a module level function so it can be sent to worker processes
+    start = time.perf_counter()
+    tagFunc = recordType.tagProcessingFunc(tag)
+    return [tagFunc(v) for v in values], time.perf_counter() - start
+
+#The number of citation strings sent to a worker process at once by RecordCollection.parseCitations()
+citationChunkSize = 2**14
+
+def _parseRecordCitations(records, workers, fast):
+    #The citations of the WOSRecords records, see RecordCollection.parseCitations(), each distinct string is parsed once and the records citing it share the Citation
+    if fast is None:
+        fast = metaknowledge.FAST_CITES
+    #A dict so the strings stay in order
+    citeStrings = list(dict.fromkeys(itertools.chain.from_iterable(R._fieldDict['CR'] for R in records)))
+    if workers > 1 and len(citeStrings) > citationChunkSize:
+        chunks = [citeStrings[i:i + citationChunkSize] for i in range(0, len(citeStrings), citationChunkSize)]
+        with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+            parsedCites = list(itertools.chain.from_iterable(executor.map(_parseCitationStrings, chunks, itertools.repeat(fast))))
+    else:
+        parsedCites = _parseCitationStrings(citeStrings, fast)
+    #The Citations are shared by the records so they are made read only, as cachedCitation() does
+    citesDict = dict(zip(citeStrings, map(_makeReadOnly, parsedCites)))
+    for R in records:
+        cites = [citesDict[c] for c in R._fieldDict['CR']]
+        R._computedFields['CR'] = cites
+        R._computedFields['citations'] = cites
+
+def _parseCitationStrings(citeStrings, fast):
+    #Fully parses each string, this is a module level function so it can be sent to worker processes
+    if fast:
+        return [FastCitation(c) for c in citeStrings]
+    cites = [_regularCitation(c) for c in citeStrings]
+    for c in cites:
+        #Reading a field finishes the parse of the lazily made Citations
+        c.bad
+    return cites
+
+def rpys(records, minYear = None, maxYear = None, dropYears = None, rankEmptyYears = False):
+    """The function behind [RecordCollection.rpys()](../classes/RecordCollection.html#metaknowledge.RecordCollection.rpys), it takes any iterable of `Records`, e.g. the generator from [iterRecords()](#metaknowledge.fileHandlers.iterRecords), and computes the _Referenced Publication Years Spectroscopy_ of them. The other parameters and the returned value are the same as the method's.
+
+    # Parameters
+
+    _records_ : `iterable[Record]`
+
+    > The `Records` whose citations are used
+
+    # Returns
+
+    `dict[str:list]`
+
+    > The table of values from the _Referenced Publication Years Spectroscopy_
+    """
+
+    def deviation(targetYear, targetValue, targetDict):
+        yearCounts = [targetValue]
+        for deltaY in [-2, -1, 1, 2]:
+            try:
+                yearCounts.append(targetDict[targetYear + deltaY])
+            except KeyError:
+                yearCounts.append(0)
+        medianCount = list(sorted(yearCounts))[2]
+        absDiff = targetValue - medianCount
+        return absDiff
+
+    if dropYears is None:
+        dropYears = set()
+    yearCounts = {}
+    retDict = {'year' : [], 'count' : [], 'abs-deviation' : [], 'rank' : []}
+
+    for R in records:
+        try:
+            cites = R['citations']
+        except KeyError:
+            continue
+        recYear = R.get('year', float('inf'))
+        for cite in cites:
+            try:
+                #year can be None
+                cYear = int(cite.year)
+            except (AttributeError, TypeError):
+                continue
+            else:
+                #need the extra years for the normlization
+                if (maxYear is not None and cYear > (maxYear + 2)) or (minYear is not None and cYear < (minYear - 2)):
+                    continue
+                #years from before the paper are an error
+                elif recYear < (cYear + 2):
+                    continue
+            if cYear in yearCounts:
+                yearCounts[cYear] += 1
+            else:
+                yearCounts[cYear] = 1
+
+    if minYear is None:
+        smallest = min(yearCounts.keys())
+        if smallest > 1000:
+            minYear = smallest
+    if maxYear is None:
+        biggest = max(yearCounts.keys())
+        if biggest < 2100:
+            maxYear = biggest
+
+    targetYears = set(( i for i in range(minYear, maxYear + 1) if i not in dropYears))
+
+    ranks = {}
+    yearDeviances = {}
+
+    for y in targetYears:
+        try:
+            c = yearCounts[y]
+        except KeyError:
+            c = 0
+        yearDeviances[y] = deviation(y, c, yearCounts)
+
+    for rank, year in enumerate(sorted(yearDeviances.items(), key = lambda x: x[1], reverse = False), start = 1):
+        ranks[year[0]] = rank
+
+    for y in targetYears:
+        try:
+            c = yearCounts[y]
+        except KeyError:
+            c = 0
+        if c == 0 and not rankEmptyYears:
+            retDict['rank'].append(0)
+        else:
+            retDict['rank'].append(ranks[y])
+        retDict['abs-deviation'].append(yearDeviances[y])
+        retDict['year'].append(y)
+        retDict['count'].append(c)
+
+    return retDict
+
+def localCiteStats(records, pandasFriendly = False, keyType = "citation", maxEntries = None):
+    """The function behind [RecordCollection.localCiteStats()](../classes/RecordCollection.html#metaknowledge.RecordCollection.localCiteStats), it takes any iterable of `Records`, e.g. the generator from [iterRecords()](#metaknowledge.fileHandlers.iterRecords), and counts their citations. The other parameters and the returned value are the same as the method's.
+
+    # Parameters
+
+    _records_ : `iterable[Record]`
+
+    > The `Records` whose citations are counted
+
+    _maxEntries_ : `optional [int]`
+
+    > Default `None`, if given the citations are counted approximately in fixed memory, which works well with a generator of `Records` too large to load at once
+
+    # Returns
+
+    `dict[str, int or Citation : int]`
+
+    > A dictionary with keys as given by _keyType_ and integers giving their rates of occurrence
+    """
+    keyTypesLst = ["citation", "journal", "year", "author"]
+    if keyType not in keyTypesLst:
+        raise TypeError("{} is not a valid key type, only '{}' or '{}' are.".format(keyType, "', '".join(keyTypesLst[:-1]), keyTypesLst[-1]))
+    if maxEntries is None:
+        citesDict = aggregateCounts(records, ('citeCount', keyType))[0]
+    else:
+        citesDict = aggregateCounts(records, ('topCiteCount', keyType, maxEntries))[0]
+    if pandasFriendly:
+        citeLst = []
+        countLst = []
+        for cite, occ in citesDict.items():
+            citeLst.append(cite)
+            countLst.append(occ)
+        return {"Citations" : citeLst, "Counts" : countLst}
+    else:
+        return citesDict
+
+def mergeRecords(sources, name = '', conflicts = None):
+    """Merges the `Records` of many sources into one [RecordCollection](../classes/RecordCollection.html#metaknowledge.RecordCollection), e.g. the overlapping batches of records WOS exports. The merge is a single pass that joins the records on their ids in a dict, so its time is linear in the number of records and there are no pairwise comparisons.
+
+    When two records have the same id and their tags are the same only the first is kept. If their tags differ the most complete one is kept, the one with the most tags, or if they have the same number the most values, and the first if that is equal as well. `bad` records do not have reliable ids so they are kept unless they are identical, as with `RecordCollection`s. Lazily read records are first compared by their bytes in their files and are left unparsed.
+
+    The records that were not kept, along with those in the `conflicts` of the sources, are in the `conflicts` attribute of the returned collection.
+
+        >>> import metaknowledge as mk
+        >>> conflicts = {}
+        >>> RC = mk.mergeRecords(["export1.txt", "export2.txt", RC3], conflicts = conflicts)
+
+    # Parameters
+
+    _sources_ : `iterable`
+
+    > The sources of records, each can be a `RecordCollection`, any iterable of `Records` or a path to a file or directory of files, which is read with [iterRecords()](../modules/fileHandlers.html#metaknowledge.fileHandlers.iterRecords) so the records are merged as they are read
+
+    _name_ : `optional [str]`
+
+    > Default `''`, the name of the returned `RecordCollection`, if empty it is made from the names of the sources
+
+    _conflicts_ : `optional [dict]`
+
+    > Default `None`, if a dict is given, for each id with records that differ the records that were not kept are added to it, in a list with the id as the key. The kept record is the one in the returned collection. The dict is the `conflicts` of the returned collection
+
+    # Returns
+
+    `RecordCollection`
+
+    > The merged records, with the errors of all the sources
+    """
+    if conflicts is None:
+        conflicts = {}
+    recordIndex = {}
+    badRecords = set()
+    errors = {}
+    names = []
+    for source in sources:
+        if isinstance(source, str):
+            names.append(os.path.basename(source))
+            records = metaknowledge.iterRecords(source, errors = errors)
+        else:
+            names.append(getattr(source, 'name', type(source).__name__))
+            errors.update(getattr(source, 'errors', {}))
+            for recordID, dropped in getattr(source, 'conflicts', {}).items():
+                conflicts.setdefault(recordID, []).extend(dropped)
+            records = source
+        _mergeRecordsInto(recordIndex, badRecords, records, conflicts)
+    badRecords.update(recordIndex.values())
+    retCollection = RecordCollection(badRecords, name = name if name else ' + '.join(names), quietStart = True)
+    retCollection.conflicts = conflicts
+    if len(errors) > 0:
+        retCollection.bad = True
+        retCollection.errors = errors
+    return retCollection
+
+def _mergeRecordsInto(recordIndex, badRecords, records, conflicts = None):
+    #The join behind mergeRecords(), recordIndex maps ids to the kept records and the bad ones are only compared by hash
+    for R in records:
+        if R.bad:
+            badRecords.add(R)
+            continue
+        try:
+            current = recordIndex[R.id]
+        except KeyError:
+            recordIndex[R.id] = R
+            continue
+        if current is R:
+            continue
+        elif isinstance(current._fieldDict, LazyFieldDict) and isinstance(R._fieldDict, LazyFieldDict) and current._fieldDict.recordBytes() == R._fieldDict.recordBytes():
+            #The same bytes give the same tags, so neither needs to be parsed
+            continue
+        currentFields = _comparedFields(current)
+        newFields = _comparedFields(R)
+        if currentFields == newFields:
+            continue
+        if _fieldsCompleteness(newFields) > _fieldsCompleteness(currentFields):
+            recordIndex[R.id] = R
+            current, R = R, current
+        if conflicts is not None:
+            try:
+                conflicts[current.id].append(R)
+            except KeyError:
+                conflicts[current.id] = [R]
+
+def _comparedFields(R):
+    #The tags of R to compare, lazily read records are parsed without keeping the tags so they stay unparsed
+    if isinstance(R._fieldDict, LazyFieldDict):
+        return R._fieldDict.fields()
+    return R._fieldDict
+
+def _fieldsCompleteness(fieldDict):
+    return len(fieldDict), sum(len(v) for v in fieldDict.values())
+
+def _recordCompleteness(R):
+    return _fieldsCompleteness(_comparedFields(R))
+
+def linkRecords(records, linkOn = linkageKeys):
+    """Finds the `Records` of _records_ that are the same publication, even if they come from different databases, e.g. the WOS, Scopus and Medline records of a paper. Each record is put into blocks by its normalized DOI, PubMed ID and title key, made from its title, year and the surname of its first author, and all the records sharing a block are joined with a union-find. So the time is close to linear in the number of records, no records are compared pairwise.
+
+    A group of linked records never has two different DOIs and `bad` records are not linked.
+
+        >>> import metaknowledge as mk
+        >>> RC = mk.RecordCollection("records/")
+        >>> clusters = mk.linkRecords(RC)
+
+    # Parameters
+
+    _records_ : `iterable[Record]`
+
+    > The records to be linked, e.g. a `RecordCollection`
+
+    _linkOn_ : `optional [iterable[str]]`
+
+    > Default `('DOI', 'PMID', 'title')`, the keys records are linked on, any of `'DOI'`, `'PMID'` and `'title'`
+
+    # Returns
+
+    `list[list[Record]]`
+
+    > The groups of two or more records that are linked, in the order they were found in _records_
+    """
+    keyFuncs = []
+    for keyType in linkOn:
+        try:
+            keyFuncs.append(_linkageKeyFuncs[keyType])
+        except KeyError:
+            raise RCValueError("'{}' is not a linkage key, the keys are: {}".format(keyType, ', '.join(linkageKeys)))
+    records = [R for R in records if not R.bad]
+    dois = [_doiKey(R) for R in records]
+    #The DOI of each group is kept on its root
+    rootDOIs = list(dois)
+    parents = list(range(len(records)))
+    for keyFunc in keyFuncs:
+        blocks = {}
+        for i, R in enumerate(records):
+            key = dois[i] if keyFunc is _doiKey else keyFunc(R)
+            if key is None:
+                continue
+            j = blocks.setdefault(key, i)
+            if j == i:
+                continue
+            rootI = _findRoot(parents, i)
+            rootJ = _findRoot(parents, j)
+            #Groups with different DOIs are different, e.g. a book and its chapters can share a title
+            if rootI == rootJ or (rootDOIs[rootI] and rootDOIs[rootJ] and rootDOIs[rootI] != rootDOIs[rootJ]):
+                continue
+            root, child = min(rootI, rootJ), max(rootI, rootJ)
+            parents[child] = root
+            rootDOIs[root] = rootDOIs[root] or rootDOIs[child]
+    clusters = {}
+    for i, R in enumerate(records):
+        root = _findRoot(parents, i)
+        try:
+            clusters[root].append(R)
+        except KeyError:
+            clusters[root] = [R]
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+def _findRoot(parents, i):
+    #Path halving, so the trees of linkRecords() stay flat
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def _doiKey(R):
+    doi = R.get('DOI')
+    if not doi:
+        return None
+    return _doiPrefixRegex.sub('', doi.strip().lower()) or None
+
+def _pubMedIDKey(R):
+    for tag in pubMedIDTags:
+        pubMedID = R.get(tag, raw = True)
+        if pubMedID:
+            if isinstance(pubMedID, list):
+                pubMedID = pubMedID[0]
+            pubMedID = pubMedID.strip()
+            return pubMedID if pubMedID.isdigit() else None
+    return None
+
+def _titleKey(R):
+    title = R.get('title')
+    authors = R.get('authorsShort')
+    try:
+        year = int(R.get('year'))
+    except (TypeError, ValueError):
+        return None
+    if not title or not authors:
+        return None
+    firstAuthor = authors if isinstance(authors, str) else authors[0]
+    #WOS gives 'Doe, JM', Medline 'Doe JM' and Scopus 'Doe J.M.'
+    if ',' in firstAuthor:
+        surname = firstAuthor.split(',')[0]
+    else:
+        surname = firstAuthor.strip().rsplit(' ', 1)[0]
+    title = _normalizeKeyString(title)
+    surname = _normalizeKeyString(surname)
+    if not title or not surname:
+        return None
+    return title, year, surname
+
+def _normalizeKeyString(s):
+    #Decomposing the accents lets them be dropped with the punctuation and spaces
+    return _nonWordRegex.sub('', unicodedata.normalize('NFKD', s).lower())
+
+_linkageKeyFuncs = {
+    'DOI' : _doiKey,
+    'PMID' : _pubMedIDKey,
+    'title' : _titleKey,
+}
 
 def addToNetwork(grph, nds, count, weighted, nodeType, nodeInfo, fullInfo, coreCitesDict, coreValues, detailedValues, addCR, recordToCite = True, headNd = None):
     """Addeds the citations _nds_ to _grph_, according to the rules give by _nodeType_, _fullInfo_, etc.
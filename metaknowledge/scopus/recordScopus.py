@@ -7,7 +7,7 @@ import re
 from .tagProcessing.tagFunctions import scopusTagToFunction
 from .tagProcessing.specialFunctions import scopusSpecialTagToFunc
 
-from ..mkRecord import ExtendedRecord
+from ..mkRecord import ExtendedRecord, _internFields
 from ..mkExceptions import RCTypeError, BadScopusFile, BadScopusRecord
 
 scopusHeader = [
@@ -55,12 +55,19 @@ scopusHeader = [
     'EID'
  ]
 
+#The columns with values shared by many records, the names, places and journals
+scopusInternedTags = frozenset(('Authors', 'Year', 'Source title', 'Volume', 'Issue', 'Page count', 'Cited by', 'Editors', 'Sponsors', 'Publisher', 'Conference name', 'Conference date', 'Conference location', 'Conference code', 'ISSN', 'ISBN', 'CODEN', 'Language of Original Document', 'Abbreviated Source Title', 'Document Type', 'Source'))
+
 class ScopusRecord(ExtendedRecord):
     """Class for full Scopus entries.
 
     This class is an [ExtendedRecord](./ExtendedRecord.html#metaknowledge.ExtendedRecord) capable of generating its own id number. You should not create them directly, but instead use [scopusParser()](../modules/scopus.html#metaknowledge.scopus.scopusHandlers.scopusParser) on a scopus **CSV** file.
     """
-    def __init__(self, inRecord, sFile = "", sLine = 0, header = None):
+    __slots__ = ('_scopusNum',)
+
+    _internedTags = scopusInternedTags
+
+    def __init__(self, inRecord, sFile = "", sLine = 0, header = None, stringPool = None):
         bad = False
         error = None
         fieldDict = None
@@ -68,7 +75,7 @@ class ScopusRecord(ExtendedRecord):
             if isinstance(inRecord, dict) or isinstance(inRecord, collections.OrderedDict):
                 fieldDict = collections.OrderedDict(inRecord)
             elif isinstance(inRecord, str):
-                fieldDict = scopusRecordParser(inRecord, header = header)
+                fieldDict = scopusRecordParser(inRecord, header = header, stringPool = stringPool)
             else:
                 raise RCTypeError("Unsupported input type '{}', ScopusRecords cannot be created from '{}'".format(inRecord, type(inRecord)))
         except (BadScopusRecord, IndexError) as b:
@@ -163,13 +170,50 @@ class ScopusRecord(ExtendedRecord):
                 ret.journal = self.get("journal", '').upper()
             return ret
 
-firstQuotingRegex = re.compile(r'("")*"([^"]|"$)')
-innerQuotingRegex = re.compile(r'("")*"([^"|$])')
+#A quoted field: everything up to the first lone double quote that is followed by a comma or the end of the row, with escaped ("") quotes kept as they are
+scopusQuotedFieldRegex = re.compile(r'"([^"]*(?:""[^"]*)*)"(?=,|\Z)')
 
-def scopusRecordParser(record, header = None):
-    """The parser [ScopusRecords](../classes/ScopusRecord.html#metaknowledge.scopus.ScopusRecord) use. This takes a line from [scopusParser()](#metaknowledge.scopus.scopusHandlers.scopusParser) and parses it as a part of the creation of a `ScopusRecord`.
+def scopusRowSplitter(row):
+    """Splits a single row of a scopus csv file into its fields. The row is scanned once from left to right, so quoted fields can contain any number of commas or newlines.
 
-    **Note** this is for csv files downloaded from scopus _not_ the text records as those are less complete. Also, Scopus uses double quotes (`"`) to quote strings, such as abstracts, in the csv so double quotes in the string must be escaped. For reasons not fully understandable by mortals they choose to use two double quotes in a row (`""`) to represent an escaped double quote. This parser does not unescape these quotes, but it does correctly handle their interacts with the outer double quotes.
+    Quoted fields have their outer double quotes removed but, as with [scopusRecordParser()](#metaknowledge.scopus.recordScopus.scopusRecordParser), the escaped double quotes (`""`) inside them are not unescaped. Empty unquoted fields are given as `None` so they can be told apart from quoted empty strings.
+
+    # Parameters
+
+    _row_ : `str`
+
+    > The row to be split, without its final newline
+
+    # Returns
+
+    `list[str]`
+
+    > The fields of _row_ in order
+    """
+    fields = []
+    pos = 0
+    end = len(row)
+    while True:
+        m = scopusQuotedFieldRegex.match(row, pos)
+        if m is not None:
+            fields.append(m.group(1))
+            pos = m.end()
+        else:
+            #Unquoted, or malformed quoting, either way the field runs to the next comma
+            comma = row.find(',', pos)
+            if comma < 0:
+                comma = end
+            fields.append(row[pos:comma] if comma > pos else None)
+            pos = comma
+        if pos >= end:
+            return fields
+        #Skip the comma
+        pos += 1
+
+def scopusRecordParser(record, header = None, stringPool = None):
+    """The parser [ScopusRecords](../classes/ScopusRecord.html#metaknowledge.scopus.ScopusRecord) use. This takes an entry from [scopusParser()](#metaknowledge.scopus.scopusHandlers.scopusParser) and parses it as a part of the creation of a `ScopusRecord`.
+
+    **Note** this is for csv files downloaded from scopus _not_ the text records as those are less complete. Also, Scopus uses double quotes (`"`) to quote strings, such as abstracts, in the csv so double quotes in the string must be escaped. For reasons not fully understandable by mortals they choose to use two double quotes in a row (`""`) to represent an escaped double quote. This parser does not unescape these quotes, but it does correctly handle their interacts with the outer double quotes. Quoted strings may also contain newlines, the splitting is done by [scopusRowSplitter()](#metaknowledge.scopus.recordScopus.scopusRowSplitter).
 
     # Parameters
 
@@ -177,6 +221,14 @@ def scopusRecordParser(record, header = None):
 
     > string ending with a newline containing the record's entry
 
+    _header_ : `optional [list[str]]`
+
+    > Default `None`, the columns of the file, if `None` `scopusHeader` is used
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the values of the columns in `scopusInternedTags` are replaced by the equal strings in it, or added to it, so the records parsed with the same pool share them
+
     # Returns
 
     `dict`
@@ -185,37 +237,14 @@ def scopusRecordParser(record, header = None):
     """
     if header is None:
         header = scopusHeader
-    splitRecord = record[:-1].split(',')
+    splitRecord = scopusRowSplitter(record[:-1] if record.endswith('\n') else record)
+    if len(splitRecord) < len(header):
+        raise BadScopusRecord("The entry has {} fields, but the header has {}.".format(len(splitRecord), len(header)))
     tagDict = {}
-    quoted = False
-    for key in reversed(header):
-        currentVal = splitRecord.pop()
-        if currentVal == '':
-            pass
-        elif currentVal[-1] == '"':
-            if re.match(firstQuotingRegex, currentVal) is None:
-                valString = ',' + currentVal[:-1]
-                currentVal = splitRecord.pop()
-                #double quotes (") are escaped by proceeding them with another double quote
-                #So an entry containing:
-
-                #',"stuff,""quoted"",more stuff,""more quoted""",'
-
-                #would be a single string belonging to 1 column that looks like:
-
-                #'stuff,"quoted",more stuff,"more quoted"'
-
-                #We are not going to unescape the quotation marks but we do have to deal with them
-                while re.match(innerQuotingRegex, currentVal) is None:
-                    valString = ',' + currentVal + valString
-                    currentVal = splitRecord.pop()
-                valString = currentVal[1:] + valString
-            else:
-                try:
-                    valString = currentVal[1:-1]
-                except ValueError:
-                    valString = currentVal[1:-1]
-            tagDict[key] = valString
-        else:
-            tagDict[key] = currentVal
+    #Fields are matched from the end, any extra ones at the start are dropped
+    for key, val in zip(reversed(header), reversed(splitRecord)):
+        if val is not None:
+            tagDict[key] = val
+    if stringPool is not None:
+        tagDict = _internFields(tagDict, scopusInternedTags, stringPool)
     return tagDict
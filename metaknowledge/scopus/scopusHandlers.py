@@ -5,6 +5,7 @@ import csv
 from .recordScopus import ScopusRecord, scopusHeader
 
 from ..mkExceptions import BadScopusFile
+from ..mkRecord import _collectRecords, _openText
 
 def isScopusFile(infile, checkedLines = 2, maxHeaderDiff = 3):
     """Determines if _infile_ is the path to a Scopus csv file. A file is considerd to be a Scopus file if it has the correct encoding (`utf-8` with BOM (Byte Order Mark)) and within the first _checkedLines_ a line contains the complete header, the list of all header entries in order is found in [`scopus.scopusHeader`](#metaknowledge.scopus).
@@ -15,7 +16,7 @@ def isScopusFile(infile, checkedLines = 2, maxHeaderDiff = 3):
 
     _infile_ : `str`
 
-    > The path to the targets file
+    > The path to the targets file, or the first bytes of it
 
     _checkedLines_ : `optional [int]`
 
@@ -32,7 +33,7 @@ def isScopusFile(infile, checkedLines = 2, maxHeaderDiff = 3):
     > `True` if the file is a Scopus csv file
     """
     try:
-        with open(infile, 'r', encoding='utf-8') as openfile:
+        with _openText(infile, 'utf-8') as openfile:
             if openfile.read(1) != "\ufeff":
                 return False
             for i in range(checkedLines):
@@ -43,10 +44,10 @@ def isScopusFile(infile, checkedLines = 2, maxHeaderDiff = 3):
     else:
         return False
 
-def scopusParser(scopusFile):
+def scopusParser(scopusFile, fileStream = None, stringPool = None):
     """Parses a scopus file, _scopusFile_, to extract the individual lines as [ScopusRecords](../classes/ScopusRecord.html#metaknowledge.scopus.ScopusRecord).
 
-    A Scopus file is a csv (Comma-separated values) with a complete header, see [`scopus.scopusHeader`](#metaknowledge.scopus) for the entries, and each line after it containing a record's entry. The string valued entries are quoted with double quotes which means double quotes inside them can cause issues, see [scopusRecordParser()](#metaknowledge.scopus.recordScopus.scopusRecordParser) for more information.
+    A Scopus file is a csv (Comma-separated values) with a complete header, see [`scopus.scopusHeader`](#metaknowledge.scopus) for the entries, and each line after it containing a record's entry. The string valued entries are quoted with double quotes, these may contain newlines in which case the entry continues onto the following lines. As with the `csv` module a double quote only starts a quoted field at the beginning of the field, elsewhere it is part of the field. A quoted field that is never closed ends at the next line that is a complete entry by itself, so a stray double quote only damages its own entry. Double quotes inside them can cause issues, see [scopusRecordParser()](#metaknowledge.scopus.recordScopus.scopusRecordParser) for more information.
 
     # Parameters
 
@@ -54,32 +55,133 @@ def scopusParser(scopusFile):
 
     > A path to a valid scopus file, use [isScopusFile()](#metaknowledge.scopus.scopusHandlers.isScopusFile) to verify
 
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _scopusFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _scopusFile_ again. It is closed when the reading is done
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
     # Returns
 
     `set[ScopusRecord]`
 
+    > Records for each of the entries
+    """
+    return _collectRecords(scopusRecordIter(scopusFile, fileStream = fileStream, stringPool = stringPool))
+
+def scopusRecordIter(scopusFile, fileStream = None, stringPool = None):
+    """A generator that yields the [ScopusRecords](../classes/ScopusRecord.html#metaknowledge.scopus.ScopusRecord) of _scopusFile_ one at a time, this is what [scopusParser()](#metaknowledge.scopus.scopusHandlers.scopusParser) uses to read a file. When the generator finishes it returns (as the value of its `StopIteration`) the `BadScopusFile` error found or `None`.
+
+    # Parameters
+
+    _scopusFile_ : `str`
+
+    > A path to a valid scopus file
+
+    _fileStream_ : `optional [file]`
+
+    > Default `None`, if given it must be _scopusFile_ already opened in binary mode, e.g. by [sniffRecordFile()](../modules/fileHandlers.html#metaknowledge.fileHandlers.sniffRecordFile), and it is read instead of opening _scopusFile_ again. It is closed when the reading is done
+
+    _stringPool_ : `optional [dict[str : str]]`
+
+    > Default `None`, if a dict is given the strings of the records are interned in it as they are parsed, see [internStrings()](../classes/RecordCollection.html#metaknowledge.RecordCollection.internStrings)
+
+    # Returns
+
+    `generator[ScopusRecord]`
+
     > Records for each of the entries
     """
     #assumes the file is Scopus
-    recSet = set()
     error = None
     lineNum = 0
     try:
-        with open(scopusFile, 'r', encoding = 'utf-8') as openfile:
+        with _openText(scopusFile if fileStream is None else fileStream, 'utf-8') as openfile:
             #Get rid of the BOM
             openfile.read(1)
             header = openfile.readline()[:-1].split(',')
+            numColumns = len(header)
             if len(set(header) ^ set(scopusHeader)) == 0:
                 header = None
             lineNum = 0
             try:
+                #Quoted fields can span lines, so an entry only ends on a line that does not end in a quoted field
+                entryLines = []
+                entryStart = 0
                 for line, row in enumerate(openfile, start = 2):
                     lineNum = line
-                    recSet.add(ScopusRecord(row, header = header, sFile = scopusFile, sLine = line))
+                    if entryLines:
+                        inQuotes, fieldCount, strict = _scopusRowState(row)
+                        if not inQuotes and strict and fieldCount == numColumns:
+                            #The open quote was a stray one as this line is an entry by itself
+                            yield ScopusRecord(''.join(entryLines), header = header, sFile = scopusFile, sLine = entryStart, stringPool = stringPool)
+                            entryLines = []
+                        else:
+                            inQuotes = _scopusRowState(row, inQuotes = True)[0]
+                    else:
+                        inQuotes = _scopusRowState(row)[0]
+                    if not entryLines:
+                        entryStart = line
+                    entryLines.append(row)
+                    if not inQuotes:
+                        yield ScopusRecord(''.join(entryLines), header = header, sFile = scopusFile, sLine = entryStart, stringPool = stringPool)
+                        entryLines = []
+                if entryLines:
+                    yield ScopusRecord(''.join(entryLines), header = header, sFile = scopusFile, sLine = entryStart, stringPool = stringPool)
+                    raise BadScopusFile("the quoted field starting on line {} is never closed".format(entryStart))
             except BadScopusFile as e:
                 if error is None:
                     error = BadScopusFile("The file '{}' becomes unparsable after line: {}, due to the error: {} ".format(scopusFile, lineNum, e))
     except (csv.Error, UnicodeDecodeError):
         if error is None:
             error = BadScopusFile("The file '{}' has parts of it that are unparsable starting at line: {}.".format(scopusFile, lineNum))
-    return recSet, error
+    return error
+
+def _scopusRowState(row, inQuotes = False):
+    """Reads the physical line _row_ of a scopus file the way the `csv` module would, a double quote only opens a quoted field at the start of the field and inside a quoted field `""` is an escaped double quote. After a quoted field is closed the rest of the field, up to the next comma, is taken as it is.
+
+    # Parameters
+
+    _row_ : `str`
+
+    > The line to be read
+
+    _inQuotes_ : `optional [bool]`
+
+    > Default `False`, if `True` the line starts inside a quoted field that began on an earlier line
+
+    # Returns
+
+    `tuple[bool, int, bool]`
+
+    > `True` if the line ends inside a quoted field, the number of fields started in it (counting the one it starts in) and `True` if all its double quotes were regular, i.e. each quoted field is a whole field
+    """
+    fieldCount = 1
+    strict = True
+    pos = 0
+    while True:
+        if inQuotes:
+            quote = row.find('"', pos)
+            while quote >= 0 and row.startswith('"', quote + 1):
+                quote = row.find('"', quote + 2)
+            if quote < 0:
+                return True, fieldCount, strict
+            inQuotes = False
+            pos = quote + 1
+            if pos < len(row) and not row.startswith((',', '\n'), pos):
+                strict = False
+            comma = row.find(',', pos)
+        elif row.startswith('"', pos):
+            inQuotes = True
+            pos += 1
+            continue
+        else:
+            comma = row.find(',', pos)
+            if strict and row.find('"', pos, len(row) if comma < 0 else comma) >= 0:
+                strict = False
+        if comma < 0:
+            return False, fieldCount, strict
+        fieldCount += 1
+        pos = comma + 1
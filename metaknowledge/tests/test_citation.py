@@ -1,5 +1,7 @@
 #Written by Reid McIlroy-Young for Dr. John McLevey, University of Waterloo 2015
 import unittest
+import pickle
+import multiprocessing
 import metaknowledge
 
 class TestCitation(unittest.TestCase):
@@ -63,3 +65,104 @@ class TestCitation(unittest.TestCase):
         self.assertTrue(c.bad)
         self.assertEqual(c.ID(), '1, 2')
         self.assertEqual(str(c.error), "The citation did not fully match the expected pattern")
+
+    def test_citation_cache(self):
+        citeString = "John D., 2015, TOPICS IN COGNITIVE SCIENCE, V1, P1, DOI 0.1063/1.1695064"
+        c = metaknowledge.cachedCitation(citeString)
+        self.assertEqual(c, self.Cite)
+        self.assertEqual(str(c), citeString)
+        self.assertIs(c, metaknowledge.cachedCitation(''.join(citeString)))
+        #The shared Citations cannot be changed
+        with self.assertRaises(AttributeError):
+            c.year = 2000
+        with self.assertRaises(AttributeError):
+            del c.journal
+        with self.assertRaises(AttributeError):
+            c.newAttribute = True
+        self.assertEqual(c.year, 2015)
+        self.assertEqual(repr(c), repr(self.Cite))
+        cCopy = metaknowledge.Citation(c.original)
+        cCopy.year = 2000
+        self.assertEqual(cCopy.year, 2000)
+        self.assertEqual(pickle.loads(pickle.dumps(c)), c)
+        with self.assertRaises(AttributeError):
+            pickle.loads(pickle.dumps(c)).year = 2000
+        fastC = metaknowledge.cachedCitation(citeString, fast = True)
+        with self.assertRaises(AttributeError):
+            fastC.year = 2000
+        self.assertIsInstance(fastC, metaknowledge.FastCitation)
+        self.assertEqual(repr(fastC), repr(metaknowledge.fastCitation(c)))
+        metaknowledge.LAZY_CITES = True
+        try:
+            metaknowledge.clearCitationCache()
+            lazyC = metaknowledge.cachedCitation(citeString)
+        finally:
+            metaknowledge.LAZY_CITES = False
+        self.assertNotIn('V', vars(lazyC))
+        self.assertEqual(lazyC.V, 'V1')
+        with self.assertRaises(AttributeError):
+            lazyC.V = 'V2'
+        R = metaknowledge.WOSRecord("PT J\nCR {}\n   {}\nUT WOS:1\nER\n".format(citeString, citeString))
+        self.assertIs(R['citations'][0], R['citations'][1])
+        metaknowledge.clearCitationCache()
+        self.assertIsNot(c, metaknowledge.cachedCitation(citeString))
+        try:
+            metaknowledge.setCitationCacheSize(0)
+            self.assertIsNot(metaknowledge.cachedCitation(citeString), metaknowledge.cachedCitation(citeString))
+        finally:
+            metaknowledge.setCitationCacheSize()
+        self.assertIs(metaknowledge.cachedCitation(citeString), metaknowledge.cachedCitation(citeString))
+
+    def test_citation_lazy(self):
+        self.assertIn('journal', vars(metaknowledge.Citation("John D., 2015, TOPICS IN COGNITIVE SCIENCE, V1, P1, DOI 0.1063/1.1695064")))
+        metaknowledge.LAZY_CITES = True
+        try:
+            c = metaknowledge.Citation("John D., 2015, TOPICS IN COGNITIVE SCIENCE, V1, P1, DOI 0.1063/1.1695064")
+            c2 = metaknowledge.Citation("John D., 2015")
+        finally:
+            metaknowledge.LAZY_CITES = False
+        self.assertEqual(c, self.Cite)
+        self.assertEqual(c.ID(), self.Cite.ID())
+        self.assertNotIn('journal', vars(c))
+        self.assertEqual(pickle.loads(pickle.dumps(c)).P, "P1")
+        self.assertEqual(c.V, "V1")
+        self.assertFalse(c.bad)
+        self.assertIn('journal', vars(c))
+        with self.assertRaises(AttributeError):
+            c.issue
+        self.assertIn('journal', vars(c2))
+        self.assertEqual(c2.ID(), "John D, 2015")
+
+    def test_fastCitation(self):
+        metaknowledge.FAST_CITES = True
+        try:
+            c = metaknowledge.Citation("John D., 2015, TOPICS IN COGNITIVE SCIENCE, V1, P1, DOI 0.1063/1.1695064")
+            cBad = metaknowledge.Citation("John D., 2015")
+        finally:
+            metaknowledge.FAST_CITES = False
+        self.assertIsInstance(c, metaknowledge.FastCitation)
+        self.assertIsInstance(c, metaknowledge.Citation)
+        self.assertEqual(c, self.Cite)
+        self.assertEqual(hash(c), hash(self.Cite))
+        self.assertEqual([c.author, c.year, c.journal, c.V, c.P, c.DOI], [self.Cite.author, self.Cite.year, self.Cite.journal, self.Cite.V, self.Cite.P, self.Cite.DOI])
+        self.assertEqual(str(c), self.Cite.ID())
+        self.assertTrue(cBad.bad)
+        self.assertEqual(cBad.ID(), "John D, 2015")
+        self.assertFalse(hasattr(c, 'original'))
+        cCopy = pickle.loads(pickle.dumps(c))
+        self.assertIsInstance(cCopy, metaknowledge.FastCitation)
+        self.assertEqual(cCopy, c)
+        self.assertEqual(cCopy.DOI, c.DOI)
+        self.assertEqual(metaknowledge.fastCitation(self.Cite), c)
+        self.assertIs(metaknowledge.cachedCitation(self.Cite.original, fast = True), metaknowledge.cachedCitation(self.Cite.original, fast = True))
+        self.assertIsInstance(metaknowledge.Citation(self.Cite.original), metaknowledge.Citation)
+        self.assertNotIsInstance(metaknowledge.Citation(self.Cite.original), metaknowledge.FastCitation)
+
+    def test_fastCitation_spawn(self):
+        #Spawned processes hash strs with their own seeds, so the hash must not be carried back
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            c = pool.map(metaknowledge.fastCitation, [self.Cite.original])[0]
+        self.assertIsInstance(c, metaknowledge.FastCitation)
+        self.assertEqual(hash(c), hash(metaknowledge.fastCitation(self.Cite)))
+        self.assertEqual(c, metaknowledge.fastCitation(self.Cite))
+        self.assertEqual(c, self.Cite)
@@ -2,6 +2,8 @@
 import unittest
 import shutil
 import os
+import tempfile
+import zipfile
 
 import metaknowledge
 
@@ -54,6 +56,34 @@ class TestGrantCollection(unittest.TestCase):
         self.assertEqual(GC._collectedTypes, {"FallbackGrant"})
         os.remove(fname)
 
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            zipName = os.path.join(tmpDir, "grants.zip")
+            with zipfile.ZipFile(zipName, 'w', compression = zipfile.ZIP_DEFLATED) as zipArchive:
+                for fname in os.listdir("metaknowledge/tests/nsfTestFiles"):
+                    zipArchive.write(os.path.join("metaknowledge/tests/nsfTestFiles", fname), os.path.join("nsfTestFiles", fname))
+            GC = metaknowledge.GrantCollection(zipName)
+            GCref = metaknowledge.GrantCollection("metaknowledge/tests/nsfTestFiles")
+            self.assertEqual(GC._collectedTypes, {"NSFGrant"})
+            self.assertEqual(len(GC), len(GCref))
+            self.assertTrue(all(G.sourceFile.startswith(os.path.join(zipName, "nsfTestFiles")) for G in GC))
+
+    def test_NSFSniff(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            fname = os.path.join(tmpDir, "1500186.xml")
+            shutil.copy("metaknowledge/tests/nsfTestFiles/1500186.xml", fname)
+            tree = metaknowledge.grants.sniffNSFfile(fname)
+            self.assertEqual(metaknowledge.grants.parserNSFfile(fname, fileStream = tree), metaknowledge.grants.parserNSFfile(fname))
+            #The file is parsed again if the tree is not given, even after it was checked
+            self.assertTrue(metaknowledge.grants.isNSFfile(fname))
+            with open(fname) as f:
+                xml = f.read()
+            with open(fname, 'w') as f:
+                f.write(xml.replace("<AwardID>1500186</AwardID>", "<AwardID>1</AwardID>"))
+            grants, error = metaknowledge.grants.parserNSFfile(fname)
+            self.assertEqual(grants.pop().id, "NSF:1")
+            self.assertIsNone(metaknowledge.grants.sniffNSFfile("metaknowledge/tests/testFile.isi", useFileName = False))
+
     def test_CoInstitution(self):
         G = self.GC.networkCoInvestigatorInstitution()
         self.assertEqual(metaknowledge.graphStats(G), 'Nodes: 641\nEdges: 2034\nIsolates: 79\nSelf loops: 0\nDensity: 0.00991615\nTransitivity: 0.273548')
@@ -61,3 +61,39 @@ class TestMedline(unittest.TestCase):
         self.RC.writeFile(fileName)
         self.assertEqual(os.path.getsize(fileName), os.path.getsize("metaknowledge/tests/medline_test.medline") + 526) #Not quite identical
         os.remove(fileName)
+
+    def test_blockParser(self):
+        with open("metaknowledge/tests/medline_test.medline", encoding = 'latin-1') as f:
+            entries = [e + '\n' for e in f.read().split('\n\n') if e.startswith('PMID- ')]
+        for entry in entries[:20]:
+            self.assertEqual(metaknowledge.medline.medlineBlockParser(entry), metaknowledge.medline.medlineRecordParser(enumerate(entry.splitlines(True))))
+        entry = "PMID- 1\nAU  - Doe J\nAD  - Here\n      and there\nAB  - long\n" + "      line\n" * 1000
+        tagDict = metaknowledge.medline.medlineBlockParser(entry)
+        self.assertEqual(tagDict['AD'], ['Doe J : Here\nand there'])
+        self.assertEqual(tagDict['AB'][0].count('\n'), 1000)
+        self.assertIsNone(metaknowledge.medline.medlineBlockParser("PMID- 1\nnot a tag\n"))
+        stringPool = {}
+        pooled = [metaknowledge.medline.medlineBlockParser(entry, stringPool = stringPool) for entry in entries[:20]]
+        self.assertEqual(pooled[0], metaknowledge.medline.medlineRecordParser(enumerate(entries[0].splitlines(True)), stringPool = stringPool))
+        self.assertIs(pooled[0]['OWN'][0], pooled[1]['OWN'][0])
+
+    def test_blockReading(self):
+        fileName = 'tempFile.medline.tmp'
+        with open("metaknowledge/tests/medline_test.medline", encoding = 'latin-1') as f:
+            entries = f.read().split('\n\n')
+        with open(fileName, 'w', encoding = 'latin-1') as f:
+            f.write('\n\n'.join(entries[:3] + ['PMID- 1\nnot a tag'] + entries[3:]))
+        badLine = sum(e.count('\n') + 2 for e in entries[:3]) + 1
+        oldBlockSize = metaknowledge.medline.medlineHandlers.medlineBlockSize
+        metaknowledge.medline.medlineHandlers.medlineBlockSize = 100
+        try:
+            recs, error = metaknowledge.medline.medlineParser(fileName)
+        finally:
+            metaknowledge.medline.medlineHandlers.medlineBlockSize = oldBlockSize
+        fullRecs, fullError = metaknowledge.medline.medlineParser(fileName)
+        os.remove(fileName)
+        self.assertIsNone(error)
+        self.assertIsNone(fullError)
+        self.assertEqual(len(recs), len(self.RC) + 1)
+        self.assertEqual([R.sourceLine for R in recs if R.bad], [badLine])
+        self.assertEqual({R.id : R.sourceLine for R in recs}, {R.id : R.sourceLine for R in fullRecs})
@@ -1,5 +1,6 @@
 #Written by Reid McIlroy-Young for Dr. John McLevey, University of Waterloo 2015
 import unittest
+import pickle
 import metaknowledge
 
 class TestRecord(unittest.TestCase):
@@ -78,6 +79,19 @@ class TestRecord(unittest.TestCase):
         Rtmp.__setstate__(state)
         self.assertEqual(self.R, Rtmp)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.R, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.R.notATag = 1
+        R = metaknowledge.WOSRecord(simplePaperString, sFile = ''.join(['test', 'File.isi']), sLine = 2)
+        Rcopy = pickle.loads(pickle.dumps(R))
+        self.assertEqual(R, Rcopy)
+        self.assertEqual(Rcopy.sourceLine, 2)
+        self.assertIs(Rcopy.sourceFile, R.sourceFile)
+        self.assertEqual(list(Rcopy.items()), list(R.items()))
+        self.assertEqual(R.copy().wosString, R.wosString)
+        self.assertIsNot(R.copy()._fieldDict, R._fieldDict)
+
     def test_title(self):
         self.assertEqual(self.R.title, "Example Paper")
         self.assertEqual(str(self.R), "WOSRecord(Example Paper)")
@@ -4,6 +4,13 @@ import metaknowledge
 import metaknowledge.WOS
 import os
 import filecmp
+import gzip
+import multiprocessing
+import pickle
+import shutil
+import tarfile
+import tempfile
+import zipfile
 import networkx as nx
 
 disableJournChecking = True
@@ -28,6 +35,78 @@ class TestRecordCollection(unittest.TestCase):
         RC = metaknowledge.RecordCollection("metaknowledge/tests/")
         self.assertEqual(len(RC), 1032)
 
+    def test_parallelRead(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/")
+        RCpar = metaknowledge.RecordCollection("metaknowledge/tests/", workers = 2)
+        self.assertEqual(RC, RCpar)
+        self.assertEqual(RC._collectedTypes, RCpar._collectedTypes)
+        self.assertEqual(set(RC.errors.keys()), set(RCpar.errors.keys()))
+
+    def test_lazyRead(self):
+        RClazy = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi", lazy = True)
+        self.assertEqual(self.RC, RClazy)
+        self.assertEqual(RClazy._collectedTypes, {'WOSRecord'})
+        self.assertEqual(self.RC.rpys(), RClazy.rpys())
+        self.assertEqual(pickle.loads(pickle.dumps(RClazy)), self.RC)
+        #Writing the cache does not leave the records parsed
+        with tempfile.TemporaryDirectory() as tmpDir:
+            shutil.copy("metaknowledge/tests/testFile.isi", tmpDir)
+            RClazy = metaknowledge.RecordCollection(tmpDir, lazy = True, cached = True)
+            lazyRecs = [R for R in RClazy if isinstance(R._fieldDict, metaknowledge.WOS.recordWOS.LazyFieldDict)]
+            self.assertGreater(len(lazyRecs), 0)
+            self.assertFalse(any(R._fieldDict.parsed for R in lazyRecs))
+            self.assertEqual(metaknowledge.RecordCollection(tmpDir, cached = True), self.RC)
+
+    def test_lazyReadFileLimit(self):
+        try:
+            import resource
+            openFds = len(os.listdir('/dev/fd'))
+        except (ImportError, OSError):
+            self.skipTest("The open file limit cannot be checked here")
+        softLimit, hardLimit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        newLimit = openFds + 20
+        with tempfile.TemporaryDirectory() as tmpDir:
+            for i in range(newLimit + 20):
+                with open(os.path.join(tmpDir, "{}.isi".format(i)), 'w') as f:
+                    f.write("FN Thomson Reuters Web of Science\nVR 1.0\nPT J\nAU John, D\nTI Paper {0}\nUT WOS:{0}\nER\n\nEF\n".format(i))
+            resource.setrlimit(resource.RLIMIT_NOFILE, (newLimit, hardLimit))
+            try:
+                RClazy = metaknowledge.RecordCollection(tmpDir, lazy = True)
+                self.assertEqual(len(RClazy), newLimit + 20)
+                self.assertEqual(len(RClazy.errors), 0)
+                self.assertEqual(sorted(R.title for R in RClazy), sorted("Paper {}".format(i) for i in range(newLimit + 20)))
+            finally:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (softLimit, hardLimit))
+
+    def test_iterRecords(self):
+        errors = {}
+        recs = list(metaknowledge.iterRecords("metaknowledge/tests/testFile.isi", errors = errors))
+        self.assertEqual(set(recs), set(self.RC))
+        self.assertEqual(len(errors), 0)
+        metaknowledge.iterRecords("metaknowledge/tests/badFile.isi", errors = errors).__next__()
+        self.assertEqual(len(errors), 0)
+        self.assertEqual(len(list(metaknowledge.iterRecords("metaknowledge/tests/badFile.isi", errors = errors))), 32)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(sorted(metaknowledge.rankedSeries(metaknowledge.iterRecords("metaknowledge/tests/testFile.isi"), 'journal', pandasMode = False)), sorted(self.RC.rankedSeries('journal', pandasMode = False)))
+        self.assertEqual(metaknowledge.localCiteStats(metaknowledge.iterRecords("metaknowledge/tests/testFile.isi")), self.RC.localCiteStats())
+        self.assertEqual(metaknowledge.rpys(metaknowledge.iterRecords("metaknowledge/tests/testFile.isi")), self.RC.rpys())
+
+    def test_sniff(self):
+        sniffSize = metaknowledge.fileHandlers.sniffSize
+        try:
+            for fileName in ["testFile.isi", "medline_test.medline", "ProQuest_TestFile.testtxt", "scopus_testing.csv.scopus"]:
+                fileName = os.path.join("metaknowledge/tests", fileName)
+                for size in [sniffSize, 100]:
+                    metaknowledge.fileHandlers.sniffSize = size
+                    with open(fileName, 'rb') as f:
+                        handler = metaknowledge.fileHandlers.sniffRecordFile(fileName, f)
+                    self.assertTrue(handler.detector(fileName))
+            with open("metaknowledge/tests/test_recordcollection.py", 'rb') as f:
+                with self.assertRaises(metaknowledge.UnknownFile):
+                    metaknowledge.fileHandlers.sniffRecordFile("metaknowledge/tests/test_recordcollection.py", f)
+        finally:
+            metaknowledge.fileHandlers.sniffSize = sniffSize
+
     def test_caching(self):
         RC = metaknowledge.RecordCollection("metaknowledge/tests/", cached = True, name = 'testingCache', extension = 'testFile.isi')
         self.assertTrue(os.path.isfile("metaknowledge/tests/tests.[testFile.isi].mkRecordDirCache"))
@@ -39,6 +118,408 @@ class TestRecordCollection(unittest.TestCase):
         self.assertEqual(RC, RC2)
         os.remove("metaknowledge/tests/tests.[testFile.isi].mkRecordDirCache")
 
+    def test_incrementalCache(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            shutil.copy("metaknowledge/tests/testFile.isi", tmpDir)
+            shutil.copy("metaknowledge/tests/medline_test.medline", tmpDir)
+            RC = metaknowledge.RecordCollection(tmpDir, cached = True)
+            cacheName = os.path.join(tmpDir, '{}.[].mkRecordDirCache'.format(os.path.basename(tmpDir)))
+            self.assertTrue(os.path.isfile(cacheName))
+            #Nothing changed so the cache is not written again
+            cacheMtime = os.stat(cacheName).st_mtime_ns
+            os.utime(cacheName, ns = (cacheMtime - 10**9, cacheMtime - 10**9))
+            self.assertEqual(metaknowledge.RecordCollection(tmpDir, cached = True), RC)
+            self.assertEqual(os.stat(cacheName).st_mtime_ns, cacheMtime - 10**9)
+            shutil.copy("metaknowledge/tests/OnePaper.isi", tmpDir)
+            os.utime(os.path.join(tmpDir, "testFile.isi"), (0, 0))
+            flist = [os.path.join(tmpDir, f) for f in ("testFile.isi", "medline_test.medline", "OnePaper.isi")]
+            unchanged, upToDate = RC._loadFileCache(cacheName, flist, '')
+            self.assertEqual(set(unchanged), set(flist[:2]))
+            self.assertFalse(upToDate)
+            self.assertFalse(RC._loadFileCache(cacheName, flist[:2], '')[1])
+            with open(flist[1], 'a') as f:
+                f.write('\n')
+            self.assertEqual(set(RC._loadFileCache(cacheName, flist, '')[0]), set(flist[:1]))
+            RCcached = metaknowledge.RecordCollection(tmpDir, cached = True)
+            self.assertEqual(RCcached, metaknowledge.RecordCollection(tmpDir))
+            self.assertEqual(set(RCcached.errors), set(metaknowledge.RecordCollection(tmpDir).errors))
+            unchanged, upToDate = RC._loadFileCache(cacheName, flist, '')
+            self.assertEqual(set(unchanged), set(flist))
+            self.assertTrue(upToDate)
+            self.assertFalse(RC._loadFileCache(cacheName, flist[:2], '')[1])
+
+    def test_citeTrigramIndex(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        RCindexed = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        RCindexed.makeCiteTrigramIndex()
+        for keyString, field in [('nuovo', 'all'), ('NUOVO CIMENTO', 'all'), ('ph', 'all'), ('imbert', 'author'), ('OPT', 'journal'), ('10', 'V'), ('85', 'P'), ('zzzz', 'all')]:
+            self.assertEqual(set(RCindexed.citeFilter(keyString, field)), set(RC.citeFilter(keyString, field)))
+        #A record with a citation no other record has, so removing it must shrink the trigram index
+        citeCounts = {}
+        for R in RCindexed:
+            for c in set(c.original.upper() for c in R.get('citations', [])):
+                citeCounts[c] = citeCounts.get(c, 0) + 1
+        R = min((R for R in RCindexed.citeFilter('COSTADEB', 'author') if any(citeCounts[c.original.upper()] == 1 for c in R.get('citations', []))), key = lambda R: R.id)
+        uniqueCite = [c.original.upper() for c in R.get('citations', []) if citeCounts[c.original.upper()] == 1][0]
+        RCindexed.discard(R)
+        self.assertNotIn(R, RCindexed.citeFilter('COSTADEB', 'author'))
+        RCindexed.add(R)
+        self.assertIn(R, RCindexed.citeFilter('COSTADEB', 'author'))
+        trigramIndex = RCindexed._citeTrigramIndexes['upperOriginal']
+        postingsSize = sum(len(p) for p in trigramIndex.postings.values())
+        valuesSize = len(trigramIndex.values)
+        self.assertIn(uniqueCite, trigramIndex.values)
+        for i in range(10):
+            RCindexed.discard(R)
+            self.assertLess(sum(len(p) for p in trigramIndex.postings.values()), postingsSize)
+            self.assertNotIn(uniqueCite, trigramIndex.values)
+            RCindexed.add(R)
+        self.assertEqual(sum(len(p) for p in trigramIndex.postings.values()), postingsSize)
+        self.assertEqual(len(trigramIndex.values), valuesSize)
+        RCcopy = RCindexed.copy()
+        self.assertIsNot(RCcopy._citeTrigramIndexes, RCindexed._citeTrigramIndexes)
+        self.assertIsNot(RCcopy._citeTrigramIndexes['upperOriginal'], trigramIndex)
+        RCcopy.discard(R)
+        self.assertNotIn(R, RCcopy.citeFilter('COSTADEB', 'author'))
+        self.assertIn(R, RCindexed.citeFilter('COSTADEB', 'author'))
+        self.assertEqual(sum(len(p) for p in trigramIndex.postings.values()), postingsSize)
+        with self.assertRaises(metaknowledge.RCValueError):
+            RCindexed.makeCiteTrigramIndex(['year'])
+        with tempfile.TemporaryDirectory() as tmpDir:
+            shutil.copy("metaknowledge/tests/testFile.isi", tmpDir)
+            RCcached = metaknowledge.RecordCollection(tmpDir, cached = True)
+            RCcached.makeCiteTrigramIndex(['all'], caseSensitive = True)
+            trigramCacheName = os.path.join(tmpDir, '{}.[].trigrams.mkRecordDirCache'.format(os.path.basename(tmpDir)))
+            self.assertTrue(os.path.isfile(trigramCacheName))
+            RCcached = metaknowledge.RecordCollection(tmpDir, cached = True)
+            self.assertEqual(set(RCcached._citeTrigramIndexes), {'original'})
+            self.assertEqual(set(RCcached.citeFilter('NUOVO', caseSensitive = True)), set(RC.citeFilter('NUOVO', caseSensitive = True)))
+
+    def test_compressedInput(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            with open("metaknowledge/tests/testFile.isi", 'rb') as fIn, gzip.open(os.path.join(tmpDir, "testFile.isi.gz"), 'wb') as fOut:
+                shutil.copyfileobj(fIn, fOut)
+            zipName = os.path.join(tmpDir, "bundle.zip")
+            with zipfile.ZipFile(zipName, 'w', compression = zipfile.ZIP_DEFLATED) as zipArchive:
+                zipArchive.write("metaknowledge/tests/OnePaper.isi", "OnePaper.isi")
+                zipArchive.write("metaknowledge/tests/badFile.isi", "sub/badFile.isi")
+                zipArchive.write("metaknowledge/tests/test_wos.py", "test_wos.py")
+            with tarfile.open(os.path.join(tmpDir, "bundle.tar.gz"), 'w:gz') as tarArchive:
+                tarArchive.add("metaknowledge/tests/medline_test.medline", "medline_test.medline")
+            RC = metaknowledge.RecordCollection(tmpDir)
+            self.assertEqual(RC, self.RC | self.RCbad | metaknowledge.RecordCollection("metaknowledge/tests/OnePaper.isi") | metaknowledge.RecordCollection("metaknowledge/tests/medline_test.medline"))
+            self.assertEqual(set(RC.errors), {os.path.join(zipName, "sub", "badFile.isi")})
+            sources = {os.path.relpath(R.sourceFile, tmpDir) for R in RC}
+            self.assertTrue({"testFile.isi.gz", os.path.join("bundle.zip", "OnePaper.isi"), os.path.join("bundle.tar.gz", "medline_test.medline")} <= sources)
+            self.assertEqual(metaknowledge.RecordCollection(tmpDir, cached = True), RC)
+            RCcached = metaknowledge.RecordCollection(tmpDir, cached = True)
+            self.assertEqual(RCcached, RC)
+            self.assertEqual(set(RCcached.errors), set(RC.errors))
+            self.assertEqual(metaknowledge.RecordCollection(tmpDir, extension = '.isi'), self.RC | self.RCbad | metaknowledge.RecordCollection("metaknowledge/tests/OnePaper.isi"))
+            self.assertEqual(len(metaknowledge.RecordCollection(zipName)), len(self.RCbad | metaknowledge.RecordCollection("metaknowledge/tests/OnePaper.isi")))
+            self.assertEqual(metaknowledge.RecordCollection(os.path.join(tmpDir, "testFile.isi.gz"), lazy = True), self.RC)
+            self.assertEqual(len(list(metaknowledge.iterRecords(tmpDir))), len(list(metaknowledge.iterRecords("metaknowledge/tests/testFile.isi"))) + 1 + 32 + len(list(metaknowledge.iterRecords("metaknowledge/tests/medline_test.medline"))))
+
+    def test_mergeRecords(self):
+        RCcites = metaknowledge.RecordCollection("metaknowledge/tests/OnePaper.isi")
+        RCnoCites = metaknowledge.RecordCollection("metaknowledge/tests/OnePaperNoCites.isi")
+        conflicts = {}
+        RC = metaknowledge.mergeRecords([RCnoCites, "metaknowledge/tests/OnePaper.isi", self.RC, self.RCbad], conflicts = conflicts)
+        self.assertEqual(RC, self.RC | self.RCbad | RCcites)
+        R = [R for R in RC if R.id == RCcites.peek().id][0]
+        self.assertEqual(R.sourceFile, os.path.abspath("metaknowledge/tests/OnePaper.isi"))
+        self.assertEqual([C.sourceFile for C in conflicts[R.id]], [RCnoCites.peek().sourceFile])
+        #testFile.isi and badFile.isi have one record that differs as well
+        self.assertEqual(len(conflicts), 2)
+        self.assertTrue(RC.bad)
+        self.assertEqual(set(RC.errors), set(self.RCbad.errors))
+        RCadded = RCnoCites + RCcites
+        self.assertEqual(len(RCadded), 1)
+        self.assertIn('CR', RCadded.peek().keys())
+        self.assertEqual(len(metaknowledge.mergeRecords([self.RC, self.RC], conflicts = conflicts)), len(self.RC))
+        self.assertEqual(len(conflicts), 2)
+        self.assertEqual(len(RCadded.conflicts), 1)
+
+    def test_mergeOnRead(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            shutil.copy("metaknowledge/tests/OnePaperNoCites.isi", os.path.join(tmpDir, "a.isi"))
+            shutil.copy("metaknowledge/tests/OnePaper.isi", os.path.join(tmpDir, "b.isi"))
+            shutil.copy("metaknowledge/tests/testFile.isi", os.path.join(tmpDir, "c.isi"))
+            shutil.copy("metaknowledge/tests/testFile.isi", os.path.join(tmpDir, "d.isi"))
+            for lazy in [False, True]:
+                RC = metaknowledge.RecordCollection(tmpDir, lazy = lazy)
+                self.assertEqual(len(RC), len(self.RC) + 1)
+                self.assertEqual(list(RC.conflicts.keys()), [metaknowledge.RecordCollection("metaknowledge/tests/OnePaper.isi").peek().id])
+                self.assertEqual([R.sourceFile for R in list(RC.conflicts.values())[0]], [os.path.join(os.path.realpath(tmpDir), "a.isi")])
+                if lazy:
+                    #Merging does not parse the lazily read records
+                    self.assertFalse(any(R._fieldDict.parsed for R in RC if isinstance(R._fieldDict, metaknowledge.WOS.LazyFieldDict)))
+                    self.assertFalse(any(R._fieldDict.parsed for R in list(RC.conflicts.values())[0]))
+                self.assertIn('CR', RC.getID(list(RC.conflicts.keys())[0]).keys())
+
+    def test_linkRecords(self):
+        RCmed = metaknowledge.RecordCollection("metaknowledge/tests/medline_test.medline")
+        mDOI, mPMID, mTitle, mOtherDOI = sorted((R for R in RCmed if R.get('DOI')), key = lambda R: R.id)[:4]
+        def wosRecord(UT, **tags):
+            tags.setdefault('TI', 'Title of {}'.format(UT))
+            tags.setdefault('AU', 'Doe, J')
+            tags.setdefault('PY', '2016')
+            return metaknowledge.WOSRecord('PT J\n' + ''.join('{} {}\n'.format(t, v) for t, v in sorted(tags.items())) + 'UT WOS:{}\nER\n'.format(UT))
+        def wosCopy(UT, R, **tags):
+            #The same title, year and first author as the Medline record R, but written as WOS does
+            surname = R.get('authorsShort')[0].rsplit(' ', 1)[0]
+            return wosRecord(UT, TI = ' '.join(R.title.split()).upper(), PY = R.get('year'), AU = '{}, X'.format(surname.upper()), **tags)
+        wDOI = wosRecord('000000000000001', DI = mDOI.get('DOI').upper())
+        wPMID = wosRecord('000000000000002', PM = mPMID.get('PMID', raw = True)[0])
+        wTitle = wosCopy('000000000000003', mTitle)
+        wOtherDOI = wosCopy('000000000000004', mOtherDOI, DI = '10.0000/other')
+        RC = RCmed | metaknowledge.RecordCollection([wDOI, wPMID, wTitle, wOtherDOI])
+        clusters = metaknowledge.linkRecords(RC)
+        self.assertEqual(sorted(sorted(R.id for R in c) for c in clusters), sorted(sorted(R.id for R in c) for c in [[mDOI, wDOI], [mPMID, wPMID], [mTitle, wTitle]]))
+        self.assertEqual(len(metaknowledge.linkRecords(RC, linkOn = ['DOI'])), 1)
+        with self.assertRaises(metaknowledge.RCValueError):
+            metaknowledge.linkRecords(RC, linkOn = ['ISBN'])
+        linked = {}
+        RCmerged = RC.mergeLinked(linked = linked)
+        self.assertEqual(len(RCmerged), len(RC) - 3)
+        self.assertEqual(linked, {mDOI.id : [wDOI], mPMID.id : [wPMID], mTitle.id : [wTitle]})
+        self.assertIn(wOtherDOI, RCmerged)
+
+    def test_parseCitations(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        cites = {R.id : R.get('citations') for R in RC}
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        RC.parseCitations(workers = 1, fast = False)
+        self.assertEqual(cites, {R.id : R.get('citations') for R in RC})
+        allCites = [c for R in RC for c in R.get('citations', [])]
+        self.assertTrue(all(isinstance(c, metaknowledge.Citation) and not isinstance(c, metaknowledge.FastCitation) and 'bad' in c.__dict__ for c in allCites))
+        with self.assertRaises(AttributeError):
+            allCites[0].year = 1
+        self.assertEqual(len({id(c) for c in allCites}), len({c.original for c in allCites}))
+        oldChunkSize = metaknowledge.recordCollection.citationChunkSize
+        metaknowledge.recordCollection.citationChunkSize = 100
+        try:
+            RCpar = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+            RCpar.parseCitations(workers = 2)
+        finally:
+            metaknowledge.recordCollection.citationChunkSize = oldChunkSize
+        self.assertEqual(cites, {R.id : R.get('citations') for R in RCpar})
+        self.assertEqual(len(RCpar.networkCoCitation().edges()), len(self.RC.networkCoCitation().edges()))
+
+    def test_materialize(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        tagTimes = RC.materialize(['citations', 'year', 'selfCitation'])
+        self.assertEqual(set(tagTimes.keys()), {'citations', 'year', 'selfCitation'})
+        self.assertTrue(all(t >= 0 for t in tagTimes.values()))
+        for R in RC:
+            self.assertIn('PY', R._computedFields)
+            self.assertIn('year', R._computedFields)
+            self.assertIn('selfCitation', R._computedFields)
+        RCpar = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        oldChunkSize = metaknowledge.recordCollection.materializeChunkSize
+        oldCiteChunkSize = metaknowledge.recordCollection.citationChunkSize
+        metaknowledge.recordCollection.materializeChunkSize = 10
+        metaknowledge.recordCollection.citationChunkSize = 100
+        try:
+            tagTimes = RCpar.materialize(workers = 2)
+        finally:
+            metaknowledge.recordCollection.materializeChunkSize = oldChunkSize
+            metaknowledge.recordCollection.citationChunkSize = oldCiteChunkSize
+        self.assertIn('CR', tagTimes)
+        #Records citing the same string share its Citation, even if they were in different chunks
+        citesByString = {}
+        for R in RCpar:
+            for c in R.get('citations', []):
+                self.assertIs(citesByString.setdefault(str(c), c), c)
+        RCDict = {R.id : R for R in RC}
+        for R in RCpar:
+            self.assertTrue(set(R._computedFields.keys()).issuperset(R._fieldDict.keys()))
+            self.assertEqual(R.get('citations'), RCDict[R.id].get('citations'))
+            self.assertEqual(R.get('authAddress'), RCDict[R.id].get('authAddress'))
+
+    def test_aggregateCounts(self):
+        specs = ['authorsFull', ('yearCount', 'journal'), ('cooccurrence', 'year', 'authorsShort', 'journal'), ('citeCount', 'author')]
+        authCounts, journalYears, coCounts, citeCounts = self.RC.aggregateCounts(*specs)
+        self.assertEqual(authCounts, dict(self.RC.rankedSeries('authorsFull', pandasMode = False)))
+        self.assertEqual(sum(authCounts.values()), sum(len(R.get('authorsFull', [])) for R in self.RC))
+        self.assertEqual(sum(sum(yc.values()) for yc in journalYears.values()), len([R for R in self.RC if R.get('journal') and R.get('year')]))
+        self.assertEqual(coCounts, self.RC.cooccurrenceCounts('year', 'authorsShort', 'journal'))
+        self.assertEqual(citeCounts, self.RC.localCiteStats(keyType = 'author'))
+        oldChunkSize = metaknowledge.aggregation.aggregationChunkSize
+        metaknowledge.aggregation.aggregationChunkSize = 10
+        try:
+            parCounts = self.RC.aggregateCounts(*specs, workers = 2)
+        finally:
+            metaknowledge.aggregation.aggregationChunkSize = oldChunkSize
+        self.assertEqual(parCounts, [authCounts, journalYears, coCounts, citeCounts])
+        #Spawned processes hash strs with their own seeds, the counted Citations must still match this process's
+        citationCounts = self.RC.aggregateCounts(('citeCount', 'citation'))[0]
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            spawnCounts = pool.apply(metaknowledge.aggregateCounts, (list(metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")), ('citeCount', 'citation')))[0]
+        self.assertEqual(spawnCounts, citationCounts)
+        self.assertEqual(metaknowledge.aggregateCounts(iter(self.RC), 'journal'), self.RC.aggregateCounts('journal'))
+        limitTo = sorted(journalYears)[:3] + ['NOT A JOURNAL']
+        limitedCounts, limitedYears, topCounts = self.RC.aggregateCounts(('count', 'journal', limitTo), ('yearCount', 'journal', limitTo), ('topCount', 'journal', 2, limitTo))
+        journalCounts = self.RC.aggregateCounts('journal')[0]
+        self.assertEqual(limitedCounts, {j : c for j, c in journalCounts.items() if j in limitTo})
+        self.assertEqual(limitedYears, {j : yc for j, yc in journalYears.items() if j in limitTo})
+        self.assertEqual(topCounts.total, sum(limitedCounts.values()))
+        self.assertEqual(self.RC.rankedSeries('journal', pandasMode = False, limitTo = limitTo), self.RC.rankedSeries('journal', pandasMode = False, limitTo = set(limitTo)))
+        self.assertEqual(dict(self.RC.rankedSeries('journal', pandasMode = False, limitTo = limitTo)), limitedCounts)
+        self.assertEqual({j for j, y in self.RC.timeSeries('journal', pandasMode = False, limitTo = limitTo)}, set(limitedYears))
+        self.assertEqual(self.RC.aggregateCounts(('count', 'journal', None)), self.RC.aggregateCounts('journal'))
+        with self.assertRaises(metaknowledge.mkException):
+            self.RC.aggregateCounts(('notAKind', 'journal'))
+        with self.assertRaises(metaknowledge.mkException):
+            self.RC.aggregateCounts(('count', 'journal', limitTo, 'extra'))
+
+    def test_approximateCounts(self):
+        exactCites = self.RC.localCiteStats()
+        approxCites = self.RC.localCiteStats(maxEntries = 50)
+        self.assertIsInstance(approxCites, metaknowledge.SpaceSavingCounter)
+        self.assertEqual(len(approxCites), 50)
+        self.assertEqual(approxCites.total, sum(exactCites.values()))
+        for cite, count in approxCites.items():
+            self.assertLessEqual(exactCites.get(cite, 0), count)
+            self.assertLessEqual(count, exactCites.get(cite, 0) + approxCites.error(cite))
+            self.assertLessEqual(approxCites.error(cite), approxCites.total / 50)
+        for cite, count in exactCites.items():
+            if count > approxCites.total / 50:
+                self.assertIn(cite, approxCites)
+        self.assertEqual(self.RC.rankedSeries('journal', maxEntries = 100), self.RC.rankedSeries('journal'))
+        exactAuthors = dict(self.RC.rankedSeries('authorsFull', pandasMode = False))
+        for author, count in metaknowledge.rankedSeries(iter(self.RC), 'authorsFull', pandasMode = False, maxEntries = 20):
+            self.assertLessEqual(exactAuthors[author], count)
+        #With room for every value the counts are exact
+        self.assertEqual(metaknowledge.rankedSeries(iter(self.RC), 'authorsFull', pandasMode = False, maxEntries = len(exactAuthors)), self.RC.rankedSeries('authorsFull', pandasMode = False))
+        self.assertEqual(self.RC.glimpse(maxEntries = len(exactCites)).split('\n')[1:], self.RC.glimpse().split('\n')[1:])
+        halves = [metaknowledge.SpaceSavingCounter(50), metaknowledge.SpaceSavingCounter(50)]
+        for i, R in enumerate(self.RC):
+            for c in R.get('citations', []):
+                halves[i % 2].add(c)
+        halves[0].merge(halves[1])
+        self.assertEqual(halves[0].total, approxCites.total)
+        for cite, count in halves[0].items():
+            self.assertLessEqual(exactCites.get(cite, 0), count)
+            self.assertLessEqual(count, exactCites.get(cite, 0) + halves[0].error(cite))
+        with self.assertRaises(metaknowledge.mkException):
+            self.RC.aggregateCounts(('topCount', 'journal'))
+
+    def test_compactCitations(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        cites = {R.id : R.get('citations') for R in RC}
+        RC.compactCitations()
+        self.assertEqual(cites, {R.id : R.get('citations') for R in RC})
+        self.assertTrue(all(isinstance(c, metaknowledge.FastCitation) for R in RC for c in R.get('citations', [])))
+        self.assertEqual(len(RC.networkCoCitation().edges()), len(self.RC.networkCoCitation().edges()))
+
+    def test_internStrings(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        fields = {R.id : list(R.items(raw = True)) for R in RC}
+        stringPool = RC.internStrings()
+        self.assertEqual(fields, {R.id : list(R.items(raw = True)) for R in RC})
+        journals = {}
+        for R in RC:
+            if not R.bad:
+                self.assertIs(journals.setdefault(R['SO'][0], R['SO'][0]), R['SO'][0])
+        self.assertEqual(len(journals), len({R['SO'][0] for R in self.RC if not R.bad}))
+        RCmed = metaknowledge.RecordCollection("metaknowledge/tests/medline_test.medline")
+        self.assertIs(RC.internStrings(stringPool), stringPool)
+        RCmed.internStrings(stringPool)
+        self.assertIn('AU', stringPool)
+        #Not every record has an abstract, so one with both tags is picked independently of the set's order
+        R = min((R for R in RCmed if 'AU' in R._fieldDict and 'AB' in R._fieldDict), key = lambda R: R.id)
+        self.assertIs(R._fieldDict['AU'][0], stringPool[R._fieldDict['AU'][0]])
+        self.assertNotIn(R._fieldDict['AB'][0], stringPool)
+        #The pool can also be given to the parsers through the RecordCollection
+        def checkPooled(RC, stringPool):
+            for R in RC:
+                for tag, value in R._fieldDict.items():
+                    self.assertIs(tag, stringPool[tag])
+                    if tag in R._internedTags:
+                        for v in value if isinstance(value, list) else [value]:
+                            self.assertIs(v, stringPool[v])
+        stringPool = {}
+        RCpooled = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi", stringPool = stringPool)
+        self.assertEqual(RCpooled, RC)
+        checkPooled(RCpooled, stringPool)
+        RCmed = metaknowledge.RecordCollection("metaknowledge/tests/medline_test.medline", stringPool = stringPool)
+        checkPooled(RCmed, stringPool)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            shutil.copy("metaknowledge/tests/testFile.isi", tmpDir)
+            shutil.copy("metaknowledge/tests/scopus_testing.csv.scopus", tmpDir)
+            for kwargs in [{'workers' : 2}, {'cached' : True}]:
+                stringPool = {}
+                RCdir = metaknowledge.RecordCollection(tmpDir, stringPool = stringPool, **kwargs)
+                self.assertEqual(RCdir, metaknowledge.RecordCollection(tmpDir))
+                checkPooled(RCdir, stringPool)
+            #Cached records are not decoded to be interned
+            RCdir = metaknowledge.RecordCollection(tmpDir, stringPool = {}, cached = True)
+            self.assertEqual(RCdir, metaknowledge.RecordCollection(tmpDir))
+
+    def test_binaryCache(self):
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cacheName = os.path.join(tmpDir, 'test.mkRecordDirCache')
+            metaknowledge.mkCache.writeCache(cacheName, {'test' : 1}, {'records' : (set(self.RCbad), None, 1.5)})
+            header, cached = metaknowledge.mkCache.readCache(cacheName)
+            self.assertEqual(header, {'test' : 1})
+            self.assertEqual(cached['records'][1:], (None, 1.5))
+            recsDict = {R.id : R for R in self.RCbad}
+            for R in cached['records'][0]:
+                self.assertEqual(type(R), type(recsDict[R.id]))
+                self.assertEqual(R.bad, recsDict[R.id].bad)
+                self.assertEqual(R.sourceLine, recsDict[R.id].sourceLine)
+                self.assertEqual(list(R.items(raw = True)), list(recsDict[R.id].items(raw = True)))
+            #Writing records read from a cache copies their tags without decoding them
+            header, cached = metaknowledge.mkCache.readCache(cacheName)
+            metaknowledge.mkCache.writeCache(cacheName, {}, [cached['records'][0], self.RC.peek()])
+            self.assertTrue(all(R._fieldDict._fields is None for R in cached['records'][0] if not R.bad))
+            header, (recycled, RPeeked) = metaknowledge.mkCache.readCache(cacheName)
+            self.assertEqual(list(RPeeked.items(raw = True)), list(self.RC.peek().items(raw = True)))
+            for R in recycled:
+                self.assertEqual(list(R.items(raw = True)), list(recsDict[R.id].items(raw = True)))
+            with open(cacheName, 'wb') as f:
+                pickle.dump(({}, self.RC), f)
+            with self.assertRaises(metaknowledge.cacheError):
+                metaknowledge.mkCache.readCache(cacheName)
+
+    def test_damagedCache(self):
+        #Bad records do not have their tags deferred, so a good one is picked independently of the set's order
+        R = min((R for R in self.RC if not R.bad), key = lambda R: R.id)
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cacheName = os.path.join(tmpDir, 'test.mkRecordDirCache')
+            #Exceptions that cannot be made from their cached arguments
+            metaknowledge.mkCache.writeCache(cacheName, {}, type('UnicodeDecodeError', (Exception,), {})('bad'))
+            with self.assertRaises(metaknowledge.cacheError):
+                metaknowledge.mkCache.readCache(cacheName)
+            #A string index in the deferred tags that is not in the pool
+            metaknowledge.mkCache.writeCache(cacheName, {}, [R])
+            encoder = metaknowledge.mkCache._CacheEncoder()
+            encoder.encode([R])
+            tokens = encoder.tokens.tolist()
+            fieldDictIndex = encoder.strings.index('_fieldDict')
+            deferredStart = [i for i in range(len(tokens) - 1) if tokens[i] == fieldDictIndex and tokens[i + 1] == metaknowledge.mkCache._DEFERRED][0] + 3
+            self.assertEqual(tokens[deferredStart + 3], metaknowledge.mkCache._STRLIST)
+            with open(cacheName, 'r+b') as f:
+                f.seek((deferredStart + 5 - len(tokens)) * 4, os.SEEK_END)
+                f.write((2**20).to_bytes(4, 'little'))
+            with self.assertRaises(metaknowledge.cacheError):
+                metaknowledge.mkCache.readCache(cacheName)
+            #An attribute that records do not have, the cache is rebuilt
+            shutil.copy("metaknowledge/tests/testFile.isi", tmpDir)
+            RC = metaknowledge.RecordCollection(tmpDir, cached = True)
+            dirCacheName = [os.path.join(tmpDir, f) for f in os.listdir(tmpDir) if f.endswith('].mkRecordDirCache')][0]
+            with open(dirCacheName, 'rb') as f:
+                data = f.read()
+            self.assertIn(b'_sourceLine', data)
+            with open(dirCacheName, 'wb') as f:
+                f.write(data.replace(b'_sourceLine', b'_sourceLinx'))
+            with self.assertRaises(metaknowledge.cacheError):
+                metaknowledge.mkCache.readCache(dirCacheName)
+            RCrebuilt = metaknowledge.RecordCollection(tmpDir, cached = True)
+            self.assertEqual(RCrebuilt, RC)
+            self.assertEqual(metaknowledge.RecordCollection(tmpDir, cached = True), RC)
+
     def test_bad(self):
         self.assertTrue(metaknowledge.RecordCollection('metaknowledge/tests/badFile.isi').bad)
         with self.assertRaises(metaknowledge.mkExceptions.RCTypeError):
@@ -212,6 +693,61 @@ class TestRecordCollection(unittest.TestCase):
         with self.assertRaises(KeyError):
             self.RC.removeID('ghjkljhgfdfghjmh')
 
+    def test_IDIndex(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        R = RC.getID('WOS:A1979GV55600001')
+        self.assertEqual(R.id, 'WOS:A1979GV55600001')
+        self.assertIsNotNone(RC._idIndex)
+        RC.discard(R)
+        self.assertFalse(RC.containsID(R.id))
+        RC.add(R)
+        self.assertIs(RC.getID(R.id), R)
+        R2 = RC.pop()
+        self.assertIsNone(RC.getID(R2.id))
+        RCother = metaknowledge.RecordCollection([R2], quietStart = True)
+        RC |= RCother
+        self.assertIs(RC.getID(R2.id), R2)
+        RC -= RCother
+        self.assertIsNone(RC.getID(R2.id))
+        #Changing the set directly makes the index be remade
+        RC._collection.discard(R)
+        self.assertIsNone(RC.getID(R.id))
+        RC._collection = {R}
+        self.assertIs(RC.getID(R.id), R)
+        RCcopy = RC.copy()
+        RCcopy.removeID(R.id)
+        self.assertIs(RC.getID(R.id), R)
+        self.assertIsNone(pickle.loads(pickle.dumps(RC))._idIndex)
+        RC.clear()
+        self.assertFalse(RC.containsID(R.id))
+
+    def test_tagFilter(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        journal = RC.peek().get('journal')
+        RCjournal = RC.tagFilter('journal', journal)
+        self.assertEqual(set(RCjournal), {R for R in RC if R.get('journal') == journal})
+        RCauthors = RC.tagFilter('authorsFull', ['Gilles, H', 'Girard, S'])
+        self.assertEqual(set(RCauthors), {R for R in RC if {'Gilles, H', 'Girard, S'} & set(R.get('authorsFull', []))})
+        self.assertEqual(len(RC.tagFilter('year', None)), len([R for R in RC if R.get('year') is None]))
+        RCrange = RC.tagRangeFilter('year', 1970, 1980)
+        self.assertEqual(set(RCrange), {R for R in RC if R.get('year') is not None and 1970 <= R.get('year') <= 1980})
+        self.assertEqual(set(RCrange), set(RC.yearSplit(1970, 1980)))
+        self.assertEqual(len(RC.tagRangeFilter('year', maxValue = 1969)) + len(RCrange) + len(RC.tagRangeFilter('year', minValue = 1981)), len(RC) - len(RC.tagFilter('year', None)))
+        #The indexes are kept up to date
+        R = RCjournal.peek()
+        RC.discard(R)
+        self.assertNotIn(R, RC.tagFilter('journal', journal))
+        RC.add(R)
+        self.assertIn(R, RC.tagFilter('journal', journal))
+        RC -= RCjournal
+        self.assertEqual(len(RC.tagFilter('journal', journal)), 0)
+        RC |= RCjournal
+        self.assertEqual(set(RC.tagFilter('journal', journal)), set(RCjournal))
+        RC.dropNonJournals()
+        self.assertTrue(all(R['pubType'] == 'J' for R in RC.tagFilter('journal', journal)))
+        with self.assertRaises(metaknowledge.RCValueError):
+            RC.tagFilter('journal', [['not hashable']])
+
     def test_directoryRead(self):
         self.assertEqual(len(metaknowledge.RecordCollection('.')), 0)
         self.assertTrue(metaknowledge.RecordCollection('metaknowledge/tests/') >= self.RC)
@@ -491,6 +1027,45 @@ class TestRecordCollection(unittest.TestCase):
         RCnocite = metaknowledge.RecordCollection('metaknowledge/tests/OnePaperNoCites.isi')
         self.assertEqual(len(RCnocite.citeFilter('')), 0)
 
+    def test_citeIndex(self):
+        RC = metaknowledge.RecordCollection("metaknowledge/tests/testFile.isi")
+        C = metaknowledge.Citation("COSTADEB.O, 1974, LETT NUOVO CIMENTO, V10, P852")
+        self.assertEqual(set(RC.localCitesOf(C)), {R for R in RC if C in R.get('citations', [])})
+        R = RC.localCitesOf(C).peek()
+        self.assertEqual(len(RC.localCitesOf(R)), len([R2 for R2 in RC if R.createCitation() in R2.get('citations', [])]))
+        self.assertEqual(set(RC.citeFilter('nuovo')), {R for R in RC if any('NUOVO' in c.original.upper() for c in R.get('citations', []))})
+        self.assertEqual(len(RC.citeFilter('nuovo', caseSensitive = True)), 0)
+        self.assertEqual(set(RC.citeFilter('', 'V')), {R for R in RC if any(c.V is not None for c in R.get('citations', []))})
+        #The index is kept up to date
+        RC.discard(R)
+        self.assertNotIn(R, RC.localCitesOf(C))
+        self.assertNotIn(R, RC.citeFilter('COSTADEB', 'author'))
+        RC.add(R)
+        self.assertIn(R, RC.localCitesOf(C))
+        self.assertIn(R, RC.citeFilter('COSTADEB', 'author'))
+        self.assertIn(R, RC.citeFilter(1974, 'year'))
+        self.assertNotIn(R, RC.citeFilter(1974, 'year', reverse = True))
+        #Citations with the same ID can differ in being bad
+        recString = "PT J\nAU John, D\nTI Example Paper {0}\nSO TOPICS IN COGNITIVE SCIENCE\nCR {1}\nPY 2015\nUT WOS:{0}\nER\n"
+        R1 = metaknowledge.WOSRecord(recString.format(1, "Smith J, 2000, NATURE, V1, P1"))
+        R2 = metaknowledge.WOSRecord(recString.format(2, "Smith J, 2000, NATURE, V1, P1, some junk"))
+        RC = metaknowledge.RecordCollection([R1, R2])
+        self.assertEqual(set(RC.citeFilter('', 'bad')), {R2})
+        self.assertEqual(set(RC.citeFilter('', 'bad', reverse = True)), {R1})
+        RC.discard(R1)
+        self.assertEqual(set(RC.citeFilter('', 'bad')), {R2})
+        RC.add(R1)
+        self.assertEqual(set(RC.citeFilter('', 'bad')), {R2})
+        self.assertEqual(len(RC.citeFilter('', 'anonymous')), 0)
+        #Records are removed under the values they were indexed with, even if their citations were replaced since
+        RC = metaknowledge.RecordCollection([R1, R2])
+        self.assertEqual(set(RC.citeFilter('NATURE')), {R1, R2})
+        self.assertEqual(len(RC.tagFilter('citations', R1.get('citations')[0])), 2)
+        RC.compactCitations()
+        RC.discard(R1)
+        self.assertEqual(set(RC.citeFilter('NATURE')), {R2})
+        self.assertEqual(set(RC.tagFilter('citations', R1.get('citations')[0])), {R2})
+
     def test_yearDiff(self):
         Gdefault = self.RC.networkCitation()
         Gfull = self.RC.networkCitation(nodeType="full")
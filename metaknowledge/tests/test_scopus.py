@@ -55,3 +55,37 @@ class TestScopus(unittest.TestCase):
         self.RC.writeFile(fileName)
         self.assertEqual(os.path.getsize(fileName), os.path.getsize("metaknowledge/tests/scopus_testing.csv.scopus") + 11511) #Not quite identical due to double quotes
         os.remove(fileName)
+
+    def test_multilineEntry(self):
+        fileName = 'tempFile.scopus.tmp'
+        with open("metaknowledge/tests/scopus_testing.csv.scopus", encoding = 'utf-8') as fIn, open(fileName, 'w', encoding = 'utf-8') as fOut:
+            fOut.write(fIn.readline())
+            fIn.readline()
+            fOut.write(fIn.readline().replace('","', '","First line,\n""second"" line\n\n', 1))
+            for line in fIn:
+                fOut.write(line)
+        recs, error = metaknowledge.scopus.scopusParser(fileName)
+        os.remove(fileName)
+        self.assertIsNone(error)
+        self.assertEqual(len(recs), len(self.RC) - 1)
+        self.assertEqual(sorted(R.sourceLine for R in recs)[:2], [2, 6])
+        R = [R for R in recs if R.sourceLine == 2][0]
+        self.assertFalse(R.bad)
+        self.assertEqual(R.id, 'EID:2-s2.0-84943362392')
+        self.assertTrue(R['Title'].startswith('First line,\n""second"" line\n\n'))
+        self.assertEqual(metaknowledge.scopus.scopusRowSplitter('a,"b,""c""\n",,""'), ['a', 'b,""c""\n', None, ''])
+
+    def test_strayQuote(self):
+        fileName = 'tempFile.scopus.tmp'
+        with open("metaknowledge/tests/scopus_testing.csv.scopus", encoding = 'utf-8') as fIn, open(fileName, 'w', encoding = 'utf-8') as fOut:
+            for lineNum, line in enumerate(fIn, start = 1):
+                if lineNum == 4:
+                    line = line[:-1] + ',"\n'
+                fOut.write(line)
+        recs, error = metaknowledge.scopus.scopusParser(fileName)
+        os.remove(fileName)
+        self.assertIsNone(error)
+        self.assertEqual(len(recs), len(self.RC))
+        self.assertEqual(sorted(R.sourceLine for R in recs), list(range(2, len(self.RC) + 2)))
+        self.assertEqual(metaknowledge.scopus.scopusHandlers._scopusRowState('a,b"c,"d""e",f\n'), (False, 4, False))
+        self.assertEqual(metaknowledge.scopus.scopusHandlers._scopusRowState('a,"b,""c\n'), (True, 2, True))
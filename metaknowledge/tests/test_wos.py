@@ -1,6 +1,7 @@
 #Written by Reid McIlroy-Young for Dr. John McLevey, University of Waterloo 2016
 import unittest
 import metaknowledge
+import metaknowledge.WOS
 
 class TestWOS(unittest.TestCase):
     def setUp(self):
@@ -27,6 +28,47 @@ class TestWOS(unittest.TestCase):
         R = metaknowledge.WOSRecord(s)
         self.assertTrue(R.bad)
 
+    def test_parallelParse(self):
+        recs, error = metaknowledge.WOS.wosParser("metaknowledge/tests/testFile.isi")
+        parRecs, parError = metaknowledge.WOS.wosParser("metaknowledge/tests/testFile.isi", workers = 2)
+        self.assertEqual(recs, parRecs)
+        self.assertEqual(sorted(R.sourceLine for R in recs), sorted(R.sourceLine for R in parRecs))
+        self.assertIsNone(parError)
+        badRecs, badError = metaknowledge.WOS.wosParser("metaknowledge/tests/badFile.isi", workers = 2)
+        self.assertEqual(len(badRecs), 32)
+        self.assertIsInstance(badError, metaknowledge.BadWOSFile)
+
+    def test_lazyParse(self):
+        recs, error = metaknowledge.WOS.wosParser("metaknowledge/tests/testFile.isi")
+        lazyRecs, lazyError = metaknowledge.WOS.lazyWOSParser("metaknowledge/tests/testFile.isi")
+        self.assertEqual(recs, lazyRecs)
+        self.assertIsNone(lazyError)
+        self.assertTrue(all(isinstance(R._fieldDict, metaknowledge.WOS.LazyFieldDict) and not R._fieldDict.parsed for R in lazyRecs if not R.bad))
+        recsDict = {R.id : R for R in recs}
+        for R in lazyRecs:
+            self.assertEqual(R.sourceLine, recsDict[R.id].sourceLine)
+            self.assertEqual(list(R.items(raw = True)), list(recsDict[R.id].items(raw = True)))
+            self.assertEqual(R.get('citations'), recsDict[R.id].get('citations'))
+        R = [R for R in lazyRecs if not R.bad][0]
+        self.assertTrue(R._fieldDict._wosIndex.closed)
+        R.release()
+        self.assertFalse(R._fieldDict.parsed)
+        self.assertEqual(R.title, recsDict[R.id].title)
+        self.assertEqual(R.copy()._fieldDict, recsDict[R.id]._fieldDict)
+        badRecs, badError = metaknowledge.WOS.lazyWOSParser("metaknowledge/tests/badFile.isi")
+        self.assertEqual(len(badRecs), 32)
+        self.assertIsInstance(badError, metaknowledge.BadWOSFile)
+
+    def test_stringPool(self):
+        stringPool = {}
+        fields = metaknowledge.WOS.recordParser(enumerate(simplePaperString.splitlines(True)), stringPool = stringPool)
+        fieldsCopy = metaknowledge.WOS.recordParser(enumerate(simplePaperString.splitlines(True)), stringPool = stringPool)
+        self.assertEqual(fields, self.R._fieldDict)
+        self.assertIs(fields['SO'][0], fieldsCopy['SO'][0])
+        self.assertIs(list(fields.keys())[0], list(fieldsCopy.keys())[0])
+        self.assertIsNot(fields['TI'][0], fieldsCopy['TI'][0])
+        self.assertNotIn('Example Paper', stringPool)
+
     def test_WOSNum(self):
         self.assertEqual(self.R.UT, 'WOS:123317623000007')
         self.assertEqual(self.R.wosString, 'WOS:123317623000007')